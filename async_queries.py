@@ -0,0 +1,66 @@
+import asyncio
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from config import DB_POOL_MAX
+from profiler import activate, current as current_profiler
+from query_stats import query_stats
+
+# ============================
+# Eksekusi query paralel: query independen dijalankan bersamaan lewat pool
+# ============================
+
+# Maksimum query yang berjalan bersamaan per panggilan (tidak boleh melebihi ukuran pool)
+QUERY_CONCURRENCY = min(int(os.getenv('QUERY_CONCURRENCY', '4')), DB_POOL_MAX)
+
+async def _call(semaphore, name, func, args, profiler):
+    async with semaphore:
+        def work():
+            # Query di thread worker tetap tercatat di profiler rerun pemanggil
+            with activate(profiler):
+                return func(*args)
+        start = time.perf_counter()
+        result = await asyncio.to_thread(work)
+        return name, result, (time.perf_counter() - start) * 1000
+
+async def iter_completed(calls, concurrency=QUERY_CONCURRENCY, profiler=None):
+    """Async generator: (nama, hasil, latensi ms) sesuai urutan selesai
+
+    calls: dict nama -> (fungsi, tuple argumen). Fungsi yang dipanggil adalah
+    fungsi sinkron biasa (view_* di config.py); masing-masing mengambil koneksi
+    sendiri dari pool, jadi total waktu mendekati query paling lambat, bukan jumlahnya.
+    """
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+    tasks = [asyncio.create_task(_call(semaphore, name, func, args, profiler)) for name, (func, args) in calls.items()]
+    try:
+        for finished in asyncio.as_completed(tasks):
+            yield await finished
+    finally:
+        for task in tasks:
+            task.cancel()
+
+async def gather_queries(calls, concurrency=QUERY_CONCURRENCY, profiler=None):
+    """Menjalankan semua query bersamaan; mengembalikan dict nama -> hasil"""
+    results = {}
+    async for name, result, _ in iter_completed(calls, concurrency, profiler):
+        results[name] = result
+    return results
+
+def run_concurrently(calls, concurrency=QUERY_CONCURRENCY):
+    """Facade sinkron untuk Streamlit: dict nama -> hasil, error query pertama diteruskan
+
+    Script Streamlit berjalan di thread tanpa event loop, jadi asyncio.run aman
+    dipakai di sini; jika sudah ada loop yang berjalan, event loop baru dijalankan
+    di thread terpisah.
+    """
+    if len(calls) <= 1:
+        return {name: func(*args) for name, (func, args) in calls.items()}
+    profiler = current_profiler()
+    with query_stats.measure(f"query paralel ({len(calls)})"):
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            return asyncio.run(gather_queries(calls, concurrency, profiler))
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            return executor.submit(asyncio.run, gather_queries(calls, concurrency, profiler)).result()
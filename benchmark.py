@@ -0,0 +1,500 @@
+import argparse
+import contextlib
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+
+from catalogue import CATALOG_DTYPES, filter_mask, from_arrays, from_frame, from_rows
+from catalogue_store import CatalogueStore
+from features import derive_features
+
+# ============================
+# Benchmark: katalog sintetis, import, query view_*, dan olah data dashboard
+# ============================
+
+BASE_CSV = "katalog_gempa_new.csv"
+BENCH_DATABASE = os.getenv('BENCH_DB_NAME', 'earthquake_bench')
+DATA_DIR = "benchmark_data"
+RESULTS_DIR = "benchmark_results"
+# Jumlah baris per potongan saat menulis CSV sintetis (membatasi memori)
+GENERATE_CHUNK_ROWS = 1_000_000
+# Sebaran acak lokasi di sekitar episentrum asli (derajat)
+LOCATION_JITTER_DEG = 0.05
+# Query yang mengambil seluruh katalog dilewati di atas jumlah baris ini
+MAX_FETCH_ROWS = 5_000_000
+# Selisih p50 / throughput di atas rasio ini ditandai sebagai regresi
+REGRESSION_RATIO = 1.2
+# ...dan selisih latensi minimal ini (ms), agar noise query sub-milidetik tidak ditandai
+MIN_REGRESSION_MS = 1.0
+
+KOLOM_VISUALISASI = ["tanggal", "waktu", "latitude", "longitude", "depth", "magnitude", "remark"]
+
+# ============================
+# Katalog sintetis
+# ============================
+
+def load_base_catalogue(csv_file=BASE_CSV):
+    """Katalog bawaan sebagai sumber distribusi (wilayah, lokasi, kedalaman, magnitude)"""
+    df = pd.read_csv(csv_file)
+    df['tgl'] = pd.to_datetime(df['tgl'], format='%m/%d/%Y')
+    df['remark'] = df['remark'].astype('category')
+    return df
+
+def synthesize(base, n, start, span_days, seed=0):
+    """n kejadian sintetis dengan sebaran wilayah, lokasi, kedalaman, dan magnitude katalog asli
+
+    Setiap baris meminjam episentrum acak dari katalog asli lalu digeser sedikit,
+    sehingga kepadatan per wilayah (remark) tetap realistis. Waktu kejadian dibagi
+    rata ke slot detik dalam rentang tanggal, jadi selalu unik dan urut kronologis
+    (tidak bentrok dengan constraint uq_katalog_event).
+    """
+    rng = np.random.default_rng(seed)
+    total_seconds = span_days * 86400
+    if n > total_seconds:
+        raise ValueError(f"{n:,} kejadian tidak muat dalam {span_days} hari, perbesar --years")
+    idx = rng.integers(0, len(base), n)
+    stride = total_seconds // n
+    slots = np.arange(n, dtype=np.int64) * stride + rng.integers(0, stride, n)
+    when = np.datetime64(start, 's') + slots.astype('timedelta64[s]')
+
+    depth = base['depth'].to_numpy()[idx]
+    depth = depth + rng.normal(0, 0.1 * depth + 1)
+    magnitude = base['mag'].to_numpy()[idx] + rng.integers(-1, 2, n) * 0.1
+    return pd.DataFrame({
+        'waktu_kejadian': when,
+        'latitude': np.round(base['lat'].to_numpy()[idx] + rng.normal(0, LOCATION_JITTER_DEG, n), 2),
+        'longitude': np.round(base['lon'].to_numpy()[idx] + rng.normal(0, LOCATION_JITTER_DEG, n), 2),
+        'depth': np.clip(np.round(depth), 1, 750).astype(np.int16),
+        'magnitude': np.round(np.clip(magnitude, base['mag'].min(), None), 1),
+        'remark': pd.Categorical.from_codes(
+            base['remark'].cat.codes.to_numpy()[idx], base['remark'].cat.categories
+        ),
+    })
+
+def to_csv_frame(df):
+    """Format kolom seperti katalog_gempa_new.csv (tgl m/d/Y, ot HH.MM.SS)"""
+    when = pd.DatetimeIndex(df['waktu_kejadian'])
+    return pd.DataFrame({
+        'tgl': when.month.astype(str) + '/' + when.day.astype(str) + '/' + when.year.astype(str),
+        'ot': when.strftime('%H.%M.%S'),
+        'lat': df['latitude'],
+        'lon': df['longitude'],
+        'depth': df['depth'],
+        'mag': df['magnitude'],
+        'remark': df['remark'],
+    })
+
+def generate_catalogue(base, scale, path, years=None, seed=0):
+    """Menulis katalog sintetis scale x ukuran katalog asli ke CSV; mengembalikan jumlah baris
+
+    Rentang tanggal default sama dengan katalog asli (jaringan lebih rapat),
+    --years memperpanjang rentang ke belakang.
+    """
+    n = len(base) * scale
+    end = base['tgl'].max().date()
+    if years:
+        start = end - timedelta(days=int(years * 365.25))
+    else:
+        start = base['tgl'].min().date()
+    span_days = (end - start).days + 1
+    per_chunk = max(1, min(GENERATE_CHUNK_ROWS, n))
+    chunks = -(-n // per_chunk)
+    chunk_days = span_days / chunks
+    written = 0
+    with open(path, 'w', encoding='utf-8', newline='') as f:
+        for i in range(chunks):
+            rows = min(per_chunk, n - written)
+            chunk_start = start + timedelta(days=round(i * chunk_days))
+            chunk_span = max(1, round((i + 1) * chunk_days) - round(i * chunk_days))
+            df = synthesize(base, rows, chunk_start, chunk_span, seed + i)
+            to_csv_frame(df).to_csv(f, index=False, header=(i == 0))
+            written += rows
+    return written
+
+# ============================
+# Pengukuran
+# ============================
+
+def _timed(func, repeat):
+    """Menjalankan func beberapa kali; mengembalikan statistik latensi (ms) dan hasil terakhir"""
+    samples = []
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        samples.append((time.perf_counter() - start) * 1000)
+    samples = np.asarray(samples)
+    return {
+        'repeat': repeat,
+        'min_ms': round(float(samples.min()), 3),
+        'p50_ms': round(float(np.percentile(samples, 50)), 3),
+        'p95_ms': round(float(np.percentile(samples, 95)), 3),
+        'mean_ms': round(float(samples.mean()), 3),
+    }, result
+
+def _result_rows(result):
+    if isinstance(result, tuple) and len(result) == 2 and isinstance(result[0], dict):
+        return len(next(iter(result[0].values()), ()))  # (array per kolom, kategori) dari view_catalogue_arrays
+    if isinstance(result, tuple) and len(result) == 2 and isinstance(result[1], list):
+        return len(result[1])  # (kolom, baris) dari view_earthquakes_page
+    if isinstance(result, (list, np.ndarray, pd.DataFrame)):
+        return len(result)
+    return 1 if result is not None else 0
+
+def sample_filters(bounds):
+    """Kombinasi filter sidebar dari batas data: tanpa filter, satu tahun terakhir, dan sempit"""
+    _, min_mag, max_mag, min_depth, max_depth, min_date, max_date = bounds
+    full = {
+        'min_mag': float(min_mag), 'max_mag': float(max_mag),
+        'min_depth': int(min_depth), 'max_depth': int(max_depth),
+        'start_date': min_date, 'end_date': max_date,
+    }
+    last_year = dict(full, start_date=max(min_date, max_date - timedelta(days=365)))
+    narrow = dict(last_year, min_mag=5.0, max_depth=70)
+    return {'semua': full, 'satu_tahun': last_year, 'sempit': narrow}
+
+def dashboard_steps(catalogue, filters, repeat):
+    """Langkah olah data main.py pada katalog di memori (store bersama + filter sidebar)"""
+    results = {}
+    base_columns = [col for col in CATALOG_DTYPES if col in catalogue.columns]
+    results['derive_features'], _ = _timed(lambda: derive_features(catalogue[base_columns]), repeat)
+    stats, store = _timed(lambda: CatalogueStore(catalogue), 1)
+    results['store_build'] = stats
+    for label, flt in filters.items():
+        stats, idx = _timed(lambda: store.select(flt), repeat)
+        results[f'store.select[{label}]'] = dict(stats, rows=len(idx))
+        results[f'filter_mask[{label}]'], _ = _timed(lambda: np.flatnonzero(filter_mask(catalogue, flt)), repeat)
+        results[f'summary[{label}]'], _ = _timed(lambda: store.summary(idx), repeat)
+        results[f'daily[{label}]'], _ = _timed(lambda: store.daily(idx), repeat)
+        results[f'counts_remark[{label}]'], _ = _timed(lambda: store.value_counts('remark', idx), repeat)
+        results[f'top10[{label}]'], _ = _timed(
+            lambda: store.top(idx, 'magnitude', 10, ['tanggal', 'magnitude', 'remark']), repeat
+        )
+        results[f'weekdays[{label}]'], _ = _timed(lambda: store.weekdays(idx), repeat)
+    results['memory_mb'] = round(store.memory_usage() / 1e6, 1)
+    return results
+
+def view_calls(config, filters, total_rows):
+    """Skenario setiap config.view_*: nama -> (fungsi, argumen) yang mewakili pemakaian dashboard"""
+    flt = filters['satu_tahun']
+    start, end = flt['start_date'], flt['end_date']
+    calls = {
+        'view_catalog_version': (config.view_catalog_version, ()),
+        'view_filter_bounds': (config.view_filter_bounds, ()),
+        'view_filtered_summary': (config.view_filtered_summary, (flt,)),
+        'view_earthquakes_page': (config.view_earthquakes_page, (flt, KOLOM_VISUALISASI, 101)),
+        'view_statistics_by_month': (config.view_statistics_by_month, ()),
+        'view_top_earthquakes': (config.view_top_earthquakes, (10, start, end)),
+        'view_earthquakes_by_region': (config.view_earthquakes_by_region, ()),
+        'view_earthquakes_by_magnitude_range': (config.view_earthquakes_by_magnitude_range, (6.0, 10.0, start, end)),
+        'view_earthquakes_by_depth_range': (config.view_earthquakes_by_depth_range, (300, 750, start, end)),
+        'view_rollup_total': (config.view_rollup_total, ()),
+        'view_rollup_daily': (config.view_rollup_daily, (start, end)),
+        'view_rollup_regions': (config.view_rollup_regions, (start, end, 10)),
+        'view_rollup_hours': (config.view_rollup_hours, (start, end)),
+        'view_rollup_categories': (config.view_rollup_categories, ('kategori_magnitude', start, end)),
+        'view_rollup_weekdays': (config.view_rollup_weekdays, (start, end)),
+        'view_earthquakes_in_bbox': (
+            config.view_earthquakes_in_bbox, (-9.0, 105.0, -5.0, 115.0, flt, KOLOM_VISUALISASI, 1000)
+        ),
+        'view_earthquakes_within_radius': (
+            config.view_earthquakes_within_radius, (-6.2088, 106.8456, 100, flt, KOLOM_VISUALISASI, 100)
+        ),
+        'view_nearest_earthquakes': (
+            config.view_nearest_earthquakes, (-6.2088, 106.8456, 10, flt, KOLOM_VISUALISASI)
+        ),
+        'view_filtered_earthquakes[satu_tahun]': (config.view_filtered_earthquakes, (flt, KOLOM_VISUALISASI)),
+        'view_catalogue_arrays[satu_tahun]': (config.view_catalogue_arrays, (flt, KOLOM_VISUALISASI)),
+        'view_catalog_changes': (config.view_catalog_changes, (0, 1000)),
+        'view_aftershock_ids': (config.view_aftershock_ids, ()),
+        'view_earthquakes_by_id_ranges': (config.view_earthquakes_by_id_ranges, ([(1, 1000)],)),
+    }
+    # Query yang memindahkan seluruh katalog ke Python hanya diukur jika masih masuk akal
+    if total_rows <= MAX_FETCH_ROWS:
+        calls['view_filtered_earthquakes[semua]'] = (
+            config.view_filtered_earthquakes, (filters['semua'], KOLOM_VISUALISASI)
+        )
+        calls['view_all_earthquakes'] = (config.view_all_earthquakes, ())
+        calls['view_catalogue_arrays[semua]'] = (config.view_catalogue_arrays, (None, config.KOLOM_GEMPA))
+    return calls
+
+def benchmark_views(config, filters, total_rows, repeat):
+    """Latensi setiap view_* tanpa cache query (langsung ke database)"""
+    calls = view_calls(config, filters, total_rows)
+    covered = {name.split('[')[0] for name in calls}
+    missing = sorted(
+        name for name in dir(config)
+        if name.startswith('view_') and callable(getattr(config, name)) and name not in covered
+    )
+    if missing:
+        print(f"⚠️ view_* belum punya skenario benchmark: {', '.join(missing)}")
+
+    results = {}
+    for name, (func, call_args) in calls.items():
+        func = getattr(func, 'uncached', func)
+        try:
+            stats, result = _timed(lambda: func(*call_args), repeat)
+            results[name] = dict(stats, rows=_result_rows(result))
+        except Exception as e:
+            results[name] = {'error': f"{type(e).__name__}: {e}"}
+            print(f"✗ {name}: {e}")
+    return results
+
+def benchmark_from_rows(config, total_rows, repeat):
+    """Konversi hasil query menjadi katalog ringkas: tuple psycopg2 vs array COPY binary"""
+    if total_rows > MAX_FETCH_ROWS:
+        return {}
+    rows = config.view_all_earthquakes.uncached()
+    stats, _ = _timed(lambda: from_rows(rows, config.KOLOM_GEMPA), repeat)
+    results = {'from_rows[semua]': dict(stats, rows=len(rows))}
+    del rows
+    arrays, categories = config.view_catalogue_arrays.uncached(None, config.KOLOM_GEMPA)
+    stats, _ = _timed(lambda: from_arrays(arrays, categories), repeat)
+    results['from_arrays[semua]'] = dict(stats, rows=len(arrays['id']))
+    return results
+
+# ============================
+# Database benchmark
+# ============================
+
+def prepare_database(database):
+    """Membuat database benchmark (jika belum ada) lalu menjalankan schema.sql"""
+    import psycopg2
+    from config import Config
+
+    params = dict(Config.get_connection_params(), database='postgres')
+    conn = psycopg2.connect(**params)
+    conn.autocommit = True
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute("SELECT 1 FROM pg_database WHERE datname = %s", (database,))
+            if cursor.fetchone() is None:
+                cursor.execute(f'CREATE DATABASE "{database}"')
+                print(f"✓ Database benchmark {database} dibuat")
+    finally:
+        conn.close()
+
+    conn = psycopg2.connect(**dict(params, database=database))
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute("SELECT to_regclass('katalog_gempa')")
+            if cursor.fetchone()[0] is None:
+                # Baris meta-command psql (misal \\d) dilewati
+                with open('schema.sql', encoding='utf-8') as f:
+                    cursor.execute(''.join(line for line in f if not line.startswith('\\')))
+                print("✓ schema.sql dijalankan di database benchmark")
+        conn.commit()
+    finally:
+        conn.close()
+
+def reset_catalogue(conn):
+    """Mengosongkan katalog dan rekap sebelum import skala berikutnya"""
+    from rollups import refresh_rollups
+
+    with conn.cursor() as cursor:
+        cursor.execute("TRUNCATE katalog_gempa")
+        refresh_rollups(cursor, None)
+    conn.commit()
+
+def count_catalogue(conn):
+    with conn.cursor() as cursor:
+        cursor.execute("SELECT COUNT(*) FROM katalog_gempa")
+        count = cursor.fetchone()[0]
+        cursor.execute("ANALYZE katalog_gempa")
+    conn.commit()
+    return count
+
+def benchmark_import(csv_file, method, workers, expected_rows, workdir):
+    """Throughput import ke katalog kosong (termasuk refresh rekap & snapshot)"""
+    import import_data
+    from parallel_import import import_csv_parallel
+
+    conn = import_data.connect_db()
+    reset_catalogue(conn)
+    checkpoint = os.path.join(workdir, 'bench_checkpoint.json')
+    rejected = os.path.join(workdir, 'bench_rejected.csv')
+    start = time.perf_counter()
+    # Output per batch tidak dibutuhkan; hasil ada di file JSON
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        if method == 'parallel':
+            import_csv_parallel(csv_file, workers=workers, rejected_file=rejected)
+        else:
+            import_data.import_csv_to_db(
+                csv_file, method=method, resume=False, checkpoint_file=checkpoint, rejected_file=rejected
+            )
+    seconds = time.perf_counter() - start
+    loaded = count_catalogue(conn)
+    conn.close()
+    result = {
+        'seconds': round(seconds, 3),
+        'rows': loaded,
+        'rows_per_sec': round(loaded / seconds, 1) if seconds else None,
+    }
+    if loaded != expected_rows:
+        result['error'] = f"{loaded:,} dari {expected_rows:,} baris termuat"
+        print(f"✗ Import {method}: {result['error']}")
+    return result
+
+# ============================
+# Laporan
+# ============================
+
+def environment_info(args):
+    try:
+        commit = subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        'generated_at': datetime.now().isoformat(timespec='seconds'),
+        'git_commit': commit,
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'numpy': np.__version__,
+        'pandas': pd.__version__,
+        'args': vars(args),
+    }
+
+def _flatten(results):
+    """{(skala, grup, nama): (metrik, nilai)} dengan metrik p50_ms atau rows_per_sec"""
+    flat = {}
+    for scale, groups in results['scales'].items():
+        for group, entries in groups.items():
+            if not isinstance(entries, dict):
+                continue
+            for name, entry in entries.items():
+                if not isinstance(entry, dict):
+                    continue
+                if 'p50_ms' in entry:
+                    flat[(scale, group, name)] = ('p50_ms', entry['p50_ms'])
+                elif entry.get('rows_per_sec'):
+                    flat[(scale, group, name)] = ('rows_per_sec', entry['rows_per_sec'])
+    return flat
+
+def compare(old_path, new_path, threshold=REGRESSION_RATIO):
+    """Membandingkan dua file hasil; mengembalikan jumlah regresi"""
+    with open(old_path, encoding='utf-8') as f:
+        old = _flatten(json.load(f))
+    with open(new_path, encoding='utf-8') as f:
+        new = _flatten(json.load(f))
+    regressions = 0
+    print(f"{'skala':>6}  {'grup':<10} {'nama':<45} {'lama':>12} {'baru':>12}  rasio")
+    for key in sorted(old.keys() & new.keys()):
+        metric, before = old[key]
+        _, after = new[key]
+        if not before or not after:
+            continue
+        # Rasio > 1 berarti lebih buruk, untuk latensi maupun throughput
+        ratio = after / before if metric == 'p50_ms' else before / after
+        flag = ''
+        noise = metric == 'p50_ms' and after - before < MIN_REGRESSION_MS
+        if ratio > threshold and not noise:
+            flag = '  ⚠️ regresi'
+            regressions += 1
+        print(f"{key[0]:>6}  {key[1]:<10} {key[2]:<45} {before:>12.3f} {after:>12.3f}  {ratio:.2f}{flag}")
+    print(f"\n{'✗' if regressions else '✓'} {regressions} regresi (ambang {threshold:.2f}x)")
+    return regressions
+
+def run(args):
+    os.makedirs(args.workdir, exist_ok=True)
+    os.makedirs(args.output, exist_ok=True)
+    base = load_base_catalogue(args.base_csv)
+    print(f"✓ Katalog dasar: {len(base):,} baris dari {args.base_csv}")
+    results = {'environment': environment_info(args), 'base_rows': len(base), 'scales': {}}
+
+    config = None
+    if not args.skip_db:
+        # Database & snapshot benchmark dipisah dari milik dashboard; env harus diset
+        # sebelum config/snapshot diimport karena dibaca saat import modul
+        os.environ['DB_NAME'] = args.database
+        os.environ['SNAPSHOT_PATH'] = os.path.join(args.workdir, 'katalog_gempa.arrow')
+        prepare_database(args.database)
+        import config
+
+    for scale in args.scales:
+        print(f"\n=== Skala {scale}x ===")
+        scale_results = {}
+        csv_file = os.path.join(args.workdir, f'katalog_{scale}x.csv')
+        start = time.perf_counter()
+        if args.reuse_data and os.path.exists(csv_file):
+            with open(csv_file, encoding='utf-8') as f:
+                rows = sum(1 for _ in f) - 1
+        else:
+            rows = generate_catalogue(base, scale, csv_file, years=args.years, seed=args.seed)
+        scale_results['generate'] = {'rows': rows, 'seconds': round(time.perf_counter() - start, 3)}
+        print(f"✓ {rows:,} baris sintetis di {csv_file}")
+
+        catalogue = from_frame(_csv_to_catalogue(pd.read_csv(csv_file)))
+        store = CatalogueStore(catalogue)
+        filters = sample_filters(store.bounds())
+        del store
+        scale_results['dashboard'] = dashboard_steps(catalogue, filters, args.repeat)
+        print("✓ Langkah olah data dashboard diukur")
+        del catalogue
+
+        if config is not None:
+            scale_results['import'] = {}
+            for method in args.import_methods:
+                scale_results['import'][method] = benchmark_import(csv_file, method, args.workers, rows, args.workdir)
+                print(f"✓ Import {method}: {scale_results['import'][method].get('rows_per_sec')} baris/detik")
+            scale_results['views'] = benchmark_views(config, filters, rows, args.repeat)
+            scale_results['from_rows'] = benchmark_from_rows(config, rows, args.repeat)
+            print("✓ Latensi view_* diukur")
+
+        results['scales'][str(scale)] = scale_results
+        if not args.keep_data:
+            os.remove(csv_file)
+
+    path = os.path.join(args.output, f"benchmark_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json")
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(results, f, indent=2, default=str)
+    print(f"\n✓ Hasil benchmark ditulis ke {path}")
+    return path
+
+def _csv_to_catalogue(df):
+    """Kolom CSV (tgl, ot, ...) menjadi kolom dasar katalog"""
+    tanggal = pd.to_datetime(df['tgl'], format='%m/%d/%Y')
+    return pd.DataFrame({
+        'waktu_kejadian': tanggal + pd.to_timedelta(df['ot'].str.replace('.', ':', regex=False)),
+        'tanggal': tanggal,
+        'latitude': df['lat'],
+        'longitude': df['lon'],
+        'depth': df['depth'],
+        'magnitude': df['mag'],
+        'remark': df['remark'],
+    })
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark import, query, dan olah data dashboard")
+    parser.add_argument("--scales", type=int, nargs="+", default=[10],
+                        help="kelipatan ukuran katalog bawaan (misal 10 100 1000)")
+    parser.add_argument("--repeat", type=int, default=5, help="pengulangan per pengukuran")
+    parser.add_argument("--database", default=BENCH_DATABASE,
+                        help="database terpisah untuk benchmark (dikosongkan setiap skala)")
+    parser.add_argument("--import-methods", nargs="+", choices=["copy", "values", "parallel"], default=["copy"])
+    parser.add_argument("--workers", type=int, default=None, help="worker untuk metode parallel")
+    parser.add_argument("--years", type=float, default=None,
+                        help="rentang tahun katalog sintetis (default: sama dengan katalog bawaan)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--base-csv", default=BASE_CSV)
+    parser.add_argument("--workdir", default=DATA_DIR, help="folder CSV sintetis")
+    parser.add_argument("--output", default=RESULTS_DIR, help="folder file hasil JSON")
+    parser.add_argument("--skip-db", action="store_true", help="hanya ukur olah data di memori")
+    parser.add_argument("--keep-data", action="store_true", help="simpan CSV sintetis setelah selesai")
+    parser.add_argument("--reuse-data", action="store_true", help="pakai CSV sintetis yang sudah ada")
+    parser.add_argument("--compare", nargs=2, metavar=("LAMA", "BARU"),
+                        help="bandingkan dua file hasil lalu keluar")
+    args = parser.parse_args()
+
+    if args.compare:
+        sys.exit(1 if compare(*args.compare) else 0)
+    run(args)
@@ -0,0 +1,114 @@
+import os
+
+import numpy as np
+
+# ============================
+# Decoder COPY ... TO STDOUT (FORMAT binary) langsung ke array NumPy
+# ============================
+
+# Baris per potongan yang di-decode; memori puncak = array hasil + satu potongan byte
+FETCH_CHUNK_ROWS = int(os.getenv('FETCH_CHUNK_ROWS', '50000'))
+
+PGCOPY_SIGNATURE = b'PGCOPY\n\xff\r\n\x00'
+# Signature + flags (int32) + panjang header extension (int32)
+HEADER_SIZE = len(PGCOPY_SIGNATURE) + 8
+# Penanda akhir data: jumlah field -1 (int16)
+TRAILER = b'\xff\xff'
+
+# Tipe PostgreSQL lebar-tetap -> dtype big-endian di format binary
+PG_BINARY_DTYPES = {
+    'int4': '>i4',
+    'int8': '>i8',
+    'float4': '>f4',
+    'float8': '>f8',
+    'date': '>i4',   # hari sejak 2000-01-01
+    'time': '>i8',   # mikrodetik sejak tengah malam
+}
+
+# Epoch tanggal di format binary PostgreSQL
+PG_EPOCH = np.datetime64('2000-01-01', 'D')
+
+class BinaryCopyDecoder:
+    """Objek file-like untuk cursor.copy_expert: byte COPY binary di-decode per potongan
+
+    Semua kolom harus bertipe lebar-tetap dan NOT NULL, sehingga setiap baris
+    punya ukuran sama dan satu potongan bisa dibaca sekaligus dengan
+    np.frombuffer (dtype terstruktur) tanpa objek Python per nilai.
+    fields: list (nama, tipe PostgreSQL) sesuai urutan SELECT.
+    """
+
+    def __init__(self, fields, chunk_rows=FETCH_CHUNK_ROWS):
+        layout = [('_fields', '>i2')]
+        for i, (name, pg_type) in enumerate(fields):
+            layout += [(f'_len{i}', '>i4'), (name, PG_BINARY_DTYPES[pg_type])]
+        self.fields = [name for name, _ in fields]
+        self.row_dtype = np.dtype(layout)
+        self.chunk_bytes = self.row_dtype.itemsize * max(1, chunk_rows)
+        self._buffer = bytearray()
+        self._header_done = False
+        self._chunks = {name: [] for name in self.fields}
+        self.rows = 0
+        self.bytes_read = 0
+
+    def write(self, data):
+        self._buffer += data
+        self.bytes_read += len(data)
+        if not self._header_done:
+            self._read_header()
+        if self._header_done and len(self._buffer) >= self.chunk_bytes:
+            self._decode_rows()
+        return len(data)
+
+    def _read_header(self):
+        if len(self._buffer) < HEADER_SIZE:
+            return
+        if bytes(self._buffer[:len(PGCOPY_SIGNATURE)]) != PGCOPY_SIGNATURE:
+            raise ValueError("Data bukan format COPY binary PostgreSQL")
+        extension = int.from_bytes(self._buffer[HEADER_SIZE - 4:HEADER_SIZE], 'big')
+        if len(self._buffer) < HEADER_SIZE + extension:
+            return
+        del self._buffer[:HEADER_SIZE + extension]
+        self._header_done = True
+
+    def _decode_rows(self):
+        """Decode semua baris utuh di buffer; sisa baris terpotong menunggu write berikutnya"""
+        n = len(self._buffer) // self.row_dtype.itemsize
+        if n == 0:
+            return
+        size = n * self.row_dtype.itemsize
+        records = np.frombuffer(bytes(self._buffer[:size]), dtype=self.row_dtype)
+        del self._buffer[:size]
+        if (records['_fields'] != len(self.fields)).any():
+            raise ValueError("Jumlah kolom COPY binary tidak sesuai")
+        for i, name in enumerate(self.fields):
+            if (records[f'_len{i}'] != self.row_dtype[name].itemsize).any():
+                raise ValueError(f"Kolom {name} berisi NULL atau bukan tipe lebar-tetap")
+            # astype ke byte order native sekaligus menyalin keluar dari buffer potongan
+            self._chunks[name].append(records[name].astype(self.row_dtype[name].newbyteorder('=')))
+        self.rows += n
+
+    def result(self):
+        """Dict nama kolom -> array NumPy (byte order native) setelah COPY selesai"""
+        if not self._header_done:
+            raise ValueError("Header COPY binary tidak diterima")
+        if bytes(self._buffer[-len(TRAILER):]) != TRAILER:
+            raise ValueError("Data COPY binary terpotong (trailer tidak ditemukan)")
+        del self._buffer[-len(TRAILER):]
+        self._decode_rows()
+        if self._buffer:
+            raise ValueError("Sisa byte COPY binary tidak membentuk baris utuh")
+        arrays = {}
+        for name in self.fields:
+            chunks = self._chunks[name]
+            native = self.row_dtype[name].newbyteorder('=')
+            arrays[name] = np.concatenate(chunks) if chunks else np.empty(0, dtype=native)
+            chunks.clear()
+        return arrays
+
+def dates_from_pg(days):
+    """Hari sejak 2000-01-01 -> datetime64[s]"""
+    return (PG_EPOCH + days.astype('timedelta64[D]')).astype('datetime64[s]')
+
+def times_from_pg(micros):
+    """Mikrodetik sejak tengah malam -> timedelta64[us]"""
+    return micros.astype('timedelta64[us]')
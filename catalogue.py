@@ -0,0 +1,108 @@
+import numpy as np
+import pandas as pd
+
+from binary_fetch import dates_from_pg, times_from_pg
+from features import derive_features
+
+# ============================
+# Model data katalog di memori (tipe kolom ringkas)
+# ============================
+
+# Kolom dasar dan tipe ringkasnya. waktu_kejadian menggabungkan tanggal + waktu
+# menjadi satu datetime64; tanggal disimpan terpisah karena dipakai filter & grouping.
+CATALOG_DTYPES = {
+    'id': 'int32',
+    'waktu_kejadian': 'datetime64[s]',
+    'tanggal': 'datetime64[s]',
+    'latitude': 'float32',
+    'longitude': 'float32',
+    'depth': 'int16',
+    'magnitude': 'float32',
+    'remark': 'category',
+}
+
+def _finalize(columns):
+    """Membuat DataFrame bertipe ringkas dari dict kolom lalu menghitung kolom turunan"""
+    df = pd.DataFrame({
+        name: pd.Series(values).astype(CATALOG_DTYPES[name]) if name != 'remark'
+        else pd.Categorical(values)
+        for name, values in columns.items()
+    })
+    return derive_features(df)
+
+def from_rows(rows, columns):
+    """Membuat katalog ringkas dari hasil query psycopg2 (tanggal, waktu, Decimal, ...)"""
+    raw = dict(zip(columns, zip(*rows))) if rows else {col: () for col in columns}
+    tanggal = pd.to_datetime(pd.Series(raw['tanggal'], dtype=object))
+    waktu = pd.to_timedelta(pd.Series(raw['waktu'], dtype=object).astype(str))
+    result = {}
+    if 'id' in raw:
+        result['id'] = np.fromiter(raw['id'], dtype=np.int32, count=len(rows))
+    result['waktu_kejadian'] = tanggal + waktu
+    result['tanggal'] = tanggal
+    for col in ('latitude', 'longitude', 'magnitude'):
+        result[col] = np.fromiter((float(v) for v in raw[col]), dtype=np.float32, count=len(rows))
+    result['depth'] = np.fromiter(raw['depth'], dtype=np.int16, count=len(rows))
+    result['remark'] = raw['remark']
+    return _finalize(result)
+
+def from_arrays(arrays, remark_categories=()):
+    """Membuat katalog ringkas dari array COPY binary (config.view_catalogue_arrays)"""
+    result = {}
+    if 'id' in arrays:
+        result['id'] = arrays['id']
+    tanggal = dates_from_pg(arrays['tanggal'])
+    result['waktu_kejadian'] = (tanggal + times_from_pg(arrays['waktu'])).astype('datetime64[s]')
+    result['tanggal'] = tanggal
+    for col in ('latitude', 'longitude', 'magnitude', 'depth'):
+        result[col] = arrays[col]
+    # Kode dari database mulai 1; kategori diurutkan seperti pd.Categorical di from_rows
+    remark = pd.Categorical.from_codes(arrays['remark'] - 1, list(remark_categories))
+    result['remark'] = remark.reorder_categories(sorted(remark_categories))
+    return _finalize(result)
+
+def from_frame(df):
+    """Membuat katalog ringkas dari DataFrame (misal snapshot) yang sudah memuat kolom dasar"""
+    if 'waktu_kejadian' not in df.columns:
+        df = df.assign(waktu_kejadian=df['tanggal'] + pd.to_timedelta(df['waktu'].astype(str)))
+    if 'tanggal' not in df.columns:
+        df = df.assign(tanggal=df['waktu_kejadian'].dt.normalize())
+    columns = {col: df[col] for col in CATALOG_DTYPES if col in df.columns}
+    # Copy-on-write: kolom yang sudah bertipe benar (snapshot) tidak disalin ulang
+    result = pd.DataFrame({
+        col: values.astype(CATALOG_DTYPES[col]) for col, values in columns.items()
+    })
+    return derive_features(result)
+
+def filter_mask(df, filters):
+    """Mask boolean untuk filter sidebar pada katalog ringkas
+
+    Batas magnitude dibandingkan dalam float32 agar nilai tepat di batas (misal 2.4)
+    tidak hilang karena pembulatan float32 vs float64.
+    """
+    mask = np.ones(len(df), dtype=bool)
+    magnitude = df['magnitude'].to_numpy()
+    if filters.get('min_mag') is not None:
+        mask &= magnitude >= np.float32(filters['min_mag'])
+    if filters.get('max_mag') is not None:
+        mask &= magnitude <= np.float32(filters['max_mag'])
+    depth = df['depth'].to_numpy()
+    if filters.get('min_depth') is not None:
+        mask &= depth >= filters['min_depth']
+    if filters.get('max_depth') is not None:
+        mask &= depth <= filters['max_depth']
+    tanggal = df['tanggal'].to_numpy()
+    if filters.get('start_date') is not None:
+        mask &= tanggal >= np.datetime64(filters['start_date'], 's')
+    if filters.get('end_date') is not None:
+        mask &= tanggal <= np.datetime64(filters['end_date'], 's')
+    return mask
+
+def display_frame(df, columns):
+    """Salinan kecil untuk tabel: waktu_kejadian dipecah lagi menjadi tanggal & waktu teks"""
+    out = df[[c for c in columns if c in df.columns and c != 'waktu']].copy()
+    if 'waktu' in columns:
+        out.insert(list(columns).index('waktu'), 'waktu', df['waktu_kejadian'].dt.strftime('%H:%M:%S'))
+    if 'tanggal' in out.columns:
+        out['tanggal'] = out['tanggal'].dt.date
+    return out
@@ -0,0 +1,140 @@
+import numpy as np
+import pandas as pd
+from pandas.api.types import union_categoricals
+
+from features import DAY_ORDER
+from filter_index import FilterIndex
+
+# ============================
+# Store katalog bersama (read-only) untuk semua sesi dashboard
+# ============================
+
+class CatalogueStore:
+    """Katalog ringkas yang dibagi semua sesi Streamlit dalam satu proses
+
+    Store tidak pernah diubah setelah dibuat. Setiap sesi hanya menyimpan array
+    indeks baris hasil filter (select) lalu mengambil agregat atau kolom yang
+    dibutuhkan widget dari store, bukan menyalin seluruh DataFrame.
+    """
+
+    def __init__(self, df, version=None, source=''):
+        self.df = df
+        self.version = version
+        self.source = source
+        # Array kolom disiapkan sekali, dipakai ulang oleh semua sesi
+        self._arrays = {}
+        for col in df.columns:
+            values = df[col]
+            if isinstance(values.dtype, pd.CategoricalDtype):
+                arr = values.cat.codes.to_numpy()
+            else:
+                arr = values.to_numpy()
+            arr.flags.writeable = False
+            self._arrays[col] = arr
+        self.index = FilterIndex(df)
+
+    def extended(self, rows, version):
+        """Store baru berisi baris tambahan (ingest real-time) + isi store ini
+
+        Store lama tidak diubah; sesi yang masih memakainya tetap konsisten.
+        Baris baru yang lebih muda dari seluruh katalog cukup ditaruh di depan,
+        selain itu urutan waktu_kejadian DESC, id DESC disusun ulang.
+        """
+        if not len(rows):
+            # Batch kosong: kategori kosong bertipe object tidak bisa digabung
+            return CatalogueStore(self.df, version, self.source)
+        if 'gempa_susulan' in self.df.columns and 'gempa_susulan' not in rows.columns:
+            # Gempa baru belum di-decluster: dianggap gempa utama
+            rows = rows.assign(gempa_susulan=False)
+        rows = rows.sort_values(['waktu_kejadian', 'id'], ascending=False, kind='stable')
+        newest = self.df['waktu_kejadian'].max() if len(self.df) else None
+        parts = [rows, self.df[rows.columns]]
+        for col in rows.columns:
+            # Kategori baru (misal wilayah baru) digabung, kode lama tetap berlaku
+            if isinstance(rows[col].dtype, pd.CategoricalDtype) and not rows[col].dtype == self.df[col].dtype:
+                merged = union_categoricals([self.df[col], rows[col]], ignore_order=True)
+                categories = merged.categories
+                parts = [part.assign(**{col: part[col].cat.set_categories(categories)}) for part in parts]
+        df = pd.concat(parts, ignore_index=True)
+        if newest is not None and len(rows) and rows['waktu_kejadian'].min() < newest:
+            df = df.sort_values(['waktu_kejadian', 'id'], ascending=False, kind='stable', ignore_index=True)
+        return CatalogueStore(df, version, self.source)
+
+    def __len__(self):
+        return len(self.df)
+
+    def memory_usage(self):
+        """Ukuran store di memori (byte)"""
+        return int(self.df.memory_usage(deep=True).sum())
+
+    def bounds(self):
+        """Batas nilai slider, format sama dengan view_filter_bounds()"""
+        magnitude = self._arrays['magnitude']
+        depth = self._arrays['depth']
+        tanggal = self.df['tanggal']
+        return (
+            len(self), round(float(magnitude.min()), 1), round(float(magnitude.max()), 1),
+            int(depth.min()), int(depth.max()), tanggal.min().date(), tanggal.max().date()
+        )
+
+    def select(self, filters):
+        """Array indeks baris yang lolos filter sidebar (state per sesi)"""
+        return self.index.select(filters)
+
+    def take(self, idx, columns):
+        """DataFrame kecil berisi kolom yang diminta untuk baris terpilih"""
+        return self.df.iloc[idx, [self.df.columns.get_loc(c) for c in columns]]
+
+    def top(self, idx, column, n, columns):
+        """n baris dengan nilai kolom terbesar di antara baris terpilih"""
+        values = self._arrays[column][idx]
+        if len(values) > n:
+            part = np.argpartition(-values, n - 1)[:n]
+        else:
+            part = np.arange(len(values))
+        order = part[np.argsort(-values[part], kind='stable')]
+        return self.take(idx[order], columns)
+
+    def counts(self, column, idx):
+        """Jumlah baris terpilih per nilai kolom kategori / bilangan kecil (bincount)"""
+        values = self._arrays[column][idx]
+        dtype = self.df[column].dtype
+        if isinstance(dtype, pd.CategoricalDtype):
+            categories = dtype.categories
+            counts = np.bincount(values[values >= 0], minlength=len(categories))
+            return pd.Series(counts, index=categories, name='count')
+        counts = np.bincount(values.astype(np.int64))
+        present = np.flatnonzero(counts)
+        return pd.Series(counts[present], index=present, name='count')
+
+    def value_counts(self, column, idx):
+        """Seperti Series.value_counts(): urut dari jumlah terbanyak, tanpa nilai nol"""
+        counts = self.counts(column, idx)
+        return counts[counts > 0].sort_values(ascending=False, kind='stable')
+
+    def summary(self, idx):
+        """Ringkasan metrik, format sama dengan view_filtered_summary()"""
+        if len(idx) == 0:
+            return (0, None, None, None, None, 0)
+        magnitude = self._arrays['magnitude'][idx]
+        depth = self._arrays['depth'][idx]
+        regions = np.unique(self._arrays['remark'][idx]).size
+        return (
+            len(idx), float(magnitude.mean(dtype=np.float64)), float(magnitude.max()),
+            float(depth.mean(dtype=np.float64)), int(depth.max()), regions
+        )
+
+    def daily(self, idx):
+        """Jumlah dan rata-rata magnitude per hari untuk baris terpilih"""
+        days, inverse = np.unique(self._arrays['tanggal'][idx], return_inverse=True)
+        jumlah = np.bincount(inverse)
+        total_mag = np.bincount(inverse, weights=self._arrays['magnitude'][idx].astype(np.float64))
+        return pd.DataFrame({
+            'Tanggal': days,
+            'Jumlah Gempa': jumlah,
+            'Rata-rata Magnitude': total_mag / jumlah,
+        })
+
+    def weekdays(self, idx):
+        """Jumlah gempa per hari dalam seminggu (Senin-Minggu)"""
+        return self.counts('hari', idx).reindex(DAY_ORDER, fill_value=0)
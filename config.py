@@ -1,93 +1,321 @@
 import psycopg2
+import psycopg2.extensions
 import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
 import streamlit as st
 from dotenv import load_dotenv
+from binary_fetch import BinaryCopyDecoder
+from query_cache import QueryCache
+from query_stats import query_stats
+from spatial import bbox_around, cells_for_bbox, sql_haversine_km
 
 load_dotenv()
 
-# Variabel global untuk koneksi
-conn = None
-c = None
+# Konfigurasi connection pool (bisa diatur lewat .env)
+DB_POOL_MIN = int(os.getenv('DB_POOL_MIN', '1'))
+DB_POOL_MAX = int(os.getenv('DB_POOL_MAX', '10'))
+DB_POOL_TIMEOUT = float(os.getenv('DB_POOL_TIMEOUT', '30'))
+DB_STATEMENT_TIMEOUT_MS = int(os.getenv('DB_STATEMENT_TIMEOUT_MS', '30000'))
+DB_CONNECT_RETRIES = int(os.getenv('DB_CONNECT_RETRIES', '3'))
+# Koneksi yang menganggur lebih lama dari ini dicek dengan SELECT 1 sebelum dipakai
+DB_HEALTHCHECK_INTERVAL = float(os.getenv('DB_HEALTHCHECK_INTERVAL', '30'))
 
-def get_connection():
-    """Membuat atau mengembalikan koneksi database"""
-    global conn, c
-    if conn is None:
-        try:
-            # Debug: Cek .env terbaca atau tidak
-            print(f"🔍 DEBUG - DB_HOST dari .env: {os.getenv('DB_HOST')}")
-            print(f"🔍 DEBUG - DB_PORT dari .env: {os.getenv('DB_PORT')}")
-            print(f"🔍 DEBUG - DB_NAME dari .env: {os.getenv('DB_NAME')}")
-            
-            # Cek apakah ada st.secrets (untuk Streamlit Cloud)
-            use_secrets = False
+# Konfigurasi cache hasil query
+QUERY_CACHE_TTL = float(os.getenv('QUERY_CACHE_TTL', '300'))
+QUERY_CACHE_SIZE = int(os.getenv('QUERY_CACHE_SIZE', '128'))
+CATALOG_VERSION_CHECK_INTERVAL = float(os.getenv('CATALOG_VERSION_CHECK_INTERVAL', '10'))
+
+# Sumber data dashboard: auto (snapshot jika masih baru, selain itu database),
+# snapshot, atau database
+DASHBOARD_DATA_SOURCE = os.getenv('DASHBOARD_DATA_SOURCE', 'auto')
+
+def get_db_config():
+    """Membaca konfigurasi database dari st.secrets (Streamlit Cloud) atau .env"""
+    # Cek apakah ada st.secrets (untuk Streamlit Cloud)
+    use_secrets = False
+    try:
+        if hasattr(st, 'secrets') and 'DB_HOST' in st.secrets:
+            use_secrets = True
+            print("🔍 DEBUG - Menggunakan st.secrets")
+    except:
+        use_secrets = False
+        print("🔍 DEBUG - Menggunakan .env file")
+    
+    if use_secrets:
+        # Di Streamlit Cloud, gunakan st.secrets
+        return {
+            'host': st.secrets["DB_HOST"],
+            'port': int(st.secrets.get("DB_PORT", "5432")),
+            'database': st.secrets.get("DB_NAME", "postgres"),
+            'user': st.secrets.get("DB_USER", "postgres"),
+            'password': st.secrets["DB_PASSWORD"]
+        }
+
+    # Di local, gunakan .env - FORCE SUPABASE VALUES
+    db_host = os.getenv('DB_HOST')
+    if not db_host or db_host == 'localhost':
+        print("⚠️ WARNING: DB_HOST tidak terbaca atau masih localhost!")
+        st.warning("⚠️ File .env mungkin tidak terbaca. Menggunakan konfigurasi Supabase default.")
+        db_host = 'db.hpuczdikgdhrtqimoovt.supabase.co'
+    
+    return {
+        'host': db_host,
+        'port': int(os.getenv('DB_PORT', '5432')),
+        'database': os.getenv('DB_NAME', 'postgres'),
+        'user': os.getenv('DB_USER', 'postgres'),
+        'password': os.getenv('DB_PASSWORD', '0WiWduMkDzytHnL5')
+    }
+
+class PoolTimeout(Exception):
+    """Tidak ada koneksi pool yang tersedia dalam batas waktu"""
+
+class ConnectionPool:
+    """Pool koneksi PostgreSQL thread-safe dengan health check dan reconnect"""
+
+    def __init__(self, db_config, minconn=DB_POOL_MIN, maxconn=DB_POOL_MAX,
+                 statement_timeout_ms=DB_STATEMENT_TIMEOUT_MS, checkout_timeout=DB_POOL_TIMEOUT):
+        self.db_config = dict(db_config)
+        if statement_timeout_ms:
+            self.db_config['options'] = f"-c statement_timeout={statement_timeout_ms}"
+        self.minconn = minconn
+        self.maxconn = maxconn
+        self.checkout_timeout = checkout_timeout
+        self._idle = []  # list of (conn, waktu terakhir dipakai)
+        self._lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(maxconn)
+        self.reconnects = 0
+        for _ in range(minconn):
+            self._idle.append((self._connect(), time.monotonic()))
+
+    def _connect(self):
+        """Membuka koneksi baru, dicoba ulang dengan exponential backoff"""
+        delay = 0.5
+        for attempt in range(1, DB_CONNECT_RETRIES + 1):
             try:
-                if hasattr(st, 'secrets') and 'DB_HOST' in st.secrets:
-                    use_secrets = True
-                    print("🔍 DEBUG - Menggunakan st.secrets")
-            except:
-                use_secrets = False
-                print("🔍 DEBUG - Menggunakan .env file")
-            
-            if use_secrets:
-                # Di Streamlit Cloud, gunakan st.secrets
-                db_config = {
-                    'host': st.secrets["DB_HOST"],
-                    'port': int(st.secrets.get("DB_PORT", "5432")),
-                    'database': st.secrets.get("DB_NAME", "postgres"),
-                    'user': st.secrets.get("DB_USER", "postgres"),
-                    'password': st.secrets["DB_PASSWORD"]
-                }
-            else:
-                # Di local, gunakan .env - FORCE SUPABASE VALUES
-                db_host = os.getenv('DB_HOST')
-                if not db_host or db_host == 'localhost':
-                    print("⚠️ WARNING: DB_HOST tidak terbaca atau masih localhost!")
-                    st.warning("⚠️ File .env mungkin tidak terbaca. Menggunakan konfigurasi Supabase default.")
-                    db_host = 'db.hpuczdikgdhrtqimoovt.supabase.co'
-                
-                db_config = {
-                    'host': db_host,
-                    'port': int(os.getenv('DB_PORT', '5432')),
-                    'database': os.getenv('DB_NAME', 'postgres'),
-                    'user': os.getenv('DB_USER', 'postgres'),
-                    'password': os.getenv('DB_PASSWORD', '0WiWduMkDzytHnL5')
-                }
-            
-            # Debug info (tanpa password)
-            print(f"🔌 Connecting to: {db_config['user']}@{db_config['host']}:{db_config['port']}/{db_config['database']}")
-            st.info(f"🔌 Connecting: {db_config['user']}@{db_config['host']}:{db_config['port']}/{db_config['database']}")
-            
-            conn = psycopg2.connect(**db_config)
-            c = conn.cursor()
-            st.success("✅ Koneksi database berhasil!")
-            print("✓ Koneksi PostgreSQL berhasil!")
-            
-        except Exception as e:
-            print(f"✗ Error koneksi database: {e}")
-            st.error(f"❌ Gagal koneksi ke database: {e}")
-            st.info("💡 Pastikan database PostgreSQL sudah running dan konfigurasi sudah benar.")
+                return psycopg2.connect(**self.db_config)
+            except psycopg2.OperationalError as e:
+                if attempt == DB_CONNECT_RETRIES:
+                    raise
+                print(f"⚠️ Koneksi gagal (percobaan {attempt}): {e}. Coba lagi dalam {delay:.1f} detik")
+                time.sleep(delay)
+                delay *= 2
+
+    def _is_alive(self, conn, last_used):
+        """Liveness check: koneksi tertutup atau gagal SELECT 1 dianggap mati"""
+        if conn.closed:
+            return False
+        if time.monotonic() - last_used < DB_HEALTHCHECK_INTERVAL:
+            return True
+        try:
+            with conn.cursor() as cursor:
+                cursor.execute("SELECT 1")
+            conn.rollback()
+            return True
+        except psycopg2.Error:
+            return False
+
+    def getconn(self):
+        """Mengambil koneksi dari pool (menunggu jika semua sedang dipakai)"""
+        if not self._slots.acquire(timeout=self.checkout_timeout):
+            raise PoolTimeout(f"Semua {self.maxconn} koneksi sedang dipakai")
+        try:
+            while True:
+                with self._lock:
+                    item = self._idle.pop() if self._idle else None
+                if item is None:
+                    return self._connect()
+                conn, last_used = item
+                if self._is_alive(conn, last_used):
+                    return conn
+                self.reconnects += 1
+                self._close_quietly(conn)
+        except Exception:
+            self._slots.release()
+            raise
+
+    def putconn(self, conn, discard=False):
+        """Mengembalikan koneksi ke pool; koneksi rusak dibuang"""
+        try:
+            if discard or conn.closed:
+                self._close_quietly(conn)
+                return
+            # Transaksi yang gagal (aborted) direset agar tidak merusak query berikutnya
+            if conn.status != psycopg2.extensions.STATUS_READY:
+                conn.rollback()
+            with self._lock:
+                self._idle.append((conn, time.monotonic()))
+        except psycopg2.Error:
+            self._close_quietly(conn)
+        finally:
+            self._slots.release()
+
+    @staticmethod
+    def _close_quietly(conn):
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+    @contextmanager
+    def connection(self):
+        """Context manager: checkout koneksi, commit/rollback, lalu kembalikan ke pool"""
+        conn = self.getconn()
+        discard = False
+        try:
+            yield conn
+            conn.commit()
+        except psycopg2.extensions.QueryCanceledError:
+            # statement_timeout: koneksi masih sehat, cukup rollback
+            conn.rollback()
+            raise
+        except (psycopg2.OperationalError, psycopg2.InterfaceError):
+            discard = True
+            raise
+        except Exception:
+            if not conn.closed:
+                conn.rollback()
+            raise
+        finally:
+            self.putconn(conn, discard=discard)
+
+    @contextmanager
+    def cursor(self):
+        """Context manager: cursor baru per checkout"""
+        with self.connection() as conn:
+            with conn.cursor() as cursor:
+                yield cursor
+
+    def closeall(self):
+        with self._lock:
+            for conn, _ in self._idle:
+                self._close_quietly(conn)
+            self._idle = []
+
+    def stats(self):
+        with self._lock:
+            idle = len(self._idle)
+        return {'idle': idle, 'max': self.maxconn, 'reconnects': self.reconnects}
+
+_pool = None
+_pool_lock = threading.Lock()
+
+def get_pool():
+    """Membuat (sekali per proses) atau mengembalikan connection pool bersama"""
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                db_config = get_db_config()
+                print(f"🔌 Connecting to: {db_config['user']}@{db_config['host']}:{db_config['port']}/{db_config['database']}")
+                try:
+                    _pool = ConnectionPool(db_config)
+                    print(f"✓ Connection pool PostgreSQL siap (min {DB_POOL_MIN}, max {DB_POOL_MAX})")
+                except Exception as e:
+                    print(f"✗ Error koneksi database: {e}")
+                    st.error(f"❌ Gagal koneksi ke database: {e}")
+                    st.info("💡 Pastikan database PostgreSQL sudah running dan konfigurasi sudah benar.")
+                    raise
+    return _pool
+
+@contextmanager
+def get_cursor():
+    """Context manager cursor dari connection pool"""
+    with get_pool().cursor() as cursor:
+        yield cursor
+
+def explain_query(query, params=None):
+    """Rencana eksekusi EXPLAIN (ANALYZE, BUFFERS) sebagai teks (query dijalankan ulang)"""
+    with get_cursor() as cursor:
+        cursor.execute("EXPLAIN (ANALYZE, BUFFERS) " + query, params)
+        return "\n".join(row[0] for row in cursor.fetchall())
+
+def run_query(query, params=None, fetch='all', name=None):
+    """Menjalankan query lewat pool; dicoba sekali lagi jika koneksi terputus
+
+    Latensi (execute + fetch), jumlah baris dan perkiraan byte dicatat di
+    query_stats atas nama fungsi pemanggil (misal view_filtered_earthquakes).
+    """
+    name = name or sys._getframe(1).f_code.co_name
+    for attempt in (1, 2):
+        try:
+            with get_cursor() as cursor:
+                start = time.perf_counter()
+                cursor.execute(query, params)
+                executed = time.perf_counter()
+                result = cursor.fetchone() if fetch == 'one' else cursor.fetchall()
+                total_ms = query_stats.record(name, executed - start, time.perf_counter() - executed, result)
+            break
+        except psycopg2.extensions.QueryCanceledError as e:
+            query_stats.record_error(name, e)
             raise
-    return conn, c
+        except (psycopg2.OperationalError, psycopg2.InterfaceError) as e:
+            query_stats.record_error(name, e)
+            if attempt == 2:
+                raise
+            print("⚠️ Koneksi terputus, mencoba ulang query dengan koneksi baru")
+        except psycopg2.Error as e:
+            query_stats.record_error(name, e)
+            raise
+
+    if query_stats.should_explain(total_ms) and query.lstrip().upper().startswith(("SELECT", "WITH")):
+        try:
+            query_stats.add_plan(name, total_ms, explain_query(query, params))
+        except psycopg2.Error as e:
+            print(f"⚠️ EXPLAIN gagal untuk {name}: {e}")
+    return result
+
+# ============================
+# Cache hasil query
+# ============================
+
+def get_catalog_version():
+    """Mengambil versi katalog yang dinaikkan setiap kali import selesai"""
+    try:
+        row = run_query("SELECT versi FROM versi_katalog", fetch='one')
+    except psycopg2.Error as e:
+        # Tabel versi belum dibuat: cache tetap jalan dengan TTL saja
+        print(f"⚠️ Versi katalog tidak terbaca: {e}")
+        return None
+    return row[0] if row else None
+
+query_cache = QueryCache(
+    maxsize=QUERY_CACHE_SIZE,
+    ttl=QUERY_CACHE_TTL,
+    version_loader=get_catalog_version,
+    version_check_interval=CATALOG_VERSION_CHECK_INTERVAL
+)
+
+@query_cache.cached(ttl=CATALOG_VERSION_CHECK_INTERVAL)
+def view_catalog_version():
+    """Versi katalog, di-cache sebentar supaya tidak di-query setiap rerun"""
+    return get_catalog_version()
+
+def get_cache_stats():
+    """Counter hit/miss cache query"""
+    return query_cache.stats()
 
 # ============================
 # Fungsi ambil data dari tabel
 # ============================
 
-def view_all_earthquakes():
-    """Mengambil semua data gempa"""
-    _, cursor = get_connection()
-    query = '''
+@query_cache.cached
+def view_all_earthquakes(start_date=None, end_date=None):
+    """Mengambil semua data gempa (dalam rentang tanggal, default seluruh katalog)"""
+    where, params = _date_clause(*catalog_date_range(start_date, end_date))
+    query = f'''
         SELECT id, tanggal, waktu, latitude, longitude, depth, magnitude, remark
         FROM katalog_gempa
+        {where}
         ORDER BY tanggal DESC, waktu DESC
     '''
-    cursor.execute(query)
-    return cursor.fetchall()
+    return run_query(query, params)
 
+@query_cache.cached
 def view_statistics_by_month():
     """Mengambil statistik gempa per bulan"""
-    _, cursor = get_connection()
     query = '''
         SELECT 
             bulan,
@@ -98,56 +326,420 @@ def view_statistics_by_month():
         FROM statistik_gempa
         ORDER BY bulan DESC
     '''
-    cursor.execute(query)
-    return cursor.fetchall()
+    return run_query(query)
 
-def view_top_earthquakes(limit=10):
-    """Mengambil gempa dengan magnitude tertinggi"""
-    _, cursor = get_connection()
-    query = '''
+@query_cache.cached
+def view_top_earthquakes(limit=10, start_date=None, end_date=None):
+    """Mengambil gempa dengan magnitude tertinggi (dalam rentang tanggal, default seluruh katalog)"""
+    where, params = _date_clause(*catalog_date_range(start_date, end_date))
+    query = f'''
         SELECT tanggal, waktu, latitude, longitude, magnitude, remark
         FROM katalog_gempa
+        {where}
         ORDER BY magnitude DESC
         LIMIT %s
     '''
-    cursor.execute(query, (limit,))
-    return cursor.fetchall()
+    return run_query(query, params + [limit])
 
+@query_cache.cached
 def view_earthquakes_by_region():
     """Mengambil jumlah gempa per wilayah"""
-    _, cursor = get_connection()
     query = '''
-        SELECT remark, COUNT(*) as jumlah
-        FROM katalog_gempa
+        SELECT remark, SUM(jumlah) as jumlah
+        FROM rekap_wilayah_harian
         GROUP BY remark
         ORDER BY jumlah DESC
     '''
-    cursor.execute(query)
-    return cursor.fetchall()
+    return run_query(query)
 
-def view_earthquakes_by_magnitude_range(min_mag, max_mag):
-    """Mengambil gempa berdasarkan rentang magnitude"""
-    _, cursor = get_connection()
-    query = '''
+@query_cache.cached
+def view_earthquakes_by_magnitude_range(min_mag, max_mag, start_date=None, end_date=None):
+    """Mengambil gempa berdasarkan rentang magnitude (dalam rentang tanggal, default seluruh katalog)"""
+    start_date, end_date = catalog_date_range(start_date, end_date)
+    where, params = build_filter_clause({
+        'min_mag': min_mag, 'max_mag': max_mag, 'start_date': start_date, 'end_date': end_date
+    })
+    query = f'''
         SELECT id, tanggal, waktu, latitude, longitude, depth, magnitude, remark
         FROM katalog_gempa
-        WHERE magnitude BETWEEN %s AND %s
+        {where}
         ORDER BY magnitude DESC
     '''
-    cursor.execute(query, (min_mag, max_mag))
-    return cursor.fetchall()
+    return run_query(query, params)
 
-def view_earthquakes_by_depth_range(min_depth, max_depth):
-    """Mengambil gempa berdasarkan rentang kedalaman"""
-    _, cursor = get_connection()
-    query = '''
+@query_cache.cached
+def view_earthquakes_by_depth_range(min_depth, max_depth, start_date=None, end_date=None):
+    """Mengambil gempa berdasarkan rentang kedalaman (dalam rentang tanggal, default seluruh katalog)"""
+    start_date, end_date = catalog_date_range(start_date, end_date)
+    where, params = build_filter_clause({
+        'min_depth': min_depth, 'max_depth': max_depth, 'start_date': start_date, 'end_date': end_date
+    })
+    query = f'''
         SELECT id, tanggal, waktu, latitude, longitude, depth, magnitude, remark
         FROM katalog_gempa
-        WHERE depth BETWEEN %s AND %s
+        {where}
         ORDER BY depth DESC
     '''
-    cursor.execute(query, (min_depth, max_depth))
-    return cursor.fetchall()
+    return run_query(query, params)
+
+# ============================
+# Query dengan filter sidebar (server-side)
+# ============================
+
+# Kolom katalog yang boleh diminta oleh widget (whitelist untuk SELECT dinamis)
+KOLOM_GEMPA = ("id", "tanggal", "waktu", "latitude", "longitude", "depth", "magnitude", "remark")
+
+def _select_columns(columns):
+    """Memvalidasi daftar kolom terhadap whitelist KOLOM_GEMPA"""
+    columns = tuple(columns) if columns else KOLOM_GEMPA
+    invalid = [col for col in columns if col not in KOLOM_GEMPA]
+    if invalid:
+        raise ValueError(f"Kolom tidak dikenal: {', '.join(invalid)}")
+    return columns
+
+def build_filter_clause(filters):
+    """Membuat klausa WHERE + parameter dari filter sidebar
+
+    filters: dict dengan key opsional min_mag, max_mag, min_depth, max_depth,
+    start_date, end_date. Key yang bernilai None diabaikan. mainshock_only=True
+    membuang gempa susulan/pendahuluan hasil declustering.py.
+    """
+    filters = filters or {}
+    conditions = []
+    params = []
+    for key, condition in (
+        ('min_mag', 'magnitude >= %s'),
+        ('max_mag', 'magnitude <= %s'),
+        ('min_depth', 'depth >= %s'),
+        ('max_depth', 'depth <= %s'),
+        ('start_date', 'tanggal >= %s'),
+        ('end_date', 'tanggal <= %s'),
+    ):
+        if filters.get(key) is not None:
+            conditions.append(condition)
+            params.append(filters[key])
+    if filters.get('mainshock_only'):
+        conditions.append(
+            "NOT EXISTS (SELECT 1 FROM klaster_gempa k WHERE k.id = katalog_gempa.id AND NOT k.mainshock)"
+        )
+    where = "WHERE " + " AND ".join(conditions) if conditions else ""
+    return where, params
+
+@query_cache.cached
+def view_filter_bounds():
+    """Mengambil batas nilai slider (min/max magnitude, kedalaman, tanggal) dan total data"""
+    query = '''
+        SELECT COUNT(*), MIN(magnitude), MAX(magnitude), MIN(depth), MAX(depth),
+               MIN(tanggal), MAX(tanggal)
+        FROM katalog_gempa
+    '''
+    return run_query(query, fetch='one')
+
+def catalog_date_range(start_date=None, end_date=None):
+    """Melengkapi batas tanggal yang None dengan tanggal awal/akhir katalog
+
+    Query katalog_gempa selalu membawa predikat tanggal agar planner bisa
+    memangkas partisi; tanpa batas dari pemanggil, dipakai rentang seluruh katalog.
+    """
+    if start_date is None or end_date is None:
+        bounds = view_filter_bounds()
+        if bounds:
+            start_date = bounds[5] if start_date is None else start_date
+            end_date = bounds[6] if end_date is None else end_date
+    return start_date, end_date
+
+@query_cache.cached
+def view_filtered_summary(filters):
+    """Mengambil ringkasan metrik (jumlah, rata-rata, maksimum, wilayah) untuk data terfilter"""
+    where, params = build_filter_clause(filters)
+    query = f'''
+        SELECT COUNT(*), AVG(magnitude), MAX(magnitude), AVG(depth), MAX(depth),
+               COUNT(DISTINCT remark)
+        FROM katalog_gempa
+        {where}
+    '''
+    return run_query(query, params, fetch='one')
+
+@query_cache.cached
+def view_filtered_earthquakes(filters, columns=None):
+    """Mengambil data gempa terfilter, hanya kolom yang dibutuhkan widget"""
+    columns = _select_columns(columns)
+    where, params = build_filter_clause(filters)
+    query = f'''
+        SELECT {', '.join(columns)}
+        FROM katalog_gempa
+        {where}
+        ORDER BY tanggal DESC, waktu DESC, id DESC
+    '''
+    return run_query(query, params)
+
+@query_cache.cached
+def view_earthquakes_page(filters, columns=None, page_size=100, after=None):
+    """Mengambil satu halaman data terfilter dengan keyset pagination
+
+    after: tuple (tanggal, waktu, id) baris terakhir halaman sebelumnya, atau None
+    untuk halaman pertama. Kolom tanggal, waktu dan id selalu disertakan di depan
+    agar halaman berikutnya bisa dilanjutkan dari baris terakhir.
+    """
+    keys = ("tanggal", "waktu", "id")
+    columns = keys + tuple(col for col in _select_columns(columns) if col not in keys)
+    where, params = build_filter_clause(filters)
+    if after is not None:
+        # tanggal <= %s terpisah agar partisi setelah halaman ini tidak ikut dipindai
+        where = (where + " AND " if where else "WHERE ") + "tanggal <= %s AND (tanggal, waktu, id) < (%s, %s, %s)"
+        params = params + [after[0]] + list(after)
+    query = f'''
+        SELECT {', '.join(columns)}
+        FROM katalog_gempa
+        {where}
+        ORDER BY tanggal DESC, waktu DESC, id DESC
+        LIMIT %s
+    '''
+    return columns, run_query(query, params + [page_size])
+
+def view_catalog_changes(after_version, upto_version):
+    """Log perubahan (versi, jenis, min_id, max_id) antara dua versi katalog, tanpa cache"""
+    query = '''
+        SELECT versi, jenis, min_id, max_id
+        FROM perubahan_katalog
+        WHERE versi > %s AND versi <= %s
+        ORDER BY versi
+    '''
+    return run_query(query, [after_version, upto_version])
+
+def view_earthquakes_by_id_ranges(ranges):
+    """Baris katalog lengkap untuk rentang id [(min_id, max_id), ...], tanpa cache"""
+    if not ranges:
+        return []
+    conditions = " OR ".join(["id BETWEEN %s AND %s"] * len(ranges))
+    query = f'''
+        SELECT {', '.join(KOLOM_GEMPA)}
+        FROM katalog_gempa
+        WHERE {conditions}
+        ORDER BY tanggal DESC, waktu DESC, id DESC
+    '''
+    return run_query(query, [value for bounds in ranges for value in bounds])
+
+@query_cache.cached
+def view_aftershock_ids():
+    """id gempa susulan/pendahuluan (bukan gempa utama) hasil declustering.py"""
+    return [row[0] for row in run_query("SELECT id FROM klaster_gempa WHERE NOT mainshock")]
+
+# ============================
+# Fetch kolumnar (COPY binary) untuk hasil besar
+# ============================
+
+# Ekspresi SELECT dan tipe lebar-tetap tiap kolom di jalur COPY binary.
+# DECIMAL di-cast ke float8 dan remark dikirim sebagai kode int4.
+KOLOM_BINARY = {
+    'id': ('id', 'int4'),
+    'tanggal': ('tanggal', 'date'),
+    'waktu': ('waktu', 'time'),
+    'latitude': ('latitude::float8', 'float8'),
+    'longitude': ('longitude::float8', 'float8'),
+    'depth': ('depth', 'int4'),
+    'magnitude': ('magnitude::float8', 'float8'),
+    'remark': ('r.kode::int4', 'int4'),
+}
+
+@query_cache.cached
+def view_catalogue_arrays(filters=None, columns=None):
+    """Katalog terfilter sebagai array NumPy per kolom lewat COPY binary
+
+    Hasil dibaca per potongan (FETCH_CHUNK_ROWS) langsung ke array, tanpa tuple
+    dan objek Decimal/date/time per nilai. remark dikirim sebagai kode ke
+    daftar kategori yang dibaca di snapshot transaksi yang sama.
+    Mengembalikan (dict kolom -> array, list kategori remark).
+    """
+    columns = _select_columns(columns)
+    where, params = build_filter_clause(filters)
+    name = 'view_catalogue_arrays'
+    try:
+        with get_pool().connection() as conn:
+            with conn.cursor() as cursor:
+                start = time.perf_counter()
+                # Kategori dan data harus dari snapshot yang sama (ingest bisa berjalan di antaranya)
+                cursor.execute("SET TRANSACTION ISOLATION LEVEL REPEATABLE READ")
+                categories, join = [], ''
+                if 'remark' in columns:
+                    cursor.execute(f"SELECT DISTINCT remark FROM katalog_gempa {where}", params)
+                    categories = [row[0] for row in cursor.fetchall()]
+                    join = "JOIN unnest(%s::text[]) WITH ORDINALITY AS r(remark, kode) USING (remark)"
+                    params = [categories] + params
+                query = f'''
+                    SELECT {', '.join(KOLOM_BINARY[col][0] for col in columns)}
+                    FROM katalog_gempa
+                    {join}
+                    {where}
+                    ORDER BY tanggal DESC, waktu DESC, id DESC
+                '''
+                sql = cursor.mogrify(query, params).decode('utf-8')
+                decoder = BinaryCopyDecoder([(col, KOLOM_BINARY[col][1]) for col in columns])
+                executed = time.perf_counter()
+                cursor.copy_expert(f"COPY ({sql}) TO STDOUT WITH (FORMAT binary)", decoder)
+                arrays = decoder.result()
+                query_stats.record(
+                    name, executed - start, time.perf_counter() - executed, None,
+                    rows=decoder.rows, size=decoder.bytes_read
+                )
+    except psycopg2.Error as e:
+        query_stats.record_error(name, e)
+        raise
+    return arrays, categories
+
+# ============================
+# Query tabel rekap (rollup)
+# ============================
+
+def _date_clause(start_date, end_date, column="tanggal"):
+    """Klausa WHERE rentang tanggal untuk tabel rekap"""
+    conditions, params = [], []
+    if start_date is not None:
+        conditions.append(f"{column} >= %s")
+        params.append(start_date)
+    if end_date is not None:
+        conditions.append(f"{column} <= %s")
+        params.append(end_date)
+    where = "WHERE " + " AND ".join(conditions) if conditions else ""
+    return where, params
+
+@query_cache.cached
+def view_rollup_total():
+    """Total gempa menurut rekap_harian (untuk cek rekap sudah sinkron dengan katalog)"""
+    query = "SELECT COALESCE(SUM(jumlah), 0) FROM rekap_harian"
+    return run_query(query, fetch='one')[0]
+
+@query_cache.cached
+def view_rollup_daily(start_date=None, end_date=None):
+    """Mengambil jumlah dan rata-rata magnitude gempa per hari dari rekap"""
+    where, params = _date_clause(start_date, end_date)
+    query = f'''
+        SELECT tanggal, jumlah, total_magnitude / jumlah
+        FROM rekap_harian
+        {where}
+        ORDER BY tanggal
+    '''
+    return run_query(query, params)
+
+@query_cache.cached
+def view_rollup_regions(start_date=None, end_date=None, limit=None):
+    """Mengambil jumlah gempa per wilayah dari rekap"""
+    where, params = _date_clause(start_date, end_date)
+    query = f'''
+        SELECT remark, SUM(jumlah) as jumlah
+        FROM rekap_wilayah_harian
+        {where}
+        GROUP BY remark
+        ORDER BY jumlah DESC
+        LIMIT %s
+    '''
+    return run_query(query, params + [limit])
+
+@query_cache.cached
+def view_rollup_hours(start_date=None, end_date=None):
+    """Mengambil jumlah gempa per jam (0-23) dari rekap"""
+    where, params = _date_clause(start_date, end_date)
+    query = f'''
+        SELECT jam, SUM(jumlah)
+        FROM rekap_jam_harian
+        {where}
+        GROUP BY jam
+        ORDER BY jam
+    '''
+    return run_query(query, params)
+
+@query_cache.cached
+def view_rollup_categories(dimension, start_date=None, end_date=None):
+    """Mengambil jumlah gempa per kategori magnitude atau kedalaman dari rekap"""
+    if dimension not in ("kategori_magnitude", "kategori_kedalaman"):
+        raise ValueError(f"Dimensi kategori tidak dikenal: {dimension}")
+    where, params = _date_clause(start_date, end_date)
+    query = f'''
+        SELECT {dimension}, SUM(jumlah)
+        FROM rekap_kategori_harian
+        {where}
+        GROUP BY {dimension}
+    '''
+    return run_query(query, params)
+
+@query_cache.cached
+def view_rollup_weekdays(start_date=None, end_date=None):
+    """Mengambil jumlah gempa per hari dalam seminggu (1 = Senin) dari rekap"""
+    where, params = _date_clause(start_date, end_date)
+    query = f'''
+        SELECT EXTRACT(ISODOW FROM tanggal)::INTEGER as hari, SUM(jumlah)
+        FROM rekap_harian
+        {where}
+        GROUP BY hari
+        ORDER BY hari
+    '''
+    return run_query(query, params)
+
+# ============================
+# Query spasial (indeks sel grid)
+# ============================
+
+def _bbox_clause(min_lat, min_lon, max_lat, max_lon):
+    """Klausa bounding box: sel grid (indeks idx_sel_grid) + batas koordinat tepat"""
+    conditions = ["latitude BETWEEN %s AND %s", "longitude BETWEEN %s AND %s"]
+    params = [min_lat, max_lat, min_lon, max_lon]
+    cells = cells_for_bbox(min_lat, min_lon, max_lat, max_lon)
+    if cells is not None:
+        conditions.insert(0, "sel_grid = ANY(%s)")
+        params.insert(0, cells)
+    return conditions, params
+
+def _combine_where(filters, conditions, params):
+    """Menggabungkan filter sidebar dengan kondisi tambahan"""
+    where, filter_params = build_filter_clause(filters)
+    if conditions:
+        where = (where + " AND " if where else "WHERE ") + " AND ".join(conditions)
+    return where, filter_params + params
+
+@query_cache.cached
+def view_earthquakes_in_bbox(min_lat, min_lon, max_lat, max_lon, filters=None, columns=None, limit=None):
+    """Mengambil gempa di dalam bounding box (misal viewport peta)"""
+    columns = _select_columns(columns)
+    conditions, params = _bbox_clause(min_lat, min_lon, max_lat, max_lon)
+    where, params = _combine_where(filters, conditions, params)
+    query = f'''
+        SELECT {', '.join(columns)}
+        FROM katalog_gempa
+        {where}
+        ORDER BY magnitude DESC
+        LIMIT %s
+    '''
+    return run_query(query, params + [limit])
+
+@query_cache.cached
+def view_earthquakes_within_radius(lat, lon, radius_km, filters=None, columns=None, limit=None):
+    """Mengambil gempa dalam radius_km dari titik, kolom terakhir = jarak_km, urut terdekat"""
+    columns = _select_columns(columns)
+    conditions, params = _bbox_clause(*bbox_around(lat, lon, radius_km))
+    where, params = _combine_where(filters, conditions, params)
+    jarak = sql_haversine_km()
+    query = f'''
+        SELECT *
+        FROM (
+            SELECT {', '.join(columns)}, {jarak} as jarak_km
+            FROM katalog_gempa
+            {where}
+        ) kandidat
+        WHERE jarak_km <= %s
+        ORDER BY jarak_km
+        LIMIT %s
+    '''
+    return run_query(query, [lat, lat, lon] + params + [radius_km, limit])
+
+@query_cache.cached
+def view_nearest_earthquakes(lat, lon, n=10, filters=None, columns=None, max_radius_km=5000):
+    """Mengambil n gempa terdekat dari titik; radius pencarian diperbesar bertahap"""
+    radius_km = 50
+    while True:
+        rows = view_earthquakes_within_radius.uncached(lat, lon, radius_km, filters, columns, n)
+        if len(rows) >= n or radius_km >= max_radius_km:
+            return rows
+        radius_km = min(radius_km * 4, max_radius_km)
 
 class Config:
     """Konfigurasi database PostgreSQL (backward compatibility)"""
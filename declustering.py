@@ -0,0 +1,263 @@
+import argparse
+import io
+import json
+import math
+import os
+import sys
+import time
+from multiprocessing import Pool
+
+import numpy as np
+import pandas as pd
+
+from binary_fetch import dates_from_pg, times_from_pg
+from spatial import EARTH_RADIUS_KM, haversine_km
+
+# ============================
+# Declustering Gardner-Knopoff: memisahkan gempa utama dari gempa susulan/pendahuluan
+# ============================
+
+# Ukuran sel grid indeks spasial (derajat); jendela jarak GK M8 ~ 95 km
+DECLUSTER_CELL_DEG = float(os.getenv('DECLUSTER_CELL_DEG', '1.0'))
+# Katalog lebih kecil dari ini diproses di satu proses (overhead pool tidak sebanding)
+DECLUSTER_PARALLEL_MIN_EVENTS = int(os.getenv('DECLUSTER_PARALLEL_MIN_EVENTS', '200000'))
+
+KM_PER_DEGREE = math.pi * EARTH_RADIUS_KM / 180
+# Kunci sel tunggal (int64): baris * CELL_KEY_COLS + kolom (kolom digeser agar positif)
+CELL_KEY_COLS = 1 << 24
+KOLOM_DECLUSTER = ('id', 'tanggal', 'waktu', 'latitude', 'longitude', 'magnitude')
+
+def gk_distance_km(magnitude):
+    """Jendela jarak Gardner-Knopoff (1974), pendekatan van Stiphout dkk. (2012)"""
+    return 10 ** (0.1238 * np.asarray(magnitude, dtype=np.float64) + 0.983)
+
+def gk_time_days(magnitude):
+    """Jendela waktu Gardner-Knopoff (hari)"""
+    magnitude = np.asarray(magnitude, dtype=np.float64)
+    return np.where(magnitude >= 6.5, 10 ** (0.032 * magnitude + 2.7389), 10 ** (0.5409 * magnitude - 0.547))
+
+# ============================
+# Indeks waktu + grid spasial
+# ============================
+
+class Events:
+    """Array katalog untuk declustering: waktu (hari), koordinat, magnitude, dan peringkat kekuatan"""
+
+    def __init__(self, times, latitude, longitude, magnitude, cell_deg=DECLUSTER_CELL_DEG):
+        self.times = np.asarray(times, dtype=np.float64)
+        self.latitude = np.asarray(latitude, dtype=np.float64)
+        self.longitude = np.asarray(longitude, dtype=np.float64)
+        self.magnitude = np.asarray(magnitude, dtype=np.float64)
+        self.cell_deg = cell_deg
+        n = len(self.times)
+        # Peringkat 0 = magnitude terbesar; magnitude sama -> yang lebih awal lebih kuat
+        order = np.lexsort((self.times, -self.magnitude))
+        self.rank = np.empty(n, dtype=np.int64)
+        self.rank[order] = np.arange(n)
+        self.window_km = gk_distance_km(self.magnitude)
+        self.window_days = gk_time_days(self.magnitude)
+
+        # Grid: event diurutkan per (sel, waktu), jadi isi satu sel adalah potongan
+        # berurutan dengan waktu naik yang bisa dicari dengan searchsorted
+        self.row = np.floor(self.latitude / cell_deg).astype(np.int64)
+        self.col = np.floor(self.longitude / cell_deg).astype(np.int64)
+        key = self.row * CELL_KEY_COLS + (self.col + CELL_KEY_COLS // 2)
+        self.order = np.lexsort((self.times, key))
+        self.sorted_times = self.times[self.order]
+        cells, starts = np.unique(key[self.order], return_index=True)
+        ends = np.append(starts[1:], n)
+        self.cells = dict(zip(cells.tolist(), zip(starts.tolist(), ends.tolist())))
+
+    def __len__(self):
+        return len(self.times)
+
+    def neighbour_cells(self, key, reach_km):
+        """Kunci sel (yang berisi event) dalam jangkauan reach_km dari sel key"""
+        row, col = divmod(key, CELL_KEY_COLS)
+        col -= CELL_KEY_COLS // 2
+        lat_reach = math.ceil(reach_km / KM_PER_DEGREE / self.cell_deg)
+        # Satu derajat bujur makin pendek ke arah kutub: pakai lintang terjauh dari ekuator
+        max_lat = min(max(abs(row - lat_reach), abs(row + lat_reach + 1)) * self.cell_deg, 89.0)
+        lon_reach = math.ceil(reach_km / (KM_PER_DEGREE * math.cos(math.radians(max_lat))) / self.cell_deg)
+        lon_reach = min(lon_reach, math.ceil(180 / self.cell_deg))
+        for dr in range(-lat_reach, lat_reach + 1):
+            for dc in range(-lon_reach, lon_reach + 1):
+                neighbour = (row + dr) * CELL_KEY_COLS + (col + dc + CELL_KEY_COLS // 2)
+                if neighbour in self.cells:
+                    yield neighbour
+
+def window_pairs(events, source_cells):
+    """Pasangan (sumber, anggota) dengan anggota di jendela GK sumber yang lebih kuat
+
+    Untuk setiap sel sumber hanya sel tetangga dalam jangkauan jarak yang dicek,
+    dan di setiap sel hanya potongan waktu [t - T, t + T] (searchsorted), jadi
+    biaya sebanding jumlah pasangan di dalam jendela, bukan n^2. Jendela waktu
+    simetris: gempa pendahuluan (foreshock) ikut masuk klaster gempa yang lebih kuat.
+    """
+    sources, members = [], []
+    for key in source_cells:
+        start, end = events.cells[key]
+        src = events.order[start:end]
+        src_times = events.times[src]
+        src_days = events.window_days[src]
+        for neighbour in events.neighbour_cells(key, events.window_km[src].max()):
+            n_start, n_end = events.cells[neighbour]
+            times = events.sorted_times[n_start:n_end]
+            lo = np.searchsorted(times, src_times - src_days, side='left')
+            hi = np.searchsorted(times, src_times + src_days, side='right')
+            counts = hi - lo
+            total = int(counts.sum())
+            if total == 0:
+                continue
+            # Rentang [lo, hi) per sumber dijadikan satu array pasangan tanpa loop Python
+            pair_src = np.repeat(src, counts)
+            offsets = np.arange(total) - np.repeat(np.cumsum(counts) - counts, counts) + np.repeat(lo, counts)
+            pair_dst = events.order[n_start + offsets]
+            keep = events.rank[pair_src] < events.rank[pair_dst]
+            pair_src, pair_dst = pair_src[keep], pair_dst[keep]
+            distance = haversine_km(
+                events.latitude[pair_src], events.longitude[pair_src],
+                events.latitude[pair_dst], events.longitude[pair_dst]
+            )
+            keep = distance <= events.window_km[pair_src]
+            sources.append(pair_src[keep])
+            members.append(pair_dst[keep])
+    if not sources:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+    return np.concatenate(sources), np.concatenate(members)
+
+# ============================
+# Pool proses
+# ============================
+
+_worker_events = None
+
+def _init_worker(events):
+    global _worker_events
+    _worker_events = events
+
+def _worker_pairs(source_cells):
+    return window_pairs(_worker_events, source_cells)
+
+def decluster(events, workers=None):
+    """Klaster GK untuk semua event: (klaster, mainshock)
+
+    klaster: indeks gempa utama klaster untuk setiap event; gempa utama dan
+    event tanpa pasangan adalah klaster sendiri. mainshock: True untuk gempa
+    utama dan gempa independen, False untuk gempa susulan/pendahuluan.
+    """
+    cells = list(events.cells)
+    if workers is None:
+        workers = (os.cpu_count() or 1) if len(events) >= DECLUSTER_PARALLEL_MIN_EVENTS else 1
+    if workers > 1 and len(cells) > 1:
+        # Sel dibagi bergantian supaya sel padat tersebar ke semua worker
+        chunks = [cells[i::workers * 4] for i in range(workers * 4)]
+        with Pool(workers, initializer=_init_worker, initargs=(events,)) as pool:
+            parts = pool.map(_worker_pairs, [chunk for chunk in chunks if chunk])
+        sources = np.concatenate([part[0] for part in parts])
+        members = np.concatenate([part[1] for part in parts])
+    else:
+        sources, members = window_pairs(events, cells)
+
+    # Seperti GK berurutan (magnitude menurun): gempa yang sudah ditandai susulan
+    # tidak membuka jendela sendiri. mainshock[j] = tidak ada gempa utama yang lebih
+    # kuat yang jendelanya memuat j. Pasangan selalu menunjuk ke gempa yang lebih
+    # kuat, jadi iterasi vektor ini tepat setelah paling banyak sepanjang rantai terpanjang.
+    mainshock = np.ones(len(events), dtype=bool)
+    while True:
+        flagged = np.zeros(len(events), dtype=bool)
+        flagged[members[mainshock[sources]]] = True
+        if np.array_equal(~flagged, mainshock):
+            break
+        mainshock = ~flagged
+
+    # Susulan masuk klaster gempa utama terkuat yang jendelanya memuatnya
+    cluster = np.arange(len(events))
+    active = mainshock[sources]
+    sources, members = sources[active], members[active]
+    order = np.lexsort((events.rank[sources], members))
+    sources, members = sources[order], members[order]
+    first = np.ones(len(members), dtype=bool)
+    first[1:] = members[1:] != members[:-1]
+    cluster[members[first]] = sources[first]
+    return cluster, mainshock
+
+# ============================
+# Katalog dari database & simpan hasil
+# ============================
+
+def load_events(cell_deg=DECLUSTER_CELL_DEG):
+    """Katalog lengkap dari database (COPY binary): (id, Events)"""
+    from config import view_catalogue_arrays
+
+    arrays, _ = view_catalogue_arrays.uncached(None, KOLOM_DECLUSTER)
+    waktu = dates_from_pg(arrays['tanggal']) + times_from_pg(arrays['waktu'])
+    times = waktu.astype('datetime64[s]').astype(np.int64) / 86400.0
+    return arrays['id'], Events(times, arrays['latitude'], arrays['longitude'], arrays['magnitude'], cell_deg)
+
+def save_clusters(conn, ids, cluster, mainshock):
+    """Menulis ulang tabel klaster_gempa lalu menaikkan versi katalog (cache & store dashboard dimuat ulang)"""
+    from live_catalogue import LIVE_CHANNEL
+
+    buffer = io.StringIO()
+    pd.DataFrame({'id': ids, 'klaster_id': ids[cluster], 'mainshock': mainshock}).to_csv(buffer, index=False, header=False)
+    buffer.seek(0)
+    cursor = conn.cursor()
+    try:
+        cursor.execute("TRUNCATE klaster_gempa")
+        cursor.copy_expert(
+            "COPY klaster_gempa (id, klaster_id, mainshock) FROM STDIN WITH (FORMAT csv)", buffer
+        )
+        cursor.execute("""
+            UPDATE versi_katalog
+            SET versi = versi + 1, updated_at = CURRENT_TIMESTAMP
+            RETURNING versi
+        """)
+        versi = cursor.fetchone()[0]
+        cursor.execute("SELECT pg_notify(%s, %s)", (LIVE_CHANNEL, json.dumps({'versi': versi})))
+        conn.commit()
+        return versi
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cursor.close()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Declustering Gardner-Knopoff katalog gempa")
+    parser.add_argument("--workers", type=int, default=None,
+                        help=f"Jumlah proses (default: semua CPU jika >= {DECLUSTER_PARALLEL_MIN_EVENTS:,} gempa)")
+    parser.add_argument("--cell-deg", type=float, default=DECLUSTER_CELL_DEG,
+                        help="Ukuran sel grid indeks spasial (derajat)")
+    parser.add_argument("--dry-run", action="store_true", help="Hanya hitung, tidak menulis ke database")
+    args = parser.parse_args()
+
+    print("=== Declustering Gardner-Knopoff ===\n")
+    conn = None
+    if not args.dry_run:
+        from import_data import connect_db
+
+        # Koneksi untuk menyimpan hasil dicek dulu, sebelum memuat dan menghitung seluruh katalog
+        conn = connect_db()
+        if not conn:
+            sys.exit(1)
+    try:
+        start = time.perf_counter()
+        ids, events = load_events(args.cell_deg)
+        loaded = time.perf_counter()
+        print(f"✓ {len(events):,} gempa dimuat ({loaded - start:.1f} detik)")
+        cluster, mainshock = decluster(events, args.workers)
+        done = time.perf_counter()
+        sizes = np.bincount(cluster, minlength=len(events))
+        print(f"✓ Declustering selesai ({done - loaded:.1f} detik, {len(events.cells):,} sel grid)")
+        print(f"  Gempa utama/independen : {int(mainshock.sum()):,}")
+        print(f"  Susulan/pendahuluan    : {int((~mainshock).sum()):,}")
+        print(f"  Klaster (>= 2 gempa)   : {int((sizes >= 2).sum()):,} (terbesar {int(sizes.max()) if len(sizes) else 0:,} gempa)")
+        if args.dry_run:
+            print("⚠️ --dry-run: hasil tidak disimpan")
+        else:
+            versi = save_clusters(conn, ids, cluster, mainshock)
+            print(f"✓ Tabel klaster_gempa diperbarui, versi katalog {versi}")
+    finally:
+        if conn:
+            conn.close()
@@ -0,0 +1,73 @@
+import json
+
+import pandas as pd
+import plotly.express as px
+import streamlit as st
+
+from config import get_cache_stats, get_pool
+from query_stats import query_stats
+
+# ============================
+# Halaman diagnostik tersembunyi (buka dashboard dengan ?diagnostik=1)
+# ============================
+
+KOLOM_RINGKASAN = [
+    'calls', 'errors', 'slow', 'mean_ms', 'p50_ms', 'p95_ms', 'max_ms',
+    'execute_ms', 'fetch_ms', 'total_ms', 'rows', 'bytes'
+]
+
+def stats_frame(entries):
+    """Tabel ringkasan per query/tahap, urut dari total waktu terbesar"""
+    if not entries:
+        return pd.DataFrame(columns=KOLOM_RINGKASAN)
+    df = pd.DataFrame.from_dict(entries, orient='index')
+    return df[[col for col in KOLOM_RINGKASAN if col in df.columns]].sort_values('total_ms', ascending=False)
+
+def render_page():
+    """Menampilkan statistik query, tahap Python, pool, dan cache untuk proses ini"""
+    st.title("🩺 Diagnostik Query")
+    data = query_stats.snapshot()
+    st.caption(
+        f"Dicatat sejak {data['started_at']} | Query lambat ≥ {data['slow_query_ms']:.0f} ms | "
+        f"EXPLAIN otomatis: {'aktif' if data['explain_slow_queries'] else 'nonaktif'}"
+    )
+
+    col_dump, col_reset = st.columns([3, 1])
+    with col_dump:
+        st.download_button(
+            label="⬇️ Download statistik (JSON)",
+            data=json.dumps(data, indent=2, default=str).encode('utf-8'),
+            file_name=f"query_stats_{data['generated_at'].replace(':', '')}.json",
+            mime='application/json'
+        )
+    with col_reset:
+        if st.button("🔄 Reset statistik"):
+            query_stats.reset()
+            st.rerun()
+
+    st.markdown("### 🗄️ Query database")
+    queries = stats_frame(data['queries'])
+    st.dataframe(queries, use_container_width=True)
+
+    if not queries.empty:
+        nama = st.selectbox("Detail query", list(queries.index))
+        detail = data['queries'][nama]
+        histogram = pd.Series(detail['histogram'])
+        fig = px.bar(
+            x=histogram.index,
+            y=histogram.values,
+            title=f'Histogram Latensi {nama}',
+            labels={'x': 'Latensi', 'y': 'Jumlah Query'}
+        )
+        st.plotly_chart(fig, use_container_width=True)
+        if detail['last_error']:
+            st.error(f"Error terakhir: {detail['last_error']}")
+        for plan in reversed(detail['plans']):
+            st.markdown(f"**EXPLAIN** {plan['at']} ({plan['latency_ms']:.0f} ms)")
+            st.code(plan['plan'], language='text')
+
+    st.markdown("### 🐍 Tahap di Python")
+    st.dataframe(stats_frame(data['stages']), use_container_width=True)
+
+    st.markdown("### 🔌 Pool & Cache")
+    st.json({'pool': get_pool().stats(), 'cache': get_cache_stats()})
@@ -0,0 +1,250 @@
+import hashlib
+import json
+import os
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # pyarrow opsional: tanpa pyarrow export Parquet tidak tersedia
+    pa = None
+
+from config import _select_columns, build_filter_clause, get_pool
+from query_stats import query_stats
+
+# ============================
+# Export data terfilter (CSV / Parquet / GeoJSON) secara streaming ke file
+# ============================
+
+# Folder file export; file dipakai ulang selama versi katalog + filter + kolom + format sama
+EXPORT_DIR = os.getenv('EXPORT_DIR', 'exports')
+# Baris per potongan saat membaca store / server-side cursor
+EXPORT_CHUNK_ROWS = int(os.getenv('EXPORT_CHUNK_ROWS', '50000'))
+# Jumlah file export yang disimpan; file terlama dihapus
+EXPORT_MAX_FILES = int(os.getenv('EXPORT_MAX_FILES', '20'))
+
+# format -> (ekstensi, MIME)
+FORMATS = {
+    'csv': ('csv', 'text/csv'),
+    'parquet': ('parquet', 'application/vnd.apache.parquet'),
+    'geojson': ('geojson', 'application/geo+json'),
+}
+
+# Presisi kolom desimal di file export, sama untuk store (float32) dan database
+# (DECIMAL): 4 desimal masih di bawah resolusi float32 untuk koordinat.
+# CSV ditulis dengan jumlah desimal tetap, sama seperti ROUND() di PostgreSQL
+PRESISI_EXPORT = {'latitude': 4, 'longitude': 4, 'magnitude': 1}
+
+# Tipe kolom Parquet; dipakai juga untuk file kosong agar skemanya tetap lengkap
+TIPE_PARQUET = {
+    'id': 'int64',
+    'tanggal': 'date32',
+    'waktu': 'string',
+    'latitude': 'float64',
+    'longitude': 'float64',
+    'depth': 'int64',
+    'magnitude': 'float64',
+    'remark': 'string',
+}
+
+def available_formats():
+    """Format yang bisa dipakai di lingkungan ini"""
+    return [fmt for fmt in FORMATS if fmt != 'parquet' or pa is not None]
+
+def export_key(fmt, filters, columns, version, source):
+    """Key file export: berubah jika versi katalog, filter, kolom, format, atau sumber berubah"""
+    payload = json.dumps(
+        {'format': fmt, 'filters': filters, 'columns': list(columns), 'version': version, 'source': source},
+        sort_keys=True, default=str
+    )
+    return hashlib.sha1(payload.encode('utf-8')).hexdigest()[:16]
+
+def export_path(key, fmt, export_dir=EXPORT_DIR):
+    return os.path.join(export_dir, f"katalog_gempa_{key}.{FORMATS[fmt][0]}")
+
+def _prune(export_dir=EXPORT_DIR, keep=EXPORT_MAX_FILES):
+    files = [
+        os.path.join(export_dir, name) for name in os.listdir(export_dir)
+        if name.startswith('katalog_gempa_') and not name.endswith('.tmp')
+    ]
+    files.sort(key=os.path.getmtime, reverse=True)
+    for path in files[keep:]:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+# ============================
+# Sumber potongan data
+# ============================
+
+def store_has_columns(store, columns):
+    needed = {'waktu_kejadian' if col == 'waktu' else col for col in columns}
+    return needed.issubset(store.df.columns)
+
+def iter_store_chunks(store, idx, columns, chunk_rows=EXPORT_CHUNK_ROWS):
+    """Potongan DataFrame dari store bersama (urutan sama dengan query database)"""
+    source_columns = ['waktu_kejadian' if col == 'waktu' else col for col in columns]
+    for start in range(0, len(idx), chunk_rows):
+        part = store.take(idx[start:start + chunk_rows], source_columns)
+        chunk = pd.DataFrame(index=range(len(part)))
+        for col, source in zip(columns, source_columns):
+            values = part[source].reset_index(drop=True)
+            if col == 'waktu':
+                values = values.dt.strftime('%H:%M:%S')
+            elif col in PRESISI_EXPORT:
+                values = values.astype('float64').round(PRESISI_EXPORT[col])
+            elif col in ('id', 'depth'):
+                # Tipe sama dengan hasil dari database (INTEGER -> int64)
+                values = values.astype('int64')
+            elif col == 'remark':
+                values = values.astype(str)
+            chunk[col] = values
+        yield chunk
+
+def _filtered_query(filters, columns):
+    columns = _select_columns(columns)
+    where, params = build_filter_clause(filters)
+    # Dibulatkan di database agar nilai dan teks CSV sama dengan jalur store
+    select = [
+        f"ROUND({col}, {PRESISI_EXPORT[col]}) AS {col}" if col in PRESISI_EXPORT else col
+        for col in columns
+    ]
+    query = f'''
+        SELECT {', '.join(select)}
+        FROM katalog_gempa
+        {where}
+        ORDER BY tanggal DESC, waktu DESC, id DESC
+    '''
+    return columns, query, params
+
+def iter_db_chunks(filters, columns, chunk_rows=EXPORT_CHUNK_ROWS):
+    """Potongan DataFrame dari server-side cursor (memori dibatasi per potongan)"""
+    columns, query, params = _filtered_query(filters, columns)
+    with get_pool().connection() as conn:
+        with conn.cursor(name='export_katalog') as cursor:
+            cursor.itersize = chunk_rows
+            cursor.execute(query, params)
+            while True:
+                rows = cursor.fetchmany(chunk_rows)
+                if not rows:
+                    break
+                chunk = pd.DataFrame(rows, columns=columns)
+                for col in PRESISI_EXPORT:
+                    if col in chunk.columns:
+                        chunk[col] = chunk[col].astype('float64')
+                if 'tanggal' in chunk.columns:
+                    chunk['tanggal'] = pd.to_datetime(chunk['tanggal'])
+                if 'waktu' in chunk.columns:
+                    chunk['waktu'] = chunk['waktu'].astype(str)
+                yield chunk
+
+def copy_csv_from_db(filters, columns, f):
+    """CSV langsung dari PostgreSQL (COPY ... TO STDOUT) ke file, tanpa objek Python per baris"""
+    columns, query, params = _filtered_query(filters, columns)
+    with get_pool().connection() as conn:
+        with conn.cursor() as cursor:
+            sql = cursor.mogrify(query, params).decode('utf-8')
+            cursor.copy_expert(f"COPY ({sql}) TO STDOUT WITH (FORMAT csv, HEADER)", f)
+
+# ============================
+# Penulis format
+# ============================
+
+def write_csv(chunks, f, columns):
+    written = False
+    for chunk in chunks:
+        chunk = chunk.assign(**{
+            col: np.char.mod(f'%.{digits}f', chunk[col].to_numpy())
+            for col, digits in PRESISI_EXPORT.items() if col in chunk.columns
+        })
+        chunk.to_csv(f, index=False, header=not written, date_format='%Y-%m-%d')
+        written = True
+    if not written:
+        # Seleksi kosong: header saja, sama seperti COPY ... HEADER
+        pd.DataFrame(columns=list(columns)).to_csv(f, index=False)
+
+def parquet_schema(columns):
+    """Skema Parquet export untuk kolom yang dipilih (urutan sama)"""
+    return pa.schema([(col, getattr(pa, TIPE_PARQUET[col])()) for col in columns])
+
+def write_parquet(chunks, path, columns):
+    schema = parquet_schema(columns)
+    with pq.ParquetWriter(path, schema, compression='zstd') as writer:
+        # Seleksi kosong tetap menghasilkan file valid dengan skema lengkap tanpa baris
+        for chunk in chunks:
+            writer.write_table(pa.Table.from_pandas(chunk[list(columns)], preserve_index=False).cast(schema))
+
+def write_geojson(chunks, f, columns):
+    """FeatureCollection Point; properti = kolom yang dipilih"""
+    f.write('{"type": "FeatureCollection", "features": [\n')
+    first = True
+    for chunk in chunks:
+        coords = np.column_stack([chunk['longitude'].to_numpy(), chunk['latitude'].to_numpy()]).tolist()
+        props = chunk[list(columns)]
+        if 'tanggal' in props.columns:
+            props = props.assign(tanggal=props['tanggal'].dt.strftime('%Y-%m-%d'))
+        for coord, properties in zip(coords, props.to_dict('records')):
+            feature = {'type': 'Feature', 'geometry': {'type': 'Point', 'coordinates': coord}, 'properties': properties}
+            f.write(('' if first else ',\n') + json.dumps(feature, default=str))
+            first = False
+    f.write('\n]}\n')
+
+# ============================
+# Export
+# ============================
+
+def find_export(fmt, filters, columns, version, source, export_dir=EXPORT_DIR):
+    """Path file export yang sudah ada untuk state ini, atau None"""
+    path = export_path(export_key(fmt, filters, columns, version, source), fmt, export_dir)
+    return path if os.path.exists(path) else None
+
+def export_selection(fmt, filters, columns, version, store=None, idx=None, export_dir=EXPORT_DIR):
+    """Menulis seleksi terfilter ke file (streaming per potongan); mengembalikan path file
+
+    Store dipakai jika memuat semua kolom yang diminta, selain itu data dibaca
+    dari database: CSV lewat COPY TO STDOUT, format lain lewat server-side cursor.
+    File yang sudah ada untuk versi katalog + filter + kolom + format yang sama dipakai ulang.
+    """
+    if fmt not in available_formats():
+        raise ValueError(f"Format export tidak tersedia: {fmt}")
+    columns = list(columns)
+    use_store = store is not None and idx is not None and store_has_columns(store, columns)
+    source = 'store' if use_store else 'database'
+    path = export_path(export_key(fmt, filters, columns, version, source), fmt, export_dir)
+    if os.path.exists(path):
+        os.utime(path)
+        return path
+
+    os.makedirs(export_dir, exist_ok=True)
+    # GeoJSON butuh koordinat meski tidak dipilih sebagai kolom
+    read_columns = columns + [col for col in ('latitude', 'longitude') if fmt == 'geojson' and col not in columns]
+    if use_store:
+        chunks = iter_store_chunks(store, idx, read_columns)
+    elif fmt != 'csv':
+        chunks = iter_db_chunks(filters, read_columns)
+
+    # File sementara unik per pemanggilan: sesi lain bisa menulis export yang sama bersamaan
+    fd, tmp_path = tempfile.mkstemp(dir=export_dir, prefix=os.path.basename(path) + '.', suffix='.tmp')
+    os.close(fd)
+    with query_stats.measure(f"export:{fmt} ({source})"):
+        try:
+            if fmt == 'parquet':
+                write_parquet(chunks, tmp_path, read_columns)
+            else:
+                with open(tmp_path, 'w', encoding='utf-8', newline='') as f:
+                    if fmt == 'geojson':
+                        write_geojson(chunks, f, columns)
+                    elif use_store:
+                        write_csv(chunks, f, columns)
+                    else:
+                        copy_csv_from_db(filters, columns, f)
+            os.replace(tmp_path, path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+    _prune(export_dir)
+    return path
@@ -0,0 +1,42 @@
+import numpy as np
+import pandas as pd
+
+# ============================
+# Kolom turunan katalog (dihitung sekali per versi katalog)
+# ============================
+
+# Batas kategori harus sama dengan SQL_KATEGORI_* di rollups.py
+MAGNITUDE_EDGES = [3.0, 4.0, 5.0]
+MAGNITUDE_LABELS = ["Kecil (< 3.0)", "Sedang (3.0-4.0)", "Besar (4.0-5.0)", "Sangat Besar (≥ 5.0)"]
+DEPTH_EDGES = [50, 100, 200, 300]
+DEPTH_LABELS = ['0-50 km', '50-100 km', '100-200 km', '200-300 km', '300+ km']
+DAY_ORDER = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
+
+FEATURE_COLUMNS = ['kategori_magnitude', 'kategori_kedalaman', 'jam', 'hari', 'bulan']
+
+def _categorical(codes, labels):
+    """Categorical dari kode bin tanpa membuat string per baris"""
+    return pd.Categorical.from_codes(codes, categories=labels, ordered=True)
+
+def magnitude_class(magnitude):
+    """Kategori magnitude; batas bawah inklusif (3.0 masuk 'Sedang')"""
+    codes = np.searchsorted(np.float32(MAGNITUDE_EDGES), np.asarray(magnitude, dtype=np.float32), side='right')
+    return _categorical(codes, MAGNITUDE_LABELS)
+
+def depth_band(depth):
+    """Rentang kedalaman; batas atas inklusif (50 km masuk '0-50 km')"""
+    codes = np.searchsorted(DEPTH_EDGES, np.asarray(depth), side='left')
+    return _categorical(codes, DEPTH_LABELS)
+
+def derive_features(df):
+    """Menambahkan kategori magnitude/kedalaman, jam, hari, dan bulan ke katalog ringkas"""
+    waktu = df['waktu_kejadian'].to_numpy()
+    tanggal = df['tanggal'].to_numpy().astype('datetime64[D]')
+    df['kategori_magnitude'] = magnitude_class(df['magnitude'].to_numpy())
+    df['kategori_kedalaman'] = depth_band(df['depth'].to_numpy())
+    # Jam dari selisih terhadap awal hari, tanpa parsing teks waktu
+    df['jam'] = ((waktu - waktu.astype('datetime64[D]')) // np.timedelta64(1, 'h')).astype(np.int8)
+    # 1970-01-01 adalah hari Kamis (indeks 3 di DAY_ORDER)
+    df['hari'] = _categorical(((tanggal.astype(np.int64) + 3) % 7).astype(np.int8), DAY_ORDER)
+    df['bulan'] = tanggal.astype('datetime64[M]').astype('datetime64[s]')
+    return df
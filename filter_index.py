@@ -0,0 +1,105 @@
+import numpy as np
+
+# ============================
+# Indeks filter slider (magnitude, kedalaman, tanggal) untuk store katalog
+# ============================
+
+# Kolom filter sidebar: (kunci batas bawah, kunci batas atas, konversi nilai filter)
+FILTER_COLUMNS = {
+    'magnitude': ('min_mag', 'max_mag', np.float32),
+    'depth': ('min_depth', 'max_depth', int),
+    'tanggal': ('start_date', 'end_date', lambda d: np.datetime64(d, 's')),
+}
+
+class FilterIndex:
+    """Indeks terurut per kolom filter, dibangun sekali per versi katalog
+
+    Setiap rentang slider diselesaikan dengan binary search (searchsorted) menjadi
+    potongan array posisi baris. Rentang paling sempit dipakai sebagai kandidat,
+    kolom lain hanya dicek untuk kandidat tersebut, jadi biaya filter sebanding
+    dengan jumlah baris yang cocok, bukan ukuran katalog.
+    """
+
+    def __init__(self, df):
+        self.size = len(df)
+        # Penanda gempa susulan (declustering.py) untuk filter mainshock_only, jika ada
+        self.aftershock = df['gempa_susulan'].to_numpy() if 'gempa_susulan' in df.columns else None
+        self.rows = np.arange(self.size, dtype=np.int64)
+        self.rows.flags.writeable = False
+        self.values = {}
+        self.sorted_values = {}
+        self.order = {}
+        self.row_ordered = {}
+        for col in FILTER_COLUMNS:
+            values = df[col].to_numpy()
+            values.flags.writeable = False
+            self.values[col] = values
+            if np.all(values[:-1] <= values[1:]):
+                # Kolom sudah urut naik (misal tanggal): posisi baris = urutan indeks
+                order, self.row_ordered[col] = self.rows, 'asc'
+            elif np.all(values[:-1] >= values[1:]):
+                # Urut turun (snapshot diurutkan tanggal DESC): cukup dibalik
+                order, self.row_ordered[col] = self.rows[::-1], 'desc'
+            else:
+                order, self.row_ordered[col] = np.argsort(values, kind='stable'), None
+            self.order[col] = order
+            self.sorted_values[col] = values[order]
+
+    def _range(self, col, filters):
+        """Potongan [lo, hi) pada urutan kolom untuk batas filter, None jika tidak membatasi"""
+        low_key, high_key, convert = FILTER_COLUMNS[col]
+        ordered = self.sorted_values[col]
+        lo, hi = 0, self.size
+        if filters.get(low_key) is not None:
+            lo = int(np.searchsorted(ordered, convert(filters[low_key]), side='left'))
+        if filters.get(high_key) is not None:
+            hi = int(np.searchsorted(ordered, convert(filters[high_key]), side='right'))
+        if lo == 0 and hi == self.size:
+            return None
+        return lo, max(lo, hi)
+
+    def select(self, filters):
+        """Posisi baris (urut naik) yang lolos semua filter
+
+        Tanpa filter aktif, atau jika hanya kolom yang sudah urut yang membatasi,
+        hasilnya view dari array posisi baris (tanpa salinan).
+        """
+        candidates = self._select_ranges(filters)
+        if filters.get('mainshock_only') and self.aftershock is not None:
+            candidates = candidates[~self.aftershock[candidates]]
+        return candidates
+
+    def _select_ranges(self, filters):
+        ranges = {}
+        for col in FILTER_COLUMNS:
+            bounds = self._range(col, filters)
+            if bounds is not None:
+                ranges[col] = bounds
+        if not ranges:
+            return self.rows
+
+        driver = min(ranges, key=lambda c: ranges[c][1] - ranges[c][0])
+        lo, hi = ranges.pop(driver)
+        candidates = self.order[driver][lo:hi]
+        if self.row_ordered[driver] == 'desc':
+            candidates = candidates[::-1]
+
+        for col, (c_lo, c_hi) in ranges.items():
+            if len(candidates) == 0:
+                break
+            ordered = self.sorted_values[col]
+            values = self.values[col][candidates]
+            candidates = candidates[(values >= ordered[c_lo]) & (values <= ordered[c_hi - 1])] \
+                if c_hi > c_lo else candidates[:0]
+
+        if self.row_ordered[driver] is None:
+            candidates = self._sorted_positions(candidates)
+        return candidates
+
+    def _sorted_positions(self, candidates):
+        """Mengembalikan kandidat ke urutan baris katalog (bitset untuk hasil besar)"""
+        if len(candidates) * 16 < self.size:
+            return np.sort(candidates)
+        bitset = np.zeros(self.size, dtype=bool)
+        bitset[candidates] = True
+        return np.flatnonzero(bitset)
@@ -1,7 +1,25 @@
 import psycopg2
+import psycopg2.errors
+import psycopg2.extras
+import argparse
 import csv
-from datetime import datetime
+import io
+import json
+import os
+from datetime import date, datetime
 from config import Config
+from rollups import refresh_rollups
+from partitions import ensure_partitions
+import snapshot
+
+# Konfigurasi bulk import
+BATCH_SIZE = 5000
+CHECKPOINT_FILE = "import_checkpoint.json"
+REJECTED_FILE = "rejected_rows.csv"
+
+KOLOM_KATALOG = ("tanggal", "waktu", "latitude", "longitude", "depth", "magnitude", "remark")
+# Kunci alami satu kejadian gempa (lihat constraint uq_katalog_event di schema.sql)
+KUNCI_EVENT = ("tanggal", "waktu", "latitude", "longitude", "magnitude")
 
 def connect_db():
     """Membuat koneksi ke database"""
@@ -16,60 +34,379 @@ def connect_db():
 def parse_date(date_str):
     """Mengkonversi format tanggal dari CSV"""
     # Format: 1/1/2018 -> 2018-01-01
-    parts = date_str.split('/')
-    month, day, year = int(parts[0]), int(parts[1]), int(parts[2])
-    return f"{year:04d}-{month:02d}-{day:02d}"
+    month, day, year = (int(part) for part in date_str.split('/'))
+    # date() menolak tanggal yang tidak ada (misal 13/45/2018)
+    return date(year, month, day).isoformat()
 
 def parse_time(time_str):
     """Mengkonversi format waktu dari CSV"""
     # Format: 22.48.13 -> 22:48:13
-    return time_str.replace('.', ':')
+    return datetime.strptime(time_str, '%H.%M.%S').strftime('%H:%M:%S')
+
+def parse_row(row):
+    """Mengkonversi satu baris CSV menjadi tuple kolom katalog_gempa"""
+    # DictReader: kolom lebih -> key None, kolom kurang -> nilai None
+    if None in row or None in row.values():
+        raise ValueError("jumlah kolom tidak sesuai")
+    return (
+        parse_date(row['tgl']),
+        parse_time(row['ot']),
+        float(row['lat']),
+        float(row['lon']),
+        int(row['depth']),
+        float(row['mag']),
+        row['remark'],
+    )
+
+# ============================
+# Checkpoint & baris yang ditolak
+# ============================
+
+def load_checkpoint(csv_file, checkpoint_file=CHECKPOINT_FILE):
+    """Membaca jumlah baris CSV yang sudah diproses, tanggal yang sudah dimuat,
+    dan ukuran file baris ditolak saat checkpoint ditulis (None jika tidak tercatat)"""
+    if not os.path.exists(checkpoint_file):
+        return 0, set(), None
+    try:
+        with open(checkpoint_file, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return 0, set(), None
+    # Checkpoint hanya berlaku untuk file CSV yang sama
+    if data.get('csv_file') != os.path.abspath(csv_file):
+        return 0, set(), None
+    return int(data.get('rows_done', 0)), set(data.get('dates', [])), data.get('rejected_bytes')
+
+def save_checkpoint(csv_file, rows_done, dates=(), checkpoint_file=CHECKPOINT_FILE, rejected_bytes=None):
+    """Menyimpan jumlah baris CSV yang sudah di-commit ke database"""
+    tmp_file = checkpoint_file + ".tmp"
+    with open(tmp_file, 'w', encoding='utf-8') as f:
+        json.dump({
+            'csv_file': os.path.abspath(csv_file),
+            'rows_done': rows_done,
+            # Tanggal yang sudah dimuat, agar rekap tetap di-refresh setelah resume
+            'dates': sorted(dates),
+            # Posisi akhir file baris ditolak untuk baris yang sudah diproses
+            'rejected_bytes': rejected_bytes,
+            'updated_at': datetime.now().isoformat(timespec='seconds'),
+        }, f)
+    os.replace(tmp_file, checkpoint_file)
+
+def clear_checkpoint(checkpoint_file=CHECKPOINT_FILE):
+    """Menghapus checkpoint setelah import selesai"""
+    if os.path.exists(checkpoint_file):
+        os.remove(checkpoint_file)
+
+class RejectedRowWriter:
+    """Menulis baris CSV yang gagal diparse ke file terpisah
+
+    append + offset: melanjutkan dari checkpoint; isi file setelah offset
+    (baris ditolak yang ditulis setelah checkpoint terakhir) dibuang agar
+    tidak tercatat dua kali saat baris yang sama diparse ulang.
+    """
+
+    def __init__(self, path, fieldnames, append=False, offset=None):
+        self.path = path
+        self.fieldnames = list(fieldnames) + ['line', 'error']
+        self.count = 0
+        self._file = None
+        self._writer = None
+        self._append = append
+        if append and offset is not None and os.path.exists(path) and os.path.getsize(path) > offset:
+            os.truncate(path, offset)
+
+    def position(self):
+        """Ukuran file saat ini (byte), disimpan bersama checkpoint"""
+        if self._file is not None:
+            self._file.flush()
+            return self._file.tell()
+        if self._append and os.path.exists(self.path):
+            return os.path.getsize(self.path)
+        return 0
+
+    def write(self, line_no, row, error):
+        if self._writer is None:
+            write_header = not (self._append and os.path.exists(self.path) and os.path.getsize(self.path) > 0)
+            self._file = open(self.path, 'a' if self._append else 'w', encoding='utf-8', newline='')
+            self._writer = csv.DictWriter(self._file, fieldnames=self.fieldnames, extrasaction='ignore')
+            if write_header:
+                self._writer.writeheader()
+        record = dict(row)
+        record['line'] = line_no
+        record['error'] = str(error)
+        self._writer.writerow(record)
+        self.count += 1
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+            self._writer = None
+
+# ============================
+# Loader batch: COPY & execute_values
+# ============================
+
+def copy_rows(cursor, rows, table="katalog_gempa"):
+    """Memasukkan batch baris menggunakan COPY FROM STDIN"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerows(rows)
+    buffer.seek(0)
+    cursor.copy_expert(
+        f"COPY {table} ({', '.join(KOLOM_KATALOG)}) FROM STDIN WITH (FORMAT csv)",
+        buffer
+    )
+
+def create_staging(cursor, staging):
+    """Tabel sementara berkolom katalog, di-drop otomatis saat commit"""
+    cursor.execute(f"""
+        CREATE TEMP TABLE {staging} (
+            tanggal DATE NOT NULL,
+            waktu TIME NOT NULL,
+            latitude DECIMAL(10, 6) NOT NULL,
+            longitude DECIMAL(10, 6) NOT NULL,
+            depth INTEGER NOT NULL,
+            magnitude DECIMAL(3, 1) NOT NULL,
+            remark VARCHAR(255) NOT NULL
+        ) ON COMMIT DROP
+    """)
 
-def import_csv_to_db(csv_file):
-    """Import data dari CSV ke database"""
+def copy_new_rows(cursor, rows, staging="staging_batch"):
+    """COPY batch ke staging lalu pindahkan ke katalog_gempa; kejadian yang sudah ada dilewati
+
+    Mengembalikan jumlah baris yang benar-benar ditambahkan.
+    """
+    create_staging(cursor, staging)
+    copy_rows(cursor, rows, table=staging)
+    kolom = ', '.join(KOLOM_KATALOG)
+    cursor.execute(f"""
+        INSERT INTO katalog_gempa ({kolom})
+        SELECT {kolom} FROM {staging}
+        ON CONFLICT ({', '.join(KUNCI_EVENT)}) DO NOTHING
+    """)
+    return cursor.rowcount
+
+def insert_rows(cursor, rows):
+    """Memasukkan batch baris menggunakan execute_values (fallback COPY); kejadian yang sudah ada dilewati"""
+    inserted = psycopg2.extras.execute_values(
+        cursor,
+        f"""
+        INSERT INTO katalog_gempa ({', '.join(KOLOM_KATALOG)}) VALUES %s
+        ON CONFLICT ({', '.join(KUNCI_EVENT)}) DO NOTHING
+        RETURNING 1
+        """,
+        rows,
+        page_size=1000,
+        fetch=True
+    )
+    return len(inserted)
+
+def write_batch(conn, rows, method):
+    """Menulis satu batch lalu commit; mengembalikan (metode yang dipakai, jumlah baris baru)
+
+    Kejadian yang sudah ada di katalog (uq_katalog_event), misal data sample
+    dari schema.sql atau import ulang, dilewati tanpa membatalkan import.
+    """
+    cursor = conn.cursor()
+    try:
+        # Partisi tahun/bulan yang belum ada dibuat (dan di-commit) sebelum data ditulis
+        ensure_partitions(cursor, {row[0] for row in rows})
+        conn.commit()
+        if method == 'copy':
+            try:
+                inserted = copy_new_rows(cursor, rows)
+            except (psycopg2.errors.InsufficientPrivilege, psycopg2.errors.FeatureNotSupported) as e:
+                # Pooler/role tidak mengizinkan COPY -> pakai execute_values;
+                # error data/constraint diteruskan apa adanya
+                print(f"⚠️ COPY gagal ({e}), beralih ke execute_values")
+                conn.rollback()
+                method = 'values'
+        if method == 'values':
+            inserted = insert_rows(cursor, rows)
+        conn.commit()
+    finally:
+        cursor.close()
+    return method, inserted
+
+def finalize_import(conn, dates=None):
+    """Langkah setelah data baru ter-commit: refresh rekap, naikkan versi katalog, tulis snapshot
+
+    dates: tanggal kejadian yang terkena import (None = rebuild semua rekap).
+    Versi katalog yang naik membuat cache dan snapshot lama di dashboard kadaluarsa.
+    """
+    cursor = conn.cursor()
+    try:
+        start = datetime.now()
+        refresh_rollups(cursor, dates)
+        cursor.execute("""
+            UPDATE versi_katalog
+            SET versi = versi + 1, updated_at = CURRENT_TIMESTAMP
+        """)
+        conn.commit()
+        jumlah = "semua" if dates is None else len(dates)
+        print(f"✓ Rekap diperbarui untuk {jumlah} tanggal ({(datetime.now() - start).total_seconds():.1f} detik)")
+    except psycopg2.Error as e:
+        conn.rollback()
+        print(f"⚠️ Rekap/versi katalog tidak diperbarui: {e}")
+        return
+    finally:
+        cursor.close()
+
+    # Snapshot kolumnar untuk cold start dashboard; gagal di sini tidak membatalkan import
+    if snapshot.is_available():
+        try:
+            snapshot.write_snapshot(conn)
+        except Exception as e:
+            print(f"⚠️ Snapshot tidak ditulis: {e}")
+
+def iter_csv_batches(csv_file, batch_size, skip_rows=0, rejected=None):
+    """Membaca CSV dan menghasilkan (jumlah baris dibaca, batch baris valid)"""
+    with open(csv_file, 'r', encoding='utf-8') as file:
+        csv_reader = csv.DictReader(file)
+        batch = []
+        consumed = 0
+        for row in csv_reader:
+            # Nomor baris fisik di file (baris kosong ikut dihitung)
+            line_no = csv_reader.line_num
+            consumed += 1
+            if consumed <= skip_rows:
+                continue
+            try:
+                batch.append(parse_row(row))
+            except Exception as e:
+                if rejected is not None:
+                    rejected.write(line_no, row, e)
+            if len(batch) >= batch_size:
+                yield consumed, batch
+                batch = []
+        yield consumed, batch
+
+def import_csv_to_db(csv_file, method='copy', batch_size=BATCH_SIZE, resume=True,
+                     checkpoint_file=CHECKPOINT_FILE, rejected_file=REJECTED_FILE):
+    """Import data dari CSV ke database secara bulk (COPY / execute_values)"""
     conn = connect_db()
     if not conn:
         return
-    
-    cursor = conn.cursor()
-    
+
+    skip_rows, dates, rejected_bytes = load_checkpoint(csv_file, checkpoint_file) if resume else (0, set(), None)
+    if skip_rows:
+        print(f"↻ Melanjutkan import dari baris data ke-{skip_rows + 1}")
+
+    with open(csv_file, 'r', encoding='utf-8') as file:
+        fieldnames = next(csv.reader(file))
+    rejected = RejectedRowWriter(rejected_file, fieldnames, append=skip_rows > 0, offset=rejected_bytes)
+
+    count = 0
+    skipped = 0
+    start = datetime.now()
     try:
-        with open(csv_file, 'r', encoding='utf-8') as file:
-            csv_reader = csv.DictReader(file)
-            
-            count = 0
-            for row in csv_reader:
-                try:
-                    tanggal = parse_date(row['tgl'])
-                    waktu = parse_time(row['ot'])
-                    latitude = float(row['lat'])
-                    longitude = float(row['lon'])
-                    depth = int(row['depth'])
-                    magnitude = float(row['mag'])
-                    remark = row['remark']
-                    
-                    cursor.execute("""
-                        INSERT INTO katalog_gempa 
-                        (tanggal, waktu, latitude, longitude, depth, magnitude, remark)
-                        VALUES (%s, %s, %s, %s, %s, %s, %s)
-                    """, (tanggal, waktu, latitude, longitude, depth, magnitude, remark))
-                    
-                    count += 1
-                    if count % 100 == 0:
-                        print(f"✓ {count} data berhasil diimport...")
-                        
-                except Exception as e:
-                    print(f"✗ Error pada baris: {row}")
-                    print(f"  Detail error: {e}")
-                    continue
-            
-            conn.commit()
-            print(f"\n✓ Total {count} data berhasil diimport ke database!")
-            
+        for consumed, batch in iter_csv_batches(csv_file, batch_size, skip_rows, rejected):
+            if batch:
+                method, inserted = write_batch(conn, batch, method)
+                count += inserted
+                skipped += len(batch) - inserted
+                dates.update(row[0] for row in batch)
+                print(f"✓ {count} data berhasil diimport...")
+            # Checkpoint hanya ditulis setelah batch ter-commit
+            save_checkpoint(csv_file, consumed, dates, checkpoint_file, rejected.position())
+
+        if dates:
+            finalize_import(conn, dates)
+        clear_checkpoint(checkpoint_file)
+        elapsed = (datetime.now() - start).total_seconds()
+        print(f"\n✓ Total {count} data berhasil diimport ke database! ({elapsed:.1f} detik, metode: {method})")
+        if skipped:
+            print(f"  {skipped} baris dilewati (kejadian sudah ada)")
+        if rejected.count:
+            print(f"⚠️ {rejected.count} baris ditolak, lihat {rejected_file}")
+
     except Exception as e:
         print(f"✗ Error saat import data: {e}")
+        print(f"💡 Jalankan ulang untuk melanjutkan dari checkpoint {checkpoint_file}")
         conn.rollback()
     finally:
+        rejected.close()
+        conn.close()
+
+# ============================
+# Import incremental (upsert)
+# ============================
+
+def upsert_staging(cursor, staging="staging_katalog"):
+    """Memindahkan baris staging ke katalog_gempa; mengembalikan (inserted, updated, tanggal)"""
+    kolom = ', '.join(KOLOM_KATALOG)
+    kunci = ', '.join(KUNCI_EVENT)
+    # Kejadian baru dihitung sebelum upsert: kunci staging yang belum ada di katalog
+    cursor.execute(f"""
+        SELECT COUNT(*)
+        FROM (SELECT DISTINCT {kunci} FROM {staging}) s
+        WHERE NOT EXISTS (
+            SELECT 1 FROM katalog_gempa k
+            WHERE {' AND '.join(f'k.{k} = s.{k}' for k in KUNCI_EVENT)}
+        )
+    """)
+    inserted = cursor.fetchone()[0]
+    cursor.execute(f"""
+        INSERT INTO katalog_gempa ({kolom})
+        SELECT DISTINCT ON ({kunci}) {kolom}
+        FROM {staging}
+        ORDER BY {kunci}
+        ON CONFLICT ({kunci}) DO UPDATE
+        SET depth = EXCLUDED.depth,
+            remark = EXCLUDED.remark
+        WHERE (katalog_gempa.depth, katalog_gempa.remark)
+              IS DISTINCT FROM (EXCLUDED.depth, EXCLUDED.remark)
+        RETURNING tanggal
+    """)
+    # Baris yang ditulis = kejadian baru + kejadian lama yang berubah
+    hasil = cursor.fetchall()
+    dates = {tanggal for tanggal, in hasil}
+    return inserted, len(hasil) - inserted, dates
+
+def upsert_csv_to_db(csv_file, batch_size=BATCH_SIZE, rejected_file=REJECTED_FILE):
+    """Import incremental: hanya kejadian baru/berubah yang ditulis ke katalog_gempa"""
+    conn = connect_db()
+    if not conn:
+        return
+
+    with open(csv_file, 'r', encoding='utf-8') as file:
+        fieldnames = next(csv.reader(file))
+    rejected = RejectedRowWriter(rejected_file, fieldnames)
+
+    cursor = conn.cursor()
+    staged = 0
+    start = datetime.now()
+    try:
+        # Satu transaksi: staging -> upsert -> commit, staging otomatis di-drop
+        create_staging(cursor, "staging_katalog")
+        for _, batch in iter_csv_batches(csv_file, batch_size, rejected=rejected):
+            if batch:
+                copy_rows(cursor, batch, table="staging_katalog")
+                staged += len(batch)
+
+        cursor.execute("SELECT DISTINCT tanggal FROM staging_katalog")
+        ensure_partitions(cursor, [row[0] for row in cursor.fetchall()])
+        inserted, updated, dates = upsert_staging(cursor)
+        conn.commit()
+        if dates:
+            finalize_import(conn, dates)
+
+        skipped = staged - inserted - updated
+        elapsed = (datetime.now() - start).total_seconds()
+        print(f"\n✓ Upsert selesai dalam {elapsed:.1f} detik")
+        print(f"  Baru     : {inserted}")
+        print(f"  Berubah  : {updated}")
+        print(f"  Dilewati : {skipped} (sudah ada / duplikat)")
+        if rejected.count:
+            print(f"⚠️ {rejected.count} baris ditolak, lihat {rejected_file}")
+        return {'inserted': inserted, 'updated': updated, 'skipped': skipped}
+
+    except Exception as e:
+        print(f"✗ Error saat upsert data: {e}")
+        conn.rollback()
+    finally:
+        rejected.close()
         cursor.close()
         conn.close()
 
@@ -121,11 +458,26 @@ def query_example():
         conn.close()
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Import data gempa dari CSV ke PostgreSQL")
+    parser.add_argument("csv_file", nargs="?", default="katalog_gempa_new.csv")
+    parser.add_argument("--method", choices=["copy", "values"], default="copy",
+                        help="copy = COPY FROM STDIN, values = execute_values")
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE,
+                        help="Jumlah baris per commit")
+    parser.add_argument("--no-resume", action="store_true",
+                        help="Abaikan checkpoint dan import dari awal")
+    parser.add_argument("--mode", choices=["append", "upsert"], default="append",
+                        help="append = tambah semua baris, upsert = hanya kejadian baru/berubah")
+    args = parser.parse_args()
+
     print("=== Program Import Data Gempa ===\n")
     
     # Import data dari CSV
-    csv_file = "katalog_gempa_new.csv"
-    import_csv_to_db(csv_file)
+    if args.mode == "upsert":
+        upsert_csv_to_db(args.csv_file, batch_size=args.batch_size)
+    else:
+        import_csv_to_db(args.csv_file, method=args.method, batch_size=args.batch_size,
+                         resume=not args.no_resume)
     
     # Contoh query
     query_example()
@@ -0,0 +1,442 @@
+import argparse
+import asyncio
+import csv
+import json
+import os
+import random
+import signal
+import time
+import urllib.request
+from datetime import date, datetime
+
+import psycopg2
+import psycopg2.extras
+
+import snapshot
+from import_data import KOLOM_KATALOG, KUNCI_EVENT, connect_db, parse_row
+from live_catalogue import LIVE_CHANNEL
+from partitions import ensure_partitions
+from rollups import refresh_rollups
+
+# ============================
+# Daemon ingest real-time: folder drop + endpoint HTTP lokal -> micro-batch -> NOTIFY
+# ============================
+
+# Folder yang dipantau; file .csv (format katalog_gempa_new.csv), .json, atau .jsonl
+INGEST_DROP_DIR = os.getenv('INGEST_DROP_DIR', 'incoming')
+INGEST_HTTP_HOST = os.getenv('INGEST_HTTP_HOST', '127.0.0.1')
+INGEST_HTTP_PORT = int(os.getenv('INGEST_HTTP_PORT', '8765'))
+# Micro-batch ditulis saat berisi sekian event atau event tertua sudah menunggu sekian detik
+INGEST_BATCH_SIZE = int(os.getenv('INGEST_BATCH_SIZE', '500'))
+INGEST_MAX_DELAY = float(os.getenv('INGEST_MAX_DELAY', '1.0'))
+# Interval memindai folder drop (detik)
+INGEST_SCAN_SECONDS = float(os.getenv('INGEST_SCAN_SECONDS', '1.0'))
+# Snapshot kolumnar ditulis ulang paling sering sekali per interval ini (detik)
+INGEST_SNAPSHOT_INTERVAL = float(os.getenv('INGEST_SNAPSHOT_INTERVAL', '300'))
+# Event yang menunggu di antrean; penerima menunggu jika penuh (backpressure)
+INGEST_QUEUE_SIZE = int(os.getenv('INGEST_QUEUE_SIZE', '10000'))
+# Batas isi request HTTP (byte)
+MAX_BODY_BYTES = 10 * 1024 * 1024
+
+# ============================
+# Validasi event
+# ============================
+
+def validate_event(event):
+    """Event (dict) -> tuple kolom katalog_gempa; ValueError jika tidak valid
+
+    Menerima kunci format CSV BMKG (tgl, ot, lat, lon, depth, mag, remark) atau
+    nama kolom tabel (tanggal YYYY-MM-DD, waktu HH:MM:SS, latitude, ...).
+    """
+    if 'tgl' in event:
+        row = parse_row(event)
+    else:
+        row = (
+            date.fromisoformat(str(event['tanggal'])).isoformat(),
+            datetime.strptime(str(event['waktu']), '%H:%M:%S').strftime('%H:%M:%S'),
+            float(event['latitude']),
+            float(event['longitude']),
+            int(event['depth']),
+            float(event['magnitude']),
+            str(event['remark']),
+        )
+    tanggal, waktu, latitude, longitude, depth, magnitude, remark = row
+    if not -90 <= latitude <= 90 or not -180 <= longitude <= 180:
+        raise ValueError(f"koordinat di luar jangkauan: {latitude}, {longitude}")
+    if not 0 <= depth <= 800:
+        raise ValueError(f"kedalaman tidak wajar: {depth}")
+    if not 0 <= magnitude <= 10:
+        raise ValueError(f"magnitude tidak wajar: {magnitude}")
+    remark = remark.strip()
+    if not remark or len(remark) > 255:
+        raise ValueError("remark kosong atau lebih dari 255 karakter")
+    return (tanggal, waktu, latitude, longitude, depth, round(magnitude, 1), remark)
+
+def validate_events(events):
+    """Memvalidasi daftar event; mengembalikan (baris valid, daftar error)"""
+    rows, errors = [], []
+    for i, event in enumerate(events):
+        try:
+            rows.append(validate_event(event))
+        except (KeyError, ValueError, TypeError, IndexError) as e:
+            errors.append(f"event {i}: {type(e).__name__}: {e}")
+    return rows, errors
+
+def read_drop_file(path):
+    """Event dari satu file di folder drop"""
+    with open(path, encoding='utf-8') as f:
+        if path.endswith('.csv'):
+            return list(csv.DictReader(f))
+        if path.endswith('.jsonl'):
+            return [json.loads(line) for line in f if line.strip()]
+        data = json.load(f)
+        return data if isinstance(data, list) else [data]
+
+# ============================
+# Penulisan micro-batch
+# ============================
+
+def write_events(conn, rows):
+    """Menulis satu micro-batch dalam satu transaksi; mengembalikan (versi, jumlah baru)
+
+    Kejadian yang sudah ada (uq_katalog_event) dilewati. Jika ada baris baru:
+    rekap tanggal terkait di-refresh, versi katalog naik, perubahan dicatat di
+    perubahan_katalog, dan NOTIFY dikirim (terkirim saat commit).
+    """
+    cursor = conn.cursor()
+    try:
+        # Partisi baru di-commit dulu, sama seperti write_batch di import_data.py
+        ensure_partitions(cursor, {row[0] for row in rows})
+        conn.commit()
+        inserted = psycopg2.extras.execute_values(
+            cursor,
+            f"""
+            INSERT INTO katalog_gempa ({', '.join(KOLOM_KATALOG)}) VALUES %s
+            ON CONFLICT ({', '.join(KUNCI_EVENT)}) DO NOTHING
+            RETURNING id, tanggal
+            """,
+            rows,
+            page_size=1000,
+            fetch=True
+        )
+        if not inserted:
+            conn.commit()
+            return None, 0
+        refresh_rollups(cursor, {tanggal for _, tanggal in inserted})
+        cursor.execute("""
+            UPDATE versi_katalog
+            SET versi = versi + 1, updated_at = CURRENT_TIMESTAMP
+            RETURNING versi
+        """)
+        versi = cursor.fetchone()[0]
+        ids = [row_id for row_id, _ in inserted]
+        cursor.execute(
+            "INSERT INTO perubahan_katalog (versi, jenis, min_id, max_id, jumlah) VALUES (%s, 'append', %s, %s, %s)",
+            (versi, min(ids), max(ids), len(ids))
+        )
+        payload = json.dumps({'versi': versi, 'jumlah': len(ids), 'min_id': min(ids), 'max_id': max(ids)})
+        cursor.execute("SELECT pg_notify(%s, %s)", (LIVE_CHANNEL, payload))
+        conn.commit()
+        return versi, len(ids)
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cursor.close()
+
+class IngestDaemon:
+    """Menerima event dari folder drop dan HTTP, lalu menulisnya per micro-batch"""
+
+    def __init__(self, drop_dir=INGEST_DROP_DIR, batch_size=INGEST_BATCH_SIZE, max_delay=INGEST_MAX_DELAY):
+        self.drop_dir = drop_dir
+        self.batch_size = batch_size
+        self.max_delay = max_delay
+        self.queue = asyncio.Queue(maxsize=INGEST_QUEUE_SIZE)
+        self.stopping = asyncio.Event()
+        self.conn = None
+        self.received = 0
+        self.rejected = 0
+        self.inserted = 0
+        self.batches = 0
+        self.last_version = None
+        self._snapshot_at = time.monotonic()
+        self._snapshot_pending = False
+        # File drop yang event-nya belum semua tertulis: nama -> {'pending', 'complete'}
+        self._files = {}
+
+    async def submit(self, rows, source=None):
+        """Memasukkan event ke antrean; source = nama file drop asalnya (None untuk HTTP)"""
+        now = time.monotonic()
+        for row in rows:
+            await self.queue.put((now, row, source))
+        self.received += len(rows)
+
+    def _move_drop_file(self, name, sub):
+        os.replace(os.path.join(self.drop_dir, name), os.path.join(self.drop_dir, sub, name))
+
+    def _settle(self, batch, written):
+        """Mencatat event batch yang sudah selesai
+
+        File drop baru dipindah ke diproses/ setelah semua event-nya ter-commit
+        (atau disisihkan ke ditolak/). Jika tidak (daemon berhenti saat database
+        mati), file tetap di folder drop dan dibaca ulang saat daemon jalan lagi;
+        kejadian yang sudah tertulis dilewati oleh uq_katalog_event.
+        """
+        for _, _, source in batch:
+            if source is None:
+                continue
+            entry = self._files[source]
+            entry['pending'] -= 1
+            entry['complete'] = entry['complete'] and written
+            if entry['pending'] == 0:
+                del self._files[source]
+                if entry['complete']:
+                    self._move_drop_file(source, 'diproses')
+                else:
+                    print(f"⚠️ {source} tetap di folder drop, diproses ulang saat daemon dijalankan lagi")
+
+    def _set_aside(self, batch, error):
+        """Menulis event batch yang gagal ke ditolak/ (format .jsonl, bisa dimasukkan ulang ke folder drop)"""
+        path = os.path.join(self.drop_dir, 'ditolak', f"batch_{datetime.now():%Y%m%d_%H%M%S_%f}.jsonl")
+        with open(path, 'w', encoding='utf-8') as f:
+            for _, row, source in batch:
+                event = dict(zip(KOLOM_KATALOG, row), sumber=source or 'http', error=str(error))
+                f.write(json.dumps(event, default=str) + '\n')
+        print(f"⚠️ {len(batch)} event disisihkan ke {path}")
+
+    # ---- sumber event ----
+
+    async def watch_directory(self):
+        """Memindai folder drop; file selesai dipindah ke diproses/ atau ditolak/"""
+        for sub in ('diproses', 'ditolak'):
+            os.makedirs(os.path.join(self.drop_dir, sub), exist_ok=True)
+        print(f"✓ Memantau folder {self.drop_dir}")
+        while not self.stopping.is_set():
+            names = sorted(
+                name for name in os.listdir(self.drop_dir)
+                if name.endswith(('.csv', '.json', '.jsonl'))
+            )
+            for name in names:
+                if name in self._files:
+                    # Event file ini masih menunggu ditulis
+                    continue
+                path = os.path.join(self.drop_dir, name)
+                try:
+                    events = await asyncio.to_thread(read_drop_file, path)
+                except (OSError, ValueError, csv.Error) as e:
+                    print(f"✗ {name} tidak terbaca: {e}")
+                    self._move_drop_file(name, 'ditolak')
+                    continue
+                rows, errors = validate_events(events)
+                self.rejected += len(errors)
+                if rows:
+                    # Dipindah ke diproses/ oleh _settle setelah semua event-nya ter-commit
+                    self._files[name] = {'pending': len(rows), 'complete': True}
+                    await self.submit(rows, source=name)
+                else:
+                    self._move_drop_file(name, 'diproses')
+                print(f"✓ {name}: {len(rows)} event diterima, {len(errors)} ditolak")
+                for error in errors[:5]:
+                    print(f"  ⚠️ {error}")
+            try:
+                await asyncio.wait_for(self.stopping.wait(), INGEST_SCAN_SECONDS)
+            except asyncio.TimeoutError:
+                pass
+
+    async def handle_http(self, reader, writer):
+        """POST /events (JSON objek atau array) dan GET /health"""
+        status, body = 404, {'error': 'tidak ditemukan'}
+        try:
+            request_line = (await reader.readline()).decode('latin-1').split()
+            headers = {}
+            while True:
+                line = (await reader.readline()).decode('latin-1').strip()
+                if not line:
+                    break
+                key, _, value = line.partition(':')
+                headers[key.strip().lower()] = value.strip()
+            method, path = (request_line + ['', ''])[:2]
+            if method == 'GET' and path == '/health':
+                status, body = 200, self.stats()
+            elif method == 'POST' and path == '/events':
+                length = int(headers.get('content-length', 0))
+                if length > MAX_BODY_BYTES:
+                    status, body = 413, {'error': 'request terlalu besar'}
+                else:
+                    data = json.loads(await reader.readexactly(length) or b'[]')
+                    rows, errors = validate_events(data if isinstance(data, list) else [data])
+                    self.rejected += len(errors)
+                    await self.submit(rows)
+                    status, body = 202, {'diterima': len(rows), 'ditolak': len(errors), 'error': errors[:20]}
+        except (ValueError, asyncio.IncompleteReadError) as e:
+            status, body = 400, {'error': str(e)}
+        payload = json.dumps(body, default=str).encode('utf-8')
+        reason = {200: 'OK', 202: 'Accepted', 400: 'Bad Request', 404: 'Not Found', 413: 'Payload Too Large'}[status]
+        writer.write(
+            f"HTTP/1.1 {status} {reason}\r\nContent-Type: application/json\r\n"
+            f"Content-Length: {len(payload)}\r\nConnection: close\r\n\r\n".encode('latin-1') + payload
+        )
+        await writer.drain()
+        writer.close()
+
+    # ---- penulis ----
+
+    async def _next_batch(self):
+        """Mengumpulkan event sampai batch_size atau event pertama menunggu max_delay"""
+        batch = []
+        try:
+            batch.append(await asyncio.wait_for(self.queue.get(), timeout=0.5))
+        except asyncio.TimeoutError:
+            return batch
+        deadline = batch[0][0] + self.max_delay
+        while len(batch) < self.batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self.queue.get(), timeout=remaining))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def write_loop(self):
+        while not (self.stopping.is_set() and self.queue.empty()):
+            batch = await self._next_batch()
+            if not batch:
+                await self._maybe_snapshot()
+                continue
+            rows = [row for _, row, _ in batch]
+            written = False
+            while True:
+                try:
+                    if self.conn is None or self.conn.closed:
+                        self.conn = await asyncio.to_thread(connect_db)
+                        if self.conn is None:
+                            raise psycopg2.OperationalError("koneksi database gagal")
+                    versi, inserted = await asyncio.to_thread(write_events, self.conn, rows)
+                    written = True
+                    break
+                except (psycopg2.OperationalError, psycopg2.InterfaceError) as e:
+                    self.conn = None
+                    if self.stopping.is_set():
+                        # Berhenti saat database mati: event HTTP disimpan ke file,
+                        # file drop tetap di tempat untuk dibaca ulang
+                        print(f"⚠️ Database tidak tersedia saat berhenti ({e})")
+                        http_events = [item for item in batch if item[2] is None]
+                        if http_events:
+                            self._set_aside(http_events, e)
+                        self._settle(batch, written=False)
+                        break
+                    print(f"⚠️ Database tidak tersedia ({e}), batch dicoba lagi dalam 5 detik")
+                    await asyncio.sleep(5)
+                except psycopg2.Error as e:
+                    # Error data/constraint: batch tidak akan berhasil jika diulang
+                    print(f"✗ Batch {len(rows)} event gagal ditulis: {e}")
+                    self._set_aside(batch, e)
+                    self._settle(batch, written=True)
+                    self.rejected += len(rows)
+                    break
+            if not written:
+                continue
+            self._settle(batch, written=True)
+            self.batches += 1
+            self.inserted += inserted
+            latency = time.monotonic() - batch[0][0]
+            if inserted:
+                self.last_version = versi
+                self._snapshot_pending = True
+                print(f"✓ Batch {len(rows)} event: {inserted} baru, versi katalog {versi} ({latency * 1000:.0f} ms sejak diterima)")
+            else:
+                print(f"✓ Batch {len(rows)} event: semua sudah ada")
+            await self._maybe_snapshot()
+
+    async def _maybe_snapshot(self, force=False):
+        """Snapshot untuk cold start dashboard, tidak per micro-batch karena menulis seluruh katalog"""
+        if not self._snapshot_pending or not snapshot.is_available() or self.conn is None:
+            return
+        if not force and time.monotonic() - self._snapshot_at < INGEST_SNAPSHOT_INTERVAL:
+            return
+        try:
+            await asyncio.to_thread(snapshot.write_snapshot, self.conn)
+        except Exception as e:
+            print(f"⚠️ Snapshot tidak ditulis: {e}")
+        self._snapshot_pending = False
+        self._snapshot_at = time.monotonic()
+
+    def stats(self):
+        return {
+            'diterima': self.received,
+            'ditolak': self.rejected,
+            'baru': self.inserted,
+            'batch': self.batches,
+            'antrean': self.queue.qsize(),
+            'versi_katalog': self.last_version,
+        }
+
+    async def run(self, http=True, host=INGEST_HTTP_HOST, port=INGEST_HTTP_PORT):
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            try:
+                loop.add_signal_handler(sig, self.stopping.set)
+            except NotImplementedError:  # Windows
+                pass
+        tasks = [asyncio.create_task(self.watch_directory()), asyncio.create_task(self.write_loop())]
+        server = None
+        if http:
+            server = await asyncio.start_server(self.handle_http, host, port)
+            print(f"✓ Endpoint event: POST http://{host}:{port}/events")
+        try:
+            await self.stopping.wait()
+            print("\n⏹️ Berhenti: menulis sisa antrean...")
+            if server is not None:
+                server.close()
+                await server.wait_closed()
+            await asyncio.gather(*tasks)
+            await self._maybe_snapshot(force=True)
+        finally:
+            if self.conn is not None:
+                self.conn.close()
+        print(f"✓ Selesai: {self.stats()}")
+
+# ============================
+# Simulasi feed BMKG lokal
+# ============================
+
+def simulate_feed(csv_file, rate, count, url):
+    """Mengirim event acak (lokasi/magnitude dari katalog bawaan, waktu sekarang) ke endpoint"""
+    with open(csv_file, encoding='utf-8') as f:
+        base = list(csv.DictReader(f))
+    sent = 0
+    while count is None or sent < count:
+        now = datetime.now()
+        event = dict(random.choice(base), tgl=f"{now.month}/{now.day}/{now.year}", ot=now.strftime('%H.%M.%S'))
+        request = urllib.request.Request(
+            url, data=json.dumps(event).encode('utf-8'), headers={'Content-Type': 'application/json'}
+        )
+        with urllib.request.urlopen(request, timeout=10) as response:
+            result = json.loads(response.read())
+        sent += 1
+        print(f"→ {event['remark']} M{event['mag']} ({result['diterima']} diterima)")
+        time.sleep(1 / rate)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Daemon ingest real-time katalog gempa")
+    parser.add_argument("perintah", nargs="?", choices=["jalan", "simulasi"], default="jalan")
+    parser.add_argument("--drop-dir", default=INGEST_DROP_DIR)
+    parser.add_argument("--host", default=INGEST_HTTP_HOST)
+    parser.add_argument("--port", type=int, default=INGEST_HTTP_PORT)
+    parser.add_argument("--no-http", action="store_true", help="hanya pantau folder drop")
+    parser.add_argument("--batch-size", type=int, default=INGEST_BATCH_SIZE)
+    parser.add_argument("--max-delay", type=float, default=INGEST_MAX_DELAY,
+                        help="detik maksimum event menunggu sebelum batch ditulis")
+    parser.add_argument("--rate", type=float, default=1.0, help="simulasi: event per detik")
+    parser.add_argument("--count", type=int, default=None, help="simulasi: jumlah event (default tanpa batas)")
+    parser.add_argument("--csv-file", default="katalog_gempa_new.csv", help="simulasi: sumber lokasi & magnitude")
+    args = parser.parse_args()
+
+    if args.perintah == "simulasi":
+        simulate_feed(args.csv_file, args.rate, args.count, f"http://{args.host}:{args.port}/events")
+    else:
+        os.makedirs(args.drop_dir, exist_ok=True)
+        daemon = IngestDaemon(args.drop_dir, args.batch_size, args.max_delay)
+        asyncio.run(daemon.run(http=not args.no_http, host=args.host, port=args.port))
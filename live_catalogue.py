@@ -0,0 +1,150 @@
+import copy
+import json
+import os
+import select
+import threading
+import time
+
+import psycopg2
+
+from catalogue import from_rows
+from config import (
+    KOLOM_GEMPA, get_db_config, query_cache, view_catalog_changes, view_earthquakes_by_id_ranges
+)
+from query_stats import query_stats
+
+# ============================
+# Katalog live: store bersama yang mengikuti ingest real-time (LISTEN/NOTIFY)
+# ============================
+
+# Channel NOTIFY yang dikirim ingest_daemon.py setiap micro-batch ter-commit
+LIVE_CHANNEL = 'katalog_gempa_baru'
+# Seberapa sering sesi dashboard mengecek versi baru di memori (detik, tanpa query)
+LIVE_POLL_SECONDS = float(os.getenv('LIVE_POLL_SECONDS', '2'))
+# Jeda sebelum listener mencoba konek ulang setelah koneksi putus (detik)
+LIVE_RECONNECT_SECONDS = 5.0
+
+class LiveCatalogue:
+    """Memegang store katalog terbaru untuk satu proses Streamlit
+
+    Saat versi katalog naik, log perubahan_katalog dicek: jika semua versi di
+    antaranya hanya menambah baris (ingest real-time), cukup baris baru yang
+    diambil dan digabung ke store. Versi lain (import_data.py, partisi dilepas)
+    membuat store dimuat ulang penuh lewat loader.
+    """
+
+    def __init__(self, loader):
+        self._loader = loader
+        self._lock = threading.Lock()
+        self.store = None
+        self.latest_version = None
+        self.appends = 0
+        self.reloads = 0
+        self.notifications = 0
+        self._listener = None
+
+    def current(self, version):
+        """Store untuk versi katalog ini (digabung incremental jika bisa)"""
+        with self._lock:
+            store = self.store
+            if store is not None and store.version == version:
+                return store
+            if store is not None and store.version is not None and version is not None and version > store.version:
+                rows = self._appended_rows(store.version, version)
+                if rows is not None:
+                    if rows:
+                        with query_stats.measure("live: gabung baris baru"):
+                            self.store = store.extended(from_rows(rows, KOLOM_GEMPA), version)
+                    else:
+                        # Batch tanpa baris baru (semua duplikat): isi store tetap
+                        self.store = copy.copy(store)
+                        self.store.version = version
+                    self.appends += 1
+                    self._seen(version)
+                    return self.store
+            self.store = self._loader(version)
+            self.reloads += 1
+            self._seen(version)
+            return self.store
+
+    def _seen(self, version):
+        if version is not None and (self.latest_version is None or version > self.latest_version):
+            self.latest_version = version
+
+    def _appended_rows(self, old_version, new_version):
+        """Baris baru jika semua versi setelah old_version hanya menambah baris, selain itu None"""
+        try:
+            changes = view_catalog_changes(old_version, new_version)
+        except psycopg2.Error as e:
+            # Tabel log belum dibuat (schema lama): muat ulang penuh
+            print(f"⚠️ Log perubahan katalog tidak terbaca: {e}")
+            return None
+        if len(changes) != new_version - old_version or any(jenis != 'append' for _, jenis, _, _ in changes):
+            return None
+        return view_earthquakes_by_id_ranges([(min_id, max_id) for _, _, min_id, max_id in changes])
+
+    def stats(self):
+        return {
+            'version': self.store.version if self.store is not None else None,
+            'latest_version': self.latest_version,
+            'appends': self.appends,
+            'reloads': self.reloads,
+            'notifications': self.notifications,
+            'listening': self._listener is not None and self._listener.is_alive(),
+        }
+
+    # ============================
+    # Listener LISTEN/NOTIFY
+    # ============================
+
+    def start_listener(self):
+        """Menjalankan thread LISTEN sekali per proses"""
+        if self._listener is None or not self._listener.is_alive():
+            self._listener = threading.Thread(target=self._listen_forever, name='live-catalogue', daemon=True)
+            self._listener.start()
+
+    def _listen_forever(self):
+        while True:
+            try:
+                self._listen()
+            except (psycopg2.Error, OSError) as e:
+                print(f"⚠️ Listener katalog live terputus ({e}), konek ulang dalam {LIVE_RECONNECT_SECONDS:.0f} detik")
+                time.sleep(LIVE_RECONNECT_SECONDS)
+
+    def _listen(self):
+        # Koneksi khusus di luar pool: LISTEN menahan koneksi selama proses hidup
+        conn = psycopg2.connect(**get_db_config())
+        conn.autocommit = True
+        try:
+            with conn.cursor() as cursor:
+                cursor.execute(f"LISTEN {LIVE_CHANNEL}")
+            print(f"✓ Mendengarkan notifikasi katalog di channel {LIVE_CHANNEL}")
+            while True:
+                if select.select([conn], [], [], 60) == ([], [], []):
+                    continue
+                conn.poll()
+                versions = []
+                while conn.notifies:
+                    notify = conn.notifies.pop(0)
+                    try:
+                        versions.append(int(json.loads(notify.payload)['versi']))
+                    except (ValueError, KeyError, TypeError):
+                        continue
+                if versions:
+                    self._on_notify(max(versions))
+        finally:
+            conn.close()
+
+    def _on_notify(self, version):
+        self.notifications += 1
+        # Cache query memakai versi lama sampai dicek ulang; kosongkan sekarang
+        query_cache.invalidate()
+        self._seen(version)
+        if self.store is None:
+            # Mode database: tidak ada store untuk diperbarui, sesi cukup di-rerun
+            return
+        # Baris baru disiapkan di thread ini supaya rerun sesi langsung memakai store baru
+        try:
+            self.current(version)
+        except Exception as e:
+            print(f"⚠️ Store katalog live gagal diperbarui: {e}")
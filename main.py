@@ -4,6 +4,8 @@ import pandas as pd
 import plotly.express as px
 import plotly.graph_objects as go
 from datetime import datetime
+import numpy as np
+import uuid
 
 # Set konfigurasi halaman dashboard (HARUS DI AWAL!)
 st.set_page_config("Dashboard Katalog Gempa", page_icon="🌋", layout="wide")
@@ -15,6 +17,104 @@ except Exception as e:
     st.error(f"❌ Error import config: {e}")
     st.stop()
 
+# Halaman diagnostik tersembunyi: http://localhost:8501/?diagnostik=1
+if st.query_params.get("diagnostik"):
+    from diagnostics import render_page
+    render_page()
+    st.stop()
+
+# Profiling render per rerun: DASHBOARD_PROFILE=1 atau http://localhost:8501/?profil=1
+from profiler import DASHBOARD_PROFILE, finish_rerun, start_rerun
+if 'session_id' not in st.session_state:
+    st.session_state['session_id'] = uuid.uuid4().hex[:8]
+profiler = start_rerun(
+    DASHBOARD_PROFILE or bool(st.query_params.get("profil")), st.session_state['session_id']
+)
+
+from query_stats import query_stats
+from snapshot import load_fresh_snapshot
+from catalogue import display_frame, from_arrays, from_frame
+from features import DAY_ORDER, DEPTH_LABELS
+from async_queries import run_concurrently
+from catalogue_store import CatalogueStore
+from live_catalogue import LIVE_POLL_SECONDS, LiveCatalogue
+from export import FORMATS as EXPORT_FORMATS, available_formats, export_selection, find_export, store_has_columns
+from panels import (
+    build as build_panel, cache_stats as panel_cache_stats, panel, render as render_panel, show as show_panel
+)
+from map_engine import (
+    INDONESIA_CENTER, ZOOM_MAX, ZOOM_MIN, cell_size_for_zoom, density_points, map_view
+)
+from seismicity import (
+    B_VALUE_MIN_EVENTS, b_value_by_region, b_value_grid, b_value_timeline, magnitude_distribution
+)
+
+# Kolom numerik yang dikembalikan psycopg2 sebagai Decimal
+KOLOM_NUMERIK = ["latitude", "longitude", "depth", "magnitude"]
+
+def to_dataframe(rows, columns):
+    """Membuat DataFrame dari hasil query dan mengkonversi tipe datanya"""
+    df = pd.DataFrame(rows, columns=columns)
+    if 'tanggal' in df.columns:
+        df['tanggal'] = pd.to_datetime(df['tanggal'])
+    for col in KOLOM_NUMERIK:
+        if col in df.columns:
+            df[col] = pd.to_numeric(df[col])
+    return df
+
+# Koordinat kota untuk pencarian "gempa di sekitar kota"
+KOTA_INDONESIA = {
+    "Jakarta": (-6.2088, 106.8456),
+    "Bandung": (-6.9175, 107.6191),
+    "Yogyakarta": (-7.7956, 110.3695),
+    "Surabaya": (-7.2575, 112.7521),
+    "Denpasar": (-8.6705, 115.2126),
+    "Mataram": (-8.5833, 116.1167),
+    "Kupang": (-10.1772, 123.6070),
+    "Padang": (-0.9471, 100.4172),
+    "Banda Aceh": (5.5483, 95.3238),
+    "Medan": (3.5952, 98.6722),
+    "Palu": (-0.8917, 119.8707),
+    "Makassar": (-5.1477, 119.4327),
+    "Manado": (1.4748, 124.8421),
+    "Ambon": (-3.6954, 128.1814),
+    "Ternate": (0.7893, 127.3753),
+    "Jayapura": (-2.5337, 140.7181),
+}
+
+def with_cluster_flags(df):
+    """Menambahkan kolom gempa_susulan dari hasil declustering.py (filter mainshock_only)"""
+    try:
+        aftershocks = view_aftershock_ids.uncached()
+    except Exception as e:
+        # Tabel klaster_gempa belum dibuat (schema lama): semua gempa dianggap gempa utama
+        print(f"⚠️ Hasil declustering tidak terbaca: {e}")
+        aftershocks = []
+    df['gempa_susulan'] = np.isin(df['id'].to_numpy(), np.asarray(aftershocks, dtype=np.int64))
+    return df
+
+def load_shared_store(version):
+    """Memuat penuh satu katalog read-only per versi, dibagi semua sesi dalam proses Streamlit
+
+    Snapshot kolumnar dipakai jika versinya cocok; jika tidak, katalog dibaca
+    sekali dari database (bukan sekali per sesi). Dipanggil LiveCatalogue hanya
+    jika versi baru tidak bisa diterapkan sebagai tambahan baris.
+    """
+    with query_stats.measure("load_shared_store"):
+        df = load_fresh_snapshot(version)
+        if df is not None:
+            return CatalogueStore(with_cluster_flags(from_frame(df)), version, 'snapshot kolumnar')
+        # COPY binary per potongan langsung ke array, tanpa tuple/Decimal per nilai
+        arrays, remarks = view_catalogue_arrays.uncached(None, KOLOM_GEMPA)
+        return CatalogueStore(with_cluster_flags(from_arrays(arrays, remarks)), version, 'database (bersama)')
+
+@st.cache_resource(show_spinner=False)
+def get_live_catalogue():
+    """Satu katalog live per proses; listener LISTEN/NOTIFY ingest real-time ikut dijalankan"""
+    live = LiveCatalogue(load_shared_store)
+    live.start_listener()
+    return live
+
 # Header Dashboard
 st.title("🌋 Dashboard Katalog Gempa Bumi")
 image = "https://img2.beritasatu.com/cache/jakartaglobe/960x620-3/2018/02/Gunung-Rinjani.jpg"
@@ -22,25 +122,38 @@ st.image(image, width=900)
 st.markdown("---")
 
 # Ambil data gempa dengan error handling
+if profiler:
+    profiler.mark("muat data & statistik")
 try:
-    result_earthquakes = view_all_earthquakes()
+    # Store bersama dipakai ulang semua sesi; mode 'database' memfilter per sesi di SQL
+    live = get_live_catalogue()
+    catalog_version = view_catalog_version()
+    
+    # Query awal saling independen: dijalankan bersamaan lewat pool, sehingga
+    # waktu muat mendekati query paling lambat, bukan jumlah semua round trip
+    initial_calls = {
+        'stats': (view_statistics_by_month, ()),
+        'regions': (view_earthquakes_by_region, ()),
+    }
+    if DASHBOARD_DATA_SOURCE != 'database':
+        initial_calls['store'] = (live.current, (catalog_version,))
+    else:
+        # Hanya batas nilai filter yang diambil, bukan seluruh katalog
+        initial_calls['bounds'] = (view_filter_bounds, ())
+    initial = run_concurrently(initial_calls)
     
-    if not result_earthquakes:
+    store = initial.get('store')
+    bounds = store.bounds() if store is not None else initial['bounds']
+    
+    if not bounds or not bounds[0]:
         st.warning("⚠️ Database kosong. Silakan import data terlebih dahulu.")
         st.info("📌 Untuk import data, jalankan: `python import_data.py`")
         st.stop()
     
-    df_earthquakes = pd.DataFrame(result_earthquakes, columns=[
-        "id", "tanggal", "waktu", "latitude", "longitude", "depth", "magnitude", "remark"
-    ])
-    
-    # Konversi tipe data
-    df_earthquakes['tanggal'] = pd.to_datetime(df_earthquakes['tanggal'])
-    df_earthquakes['magnitude'] = pd.to_numeric(df_earthquakes['magnitude'])
-    df_earthquakes['depth'] = pd.to_numeric(df_earthquakes['depth'])
+    total_earthquakes, db_min_mag, db_max_mag, db_min_depth, db_max_depth, db_min_date, db_max_date = bounds
     
     # Ambil data statistik per bulan
-    result_stats = view_statistics_by_month()
+    result_stats = initial['stats']
     df_stats = pd.DataFrame(result_stats, columns=[
         "bulan", "jumlah_gempa", "rata_rata_magnitude", "magnitude_maksimum", "magnitude_minimum"
     ])
@@ -49,7 +162,7 @@ try:
         df_stats['bulan'] = pd.to_datetime(df_stats['bulan'])
     
     # Ambil data gempa per wilayah
-    result_regions = view_earthquakes_by_region()
+    result_regions = initial['regions']
     df_regions = pd.DataFrame(result_regions, columns=["remark", "jumlah"])
 
 except Exception as e:
@@ -57,15 +170,12 @@ except Exception as e:
     st.info("💡 Pastikan database sudah terisi dengan data dan konfigurasi sudah benar.")
     st.stop()
 
-# Cek apakah data tersedia
-if df_earthquakes.empty:
-    st.warning("⚠️ Tidak ada data gempa yang tersedia.")
-    st.stop()
-
 
 # ============================
 # SIDEBAR - Navigasi & Filter
 # ============================
+if profiler:
+    profiler.mark("sidebar & filter")
 st.sidebar.header("📊 Navigasi Visualisasi")
 
 # Dropdown untuk memilih jenis visualisasi
@@ -79,8 +189,8 @@ st.sidebar.header("🔍 Filter Data")
 
 # Filter Rentang Magnitude
 st.sidebar.subheader("Magnitude")
-min_mag = float(df_earthquakes['magnitude'].min())
-max_mag = float(df_earthquakes['magnitude'].max())
+min_mag = float(db_min_mag)
+max_mag = float(db_max_mag)
 mag_range = st.sidebar.slider(
     "Pilih Rentang Magnitude",
     min_value=min_mag,
@@ -91,8 +201,8 @@ mag_range = st.sidebar.slider(
 
 # Filter Rentang Kedalaman
 st.sidebar.subheader("Kedalaman (km)")
-min_depth = int(df_earthquakes['depth'].min())
-max_depth = int(df_earthquakes['depth'].max())
+min_depth = int(db_min_depth)
+max_depth = int(db_max_depth)
 depth_range = st.sidebar.slider(
     "Pilih Rentang Kedalaman",
     min_value=min_depth,
@@ -104,49 +214,247 @@ depth_range = st.sidebar.slider(
 st.sidebar.subheader("Rentang Waktu")
 date_range = st.sidebar.date_input(
     "Pilih Rentang Tanggal",
-    value=(df_earthquakes['tanggal'].min(), df_earthquakes['tanggal'].max()),
-    min_value=df_earthquakes['tanggal'].min(),
-    max_value=df_earthquakes['tanggal'].max()
+    value=(db_min_date, db_max_date),
+    min_value=db_min_date,
+    max_value=db_max_date
+)
+# Saat user baru memilih tanggal awal, date_input hanya mengembalikan satu tanggal
+if len(date_range) == 2:
+    start_date, end_date = date_range
+else:
+    start_date = end_date = date_range[0]
+
+# Filter hasil declustering Gardner-Knopoff (jalankan: python declustering.py)
+st.sidebar.subheader("Declustering")
+mainshock_only = st.sidebar.checkbox(
+    "Hanya gempa utama (mainshock)",
+    value=False,
+    help="Membuang gempa susulan dan pendahuluan hasil declustering.py"
 )
 
-# Terapkan filter
-filtered_df = df_earthquakes[
-    (df_earthquakes['magnitude'].between(mag_range[0], mag_range[1])) &
-    (df_earthquakes['depth'].between(depth_range[0], depth_range[1])) &
-    (df_earthquakes['tanggal'] >= pd.to_datetime(date_range[0])) &
-    (df_earthquakes['tanggal'] <= pd.to_datetime(date_range[1]))
-]
+# Terapkan filter di database (parameterized SQL)
+filters = {
+    'min_mag': round(mag_range[0], 1),
+    'max_mag': round(mag_range[1], 1),
+    'min_depth': depth_range[0],
+    'max_depth': depth_range[1],
+    'start_date': start_date,
+    'end_date': end_date,
+    'mainshock_only': mainshock_only,
+}
+
+# Kolom yang dibutuhkan visualisasi (tanpa id)
+KOLOM_VISUALISASI = ["tanggal", "waktu", "latitude", "longitude", "depth", "magnitude", "remark"]
+
+if profiler:
+    profiler.mark("seleksi filter")
+try:
+    if store is not None:
+        # State per sesi hanya array indeks baris hasil filter, data tetap di store bersama
+        with query_stats.measure("store.select"):
+            selection = store.select(filters)
+    else:
+        arrays, remarks = view_catalogue_arrays(filters, KOLOM_VISUALISASI)
+        with query_stats.measure("from_arrays (per sesi)"):
+            store = CatalogueStore(from_arrays(arrays, remarks), source='database (per sesi)')
+        selection = np.arange(len(store))
+    summary = store.summary(selection)
+except Exception as e:
+    st.error(f"❌ Gagal memuat data dari database: {e}")
+    st.stop()
+
+filtered_count, avg_magnitude, max_magnitude, avg_depth, max_depth_filtered, total_regions = summary
+
+if filtered_count == 0:
+    st.warning("⚠️ Tidak ada data gempa yang sesuai dengan filter.")
+    st.stop()
+
+# ============================
+# AGREGASI - dari tabel rekap jika hanya filter tanggal yang aktif
+# ============================
+# Rekap per tanggal tidak bisa menjawab filter magnitude/kedalaman/mainshock, dan hanya
+# dipakai jika isinya sinkron dengan katalog (misal belum pernah dibangun)
+use_rollups = (
+    not mainshock_only
+    and mag_range == (min_mag, max_mag)
+    and depth_range == (min_depth, max_depth)
+    and view_rollup_total() == total_earthquakes
+)
+
+def region_counts(limit=10):
+    """Jumlah gempa per wilayah (terbanyak lebih dulu)"""
+    if use_rollups:
+        rows = view_rollup_regions(start_date, end_date, limit)
+        return pd.Series([int(n) for _, n in rows], index=[r for r, _ in rows], name='count')
+    return store.value_counts('remark', selection).head(limit)
+
+def daily_summary():
+    """Jumlah dan rata-rata magnitude gempa per hari"""
+    if use_rollups:
+        df = pd.DataFrame(view_rollup_daily(start_date, end_date),
+                          columns=['Tanggal', 'Jumlah Gempa', 'Rata-rata Magnitude'])
+        df['Rata-rata Magnitude'] = pd.to_numeric(df['Rata-rata Magnitude'])
+        return df
+    return store.daily(selection)
+
+def magnitude_category_counts():
+    """Jumlah gempa per kategori magnitude"""
+    if use_rollups:
+        rows = view_rollup_categories("kategori_magnitude", start_date, end_date)
+        return pd.Series({k: int(n) for k, n in rows}).sort_values(ascending=False)
+    return store.value_counts('kategori_magnitude', selection)
+
+def depth_category_counts():
+    """Jumlah gempa per rentang kedalaman, urut dari dangkal ke dalam"""
+    if use_rollups:
+        rows = view_rollup_categories("kategori_kedalaman", start_date, end_date)
+        return pd.Series({k: int(n) for k, n in rows}).reindex(DEPTH_LABELS, fill_value=0)
+    return store.counts('kategori_kedalaman', selection)
+
+def hour_counts():
+    """Jumlah gempa per jam dalam sehari"""
+    if use_rollups:
+        rows = view_rollup_hours(start_date, end_date)
+        return pd.Series({int(jam): int(n) for jam, n in rows})
+    return store.counts('jam', selection)
+
+def weekday_counts():
+    """Jumlah gempa per hari dalam seminggu (Senin-Minggu)"""
+    if use_rollups:
+        rows = view_rollup_weekdays(start_date, end_date)
+        return pd.Series({DAY_ORDER[hari - 1]: int(n) for hari, n in rows}).reindex(DAY_ORDER).fillna(0)
+    return store.weekdays(selection)
+
+def filtered_frame(columns):
+    """Kolom yang dibutuhkan satu widget, hanya untuk baris hasil filter"""
+    return store.take(selection, columns)
+
+# Kolom untuk peta level-of-detail
+KOLOM_PETA = ['latitude', 'longitude', 'magnitude', 'depth', 'remark', 'waktu_kejadian']
+
+def build_lod_geo_figure(df, title, zoom=ZOOM_MIN, center=INDONESIA_CENTER, height=600):
+    """Peta scatter_geo level-of-detail: sel padat diagregasi, sel jarang tetap sebagai titik"""
+    points, clusters, bbox, cell_size = map_view(df, zoom, center)
+    fig = go.Figure()
+    if not clusters.empty:
+        fig.add_trace(go.Scattergeo(
+            lat=clusters['latitude'],
+            lon=clusters['longitude'],
+            mode='markers',
+            name=f'Kelompok (sel {cell_size:g}°)',
+            marker=dict(
+                size=np.clip(4 + 3 * np.sqrt(clusters['jumlah'].astype(float)), 4, 40),
+                color=clusters['magnitude_maks'],
+                colorscale='YlOrRd',
+                colorbar=dict(title='Mag. maks'),
+                opacity=0.7,
+                line=dict(width=0.5, color='gray')
+            ),
+            text=[
+                f"{n} gempa<br>Magnitude maks: {m:.1f}<br>Kedalaman rata-rata: {d:.0f} km"
+                for n, m, d in zip(clusters['jumlah'], clusters['magnitude_maks'], clusters['depth_rata'])
+            ],
+            hoverinfo='text'
+        ))
+    if not points.empty:
+        fig.add_trace(go.Scattergeo(
+            lat=points['latitude'],
+            lon=points['longitude'],
+            mode='markers',
+            name='Gempa',
+            marker=dict(
+                size=points['magnitude'] * 2.5,
+                color=points['magnitude'],
+                colorscale='YlOrRd',
+                showscale=clusters.empty,
+                colorbar=dict(title='Magnitude')
+            ),
+            text=[
+                f"{r}<br>{t:%Y-%m-%d %H:%M:%S}<br>Magnitude: {m:.1f}<br>Kedalaman: {d} km"
+                for r, t, m, d in zip(points['remark'], points['waktu_kejadian'],
+                                      points['magnitude'], points['depth'])
+            ],
+            hoverinfo='text'
+        ))
+    fig.update_geos(
+        projection_type="natural earth",
+        showcountries=True,
+        showcoastlines=True,
+        showland=True,
+        landcolor='lightgray',
+        coastlinecolor='gray',
+        showlakes=True,
+        lakecolor='lightblue',
+        lataxis_range=[bbox[0], bbox[2]],
+        lonaxis_range=[bbox[1], bbox[3]]
+    )
+    fig.update_layout(title=title, height=height, legend=dict(orientation='h'))
+    return fig, len(points), len(clusters)
+
+# Sesi yang terbuka di-rerun otomatis saat ingest real-time menaikkan versi katalog.
+# Fragment hanya membaca versi terakhir dari listener NOTIFY di memori, tanpa query.
+@st.fragment(run_every=LIVE_POLL_SECONDS)
+def live_status(rendered_version):
+    latest = live.latest_version
+    if latest is not None and rendered_version is not None and latest > rendered_version:
+        st.rerun()
+    st.caption(f"🟢 Live | Versi katalog {rendered_version}")
+
+with st.sidebar:
+    live_status(catalog_version)
+
+# Counter cache query untuk menentukan ukuran cache
+with st.sidebar.expander("⚙️ Cache Query"):
+    st.caption(f"Sumber data: {store.source} | Store: {store.memory_usage() / 1e6:.1f} MB")
+    cache_stats = get_cache_stats()
+    st.caption(
+        f"Hit: {cache_stats['hits']} | Miss: {cache_stats['misses']} | "
+        f"Hit rate: {cache_stats['hit_rate']:.0%}"
+    )
+    st.caption(
+        f"Isi: {cache_stats['size']}/{cache_stats['maxsize']} | "
+        f"Eviksi: {cache_stats['evictions']} | Versi katalog: {cache_stats['catalog_version']}"
+    )
+    live_stats = live.stats()
+    st.caption(
+        f"Live: {live_stats['appends']} tambahan baris | {live_stats['reloads']} muat ulang | "
+        f"{live_stats['notifications']} notifikasi"
+    )
+    panel_stats = panel_cache_stats()
+    st.caption(
+        f"Panel sesi ini: {panel_stats['size']}/{panel_stats['maxsize']} figure | "
+        f"Hit rate: {panel_stats['hit_rate']:.0%}"
+    )
 
 # ============================
 # METRICS - Statistik Utama
 # ============================
+if profiler:
+    profiler.mark("metrics")
 col1, col2, col3, col4 = st.columns(4)
 
 with col1:
     st.metric(
         label="📊 Total Gempa",
-        value=f"{len(filtered_df):,}",
-        delta=f"{len(filtered_df) - len(df_earthquakes):,} (filtered)"
+        value=f"{filtered_count:,}",
+        delta=f"{filtered_count - total_earthquakes:,} (filtered)"
     )
 
 with col2:
-    avg_magnitude = filtered_df['magnitude'].mean()
     st.metric(
         label="📈 Rata-rata Magnitude",
         value=f"{avg_magnitude:.2f}",
-        delta=f"Max: {filtered_df['magnitude'].max():.1f}"
+        delta=f"Max: {max_magnitude:.1f}"
     )
 
 with col3:
-    avg_depth = filtered_df['depth'].mean()
     st.metric(
         label="🌊 Rata-rata Kedalaman",
         value=f"{avg_depth:.0f} km",
-        delta=f"Max: {filtered_df['depth'].max()} km"
+        delta=f"Max: {max_depth_filtered} km"
     )
 
 with col4:
-    total_regions = filtered_df['remark'].nunique()
     st.metric(
         label="📍 Wilayah Terdampak",
         value=f"{total_regions}",
@@ -158,6 +466,8 @@ st.markdown("---")
 # ============================
 # VISUALISASI BERDASARKAN PILIHAN
 # ============================
+if profiler:
+    profiler.mark(f"visualisasi: {visualization_type}")
 st.subheader(f"📊 Visualisasi: {visualization_type}")
 
 # Deskripsi untuk setiap jenis visualisasi
@@ -179,45 +489,340 @@ elif visualization_type == "Map":
 
 st.markdown("---")
 
+# ============================
+# PANEL - figure dibangun hanya saat bagiannya dibuka
+# ============================
+# Semua figure di-cache per sesi dengan key state filter, jadi rerun karena
+# widget lain (misal zoom peta) tidak membangun ulang figure yang tidak berubah
+filter_key = tuple(sorted((k, str(v)) for k, v in filters.items()))
+panel_state = (catalog_version, store.source, filter_key)
+
+@panel("Pie Chart")
+def pie_regions():
+    top_10_regions = region_counts(10)
+    return px.pie(
+        values=top_10_regions.values,
+        names=top_10_regions.index,
+        title='Top 10 Wilayah dengan Gempa Terbanyak',
+        hole=0.4
+    )
+
+@panel("Pie Chart")
+def pie_magnitude():
+    mag_counts = magnitude_category_counts()
+    return px.pie(
+        values=mag_counts.values,
+        names=mag_counts.index,
+        title='Distribusi Kategori Magnitude',
+        color_discrete_sequence=px.colors.sequential.RdBu
+    )
+
+@panel("Area Chart")
+def area_daily_count():
+    daily_counts = daily_summary()[['Tanggal', 'Jumlah Gempa']]
+    fig_area = px.area(
+        daily_counts,
+        x='Tanggal',
+        y='Jumlah Gempa',
+        title='Aktivitas Gempa Harian',
+        labels={'Tanggal': 'Tanggal', 'Jumlah Gempa': 'Jumlah Gempa'}
+    )
+    fig_area.update_traces(fillcolor='rgba(255, 75, 75, 0.3)', line_color='#FF4B4B')
+    return fig_area
+
+@panel("Area Chart")
+def area_daily_magnitude():
+    daily_mag = daily_summary()[['Tanggal', 'Rata-rata Magnitude']]
+    fig_area_mag = px.area(
+        daily_mag,
+        x='Tanggal',
+        y='Rata-rata Magnitude',
+        title='Rata-rata Magnitude Harian',
+        labels={'Tanggal': 'Tanggal', 'Rata-rata Magnitude': 'Magnitude'}
+    )
+    fig_area_mag.update_traces(fillcolor='rgba(255, 107, 107, 0.3)', line_color='#FF6B6B')
+    return fig_area_mag
+
+@panel("Bar Chart")
+def bar_regions():
+    top_regions = region_counts(10).reset_index()
+    top_regions.columns = ['Wilayah', 'Jumlah Gempa']
+    return px.bar(
+        top_regions,
+        x='Jumlah Gempa',
+        y='Wilayah',
+        orientation='h',
+        title='10 Wilayah Terdampak Terbanyak',
+        color='Jumlah Gempa',
+        color_continuous_scale='Reds'
+    )
+
+@panel("Bar Chart")
+def bar_depth():
+    depth_counts = depth_category_counts()
+    return px.bar(
+        x=depth_counts.index,
+        y=depth_counts.values,
+        title='Distribusi Kedalaman Gempa',
+        labels={'x': 'Kategori Kedalaman', 'y': 'Jumlah Gempa'},
+        color=depth_counts.values,
+        color_continuous_scale='Blues'
+    )
+
+@panel("Line Chart")
+def line_monthly_count():
+    fig_line = px.line(
+        df_stats,
+        x='bulan',
+        y='jumlah_gempa',
+        title='Jumlah Gempa per Bulan',
+        labels={'bulan': 'Bulan', 'jumlah_gempa': 'Jumlah Gempa'},
+        markers=True
+    )
+    fig_line.update_traces(line_color='#FF4B4B', marker=dict(size=10))
+    return fig_line
+
+@panel("Line Chart")
+def line_monthly_max_magnitude():
+    fig_line_mag = px.line(
+        df_stats,
+        x='bulan',
+        y='magnitude_maksimum',
+        title='Magnitude Maksimum per Bulan',
+        labels={'bulan': 'Bulan', 'magnitude_maksimum': 'Magnitude Maksimum'},
+        markers=True
+    )
+    fig_line_mag.update_traces(line_color='#E63946', marker=dict(size=10))
+    return fig_line_mag
+
+@panel("Line Chart")
+def line_hourly():
+    hours = hour_counts()
+    fig_line_hour = px.line(
+        x=hours.index,
+        y=hours.values,
+        title='Aktivitas Gempa per Jam (24 jam)',
+        labels={'x': 'Jam', 'y': 'Jumlah Gempa'},
+        markers=True
+    )
+    fig_line_hour.update_traces(line_color='#11999E', marker=dict(size=8))
+    return fig_line_hour
+
+@panel("Map")
+def map_lod(zoom, center_name):
+    center = KOTA_INDONESIA.get(center_name, INDONESIA_CENTER)
+    return build_lod_geo_figure(
+        filtered_frame(KOLOM_PETA), 'Sebaran Gempa Berdasarkan Lokasi Geografis', zoom, center
+    )
+
+@panel("Map")
+def map_density(zoom):
+    map_df = filtered_frame(['latitude', 'longitude', 'magnitude', 'depth'])
+    # Sel grid berbobot jumlah gempa, bukan satu titik per gempa
+    heat_df = density_points(map_df, cell_size_for_zoom(zoom + 2))
+    fig_density = px.density_mapbox(
+        heat_df,
+        lat='latitude',
+        lon='longitude',
+        z='bobot',
+        radius=10,
+        center=dict(lat=map_df['latitude'].mean(), lon=map_df['longitude'].mean()),
+        zoom=3,
+        mapbox_style="open-street-map",
+        title='Heatmap Kepadatan Gempa',
+        color_continuous_scale='Hot'
+    )
+    fig_density.update_layout(height=400)
+    return fig_density
+
+@panel("📊 Statistik")
+def stats_monthly_trend():
+    fig_trend = px.line(
+        df_stats,
+        x='bulan',
+        y='jumlah_gempa',
+        title='Jumlah Gempa per Bulan',
+        labels={'bulan': 'Bulan', 'jumlah_gempa': 'Jumlah Gempa'}
+    )
+    fig_trend.update_traces(line_color='#FF4B4B')
+    return fig_trend
+
+@panel("📊 Statistik")
+def stats_depth_histogram():
+    fig_depth = px.histogram(
+        filtered_frame(['depth']),
+        x='depth',
+        nbins=30,
+        title='Distribusi Kedalaman Gempa',
+        labels={'depth': 'Kedalaman (km)', 'count': 'Frekuensi'}
+    )
+    fig_depth.update_traces(marker_color='#1f77b4')
+    return fig_depth
+
+@panel("📊 Statistik")
+def stats_monthly_magnitude():
+    fig_mag = px.bar(
+        df_stats,
+        x='bulan',
+        y='rata_rata_magnitude',
+        title='Rata-rata Magnitude per Bulan',
+        labels={'bulan': 'Bulan', 'rata_rata_magnitude': 'Rata-rata Magnitude'}
+    )
+    fig_mag.update_traces(marker_color='#FF6B6B')
+    return fig_mag
+
+@panel("📊 Statistik")
+def stats_magnitude_histogram():
+    fig_mag_dist = px.histogram(
+        filtered_frame(['magnitude']),
+        x='magnitude',
+        nbins=20,
+        title='Distribusi Magnitude Gempa',
+        labels={'magnitude': 'Magnitude', 'count': 'Frekuensi'}
+    )
+    fig_mag_dist.update_traces(marker_color='#FF9F1C')
+    return fig_mag_dist
+
+@panel("🗺️ Peta & Wilayah")
+def region_map():
+    # Peta scatter (level of detail, zoom seluruh Indonesia)
+    fig_map, _, _ = build_lod_geo_figure(filtered_frame(KOLOM_PETA), 'Sebaran Gempa Berdasarkan Lokasi', height=450)
+    return fig_map
+
+@panel("🗺️ Peta & Wilayah")
+def region_top10():
+    top_regions = region_counts(10).reset_index()
+    top_regions.columns = ['Wilayah', 'Jumlah Gempa']
+    fig_regions = px.bar(
+        top_regions,
+        x='Jumlah Gempa',
+        y='Wilayah',
+        orientation='h',
+        title='10 Wilayah Terdampak Terbanyak'
+    )
+    fig_regions.update_traces(marker_color='#2EC4B6')
+    return fig_regions
+
+@panel("📈 Analisis")
+def analysis_scatter():
+    return px.scatter(
+        filtered_frame(['depth', 'magnitude', 'tanggal', 'remark']),
+        x='depth',
+        y='magnitude',
+        color='magnitude',
+        size='magnitude',
+        hover_data=['tanggal', 'remark'],
+        title='Hubungan Magnitude dengan Kedalaman',
+        labels={'depth': 'Kedalaman (km)', 'magnitude': 'Magnitude'},
+        color_continuous_scale='Turbo'
+    )
+
+@panel("📈 Analisis")
+def analysis_weekdays():
+    day_counts = weekday_counts()
+    fig_days = px.bar(
+        x=day_counts.index,
+        y=day_counts.values,
+        title='Frekuensi Gempa per Hari',
+        labels={'x': 'Hari', 'y': 'Jumlah Gempa'}
+    )
+    fig_days.update_traces(marker_color='#11999E')
+    return fig_days
+
+@panel("📈 Analisis")
+def analysis_hours():
+    hours = hour_counts()
+    fig_hours = px.line(
+        x=hours.index,
+        y=hours.values,
+        title='Distribusi Gempa per Jam',
+        labels={'x': 'Jam (24h)', 'y': 'Jumlah Gempa'},
+        markers=True
+    )
+    fig_hours.update_traces(line_color='#E63946')
+    return fig_hours
+
+@panel("📈 Analisis")
+def analysis_describe():
+    return filtered_frame(['magnitude', 'depth']).describe()
+
+@panel("📈 Analisis")
+def analysis_gr_fmd():
+    df_fmd, fit = magnitude_distribution(store, filters)
+    fig = go.Figure()
+    fig.add_trace(go.Bar(x=df_fmd['magnitude'], y=df_fmd['jumlah'], name='Jumlah per bin', marker_color='#A8DADC'))
+    fig.add_trace(go.Scatter(
+        x=df_fmd['magnitude'], y=df_fmd['kumulatif'], mode='markers', name='N(≥ M)', marker_color='#E63946'
+    ))
+    if not np.isnan(fit['b']):
+        mags = df_fmd['magnitude'][df_fmd['magnitude'] >= fit['mc']]
+        fig.add_trace(go.Scatter(
+            x=mags, y=10 ** (fit['a'] - fit['b'] * mags), mode='lines',
+            name=f"GR: b = {fit['b']:.2f} ± {fit['b_err']:.3f}", line=dict(color='#1D3557')
+        ))
+        fig.add_vline(x=fit['mc'], line_dash='dash', annotation_text=f"Mc = {fit['mc']:.1f}")
+    fig.update_layout(
+        title='Distribusi Frekuensi-Magnitude', xaxis_title='Magnitude', yaxis_title='Jumlah Gempa',
+        yaxis_type='log', legend=dict(orientation='h')
+    )
+    return fig, fit
+
+@panel("📈 Analisis")
+def analysis_gr_regions():
+    return b_value_by_region(store, filters)
+
+@panel("📈 Analisis")
+def analysis_gr_timeline(window_months, step_months, region):
+    timeline = b_value_timeline(store, filters, window_months, step_months, region)
+    fig = go.Figure()
+    if not timeline.empty:
+        fig.add_trace(go.Scatter(
+            x=timeline['tengah'], y=timeline['b'], mode='lines+markers', name='b-value',
+            error_y=dict(type='data', array=timeline['b_err'], visible=True), line_color='#E63946'
+        ))
+        fig.add_trace(go.Scatter(
+            x=timeline['tengah'], y=timeline['mc'], mode='lines', name='Mc', yaxis='y2', line_color='#457B9D'
+        ))
+    fig.update_layout(
+        title=f'b-value & Mc per Jendela {window_months} Bulan', xaxis_title='Tengah Jendela',
+        yaxis=dict(title='b-value'), yaxis2=dict(title='Mc', overlaying='y', side='right'),
+        legend=dict(orientation='h')
+    )
+    return fig, len(timeline)
+
+@panel("📈 Analisis")
+def analysis_gr_grid(cell_size):
+    grid = b_value_grid(store, filters, cell_size)
+    fig = px.scatter_geo(
+        grid,
+        lat='latitude',
+        lon='longitude',
+        color='b',
+        size='n',
+        hover_data={'mc': ':.1f', 'b_err': ':.2f', 'n': True},
+        color_continuous_scale='RdYlBu_r',
+        title=f'b-value per Sel Grid {cell_size:g}°',
+        labels={'b': 'b-value', 'mc': 'Mc', 'b_err': '± b', 'n': 'N ≥ Mc'}
+    )
+    fig.update_geos(
+        projection_type="natural earth", showcountries=True, showland=True, landcolor='lightgray',
+        lataxis_range=[-15, 10], lonaxis_range=[90, 145]
+    )
+    fig.update_layout(height=500)
+    return fig, len(grid)
+
 if visualization_type == "Pie Chart":
     col1, col2 = st.columns(2)
     
     with col1:
         st.markdown("#### 🥧 Distribusi Gempa per Wilayah (Top 10)")
         st.caption("Menampilkan 10 wilayah dengan frekuensi gempa tertinggi dalam bentuk persentase.")
-        top_10_regions = filtered_df['remark'].value_counts().head(10)
-        fig_pie = px.pie(
-            values=top_10_regions.values,
-            names=top_10_regions.index,
-            title='Top 10 Wilayah dengan Gempa Terbanyak',
-            hole=0.4
-        )
-        st.plotly_chart(fig_pie, use_container_width=True)
+        render_panel("pie_regions", panel_state)
     
     with col2:
         st.markdown("#### 🥧 Distribusi Berdasarkan Kategori Magnitude")
         st.caption("Mengelompokkan gempa berdasarkan kekuatan magnitude: Kecil, Sedang, Besar, dan Sangat Besar.")
-        # Kategorikan magnitude
-        def categorize_magnitude(mag):
-            if mag < 3.0:
-                return "Kecil (< 3.0)"
-            elif mag < 4.0:
-                return "Sedang (3.0-4.0)"
-            elif mag < 5.0:
-                return "Besar (4.0-5.0)"
-            else:
-                return "Sangat Besar (≥ 5.0)"
-        
-        filtered_df['kategori_magnitude'] = filtered_df['magnitude'].apply(categorize_magnitude)
-        mag_counts = filtered_df['kategori_magnitude'].value_counts()
-        
-        fig_pie_mag = px.pie(
-            values=mag_counts.values,
-            names=mag_counts.index,
-            title='Distribusi Kategori Magnitude',
-            color_discrete_sequence=px.colors.sequential.RdBu
-        )
-        st.plotly_chart(fig_pie_mag, use_container_width=True)
+        render_panel("pie_magnitude", panel_state)
 
 elif visualization_type == "Area Chart":
     col1, col2 = st.columns(2)
@@ -225,34 +830,12 @@ elif visualization_type == "Area Chart":
     with col1:
         st.markdown("#### 📈 Tren Jumlah Gempa per Hari")
         st.caption("Menampilkan pola aktivitas gempa harian dengan area terisi untuk melihat intensitas periode tertentu.")
-        daily_counts = filtered_df.groupby(filtered_df['tanggal'].dt.date).size().reset_index()
-        daily_counts.columns = ['Tanggal', 'Jumlah Gempa']
-        
-        fig_area = px.area(
-            daily_counts,
-            x='Tanggal',
-            y='Jumlah Gempa',
-            title='Aktivitas Gempa Harian',
-            labels={'Tanggal': 'Tanggal', 'Jumlah Gempa': 'Jumlah Gempa'}
-        )
-        fig_area.update_traces(fillcolor='rgba(255, 75, 75, 0.3)', line_color='#FF4B4B')
-        st.plotly_chart(fig_area, use_container_width=True)
+        render_panel("area_daily_count", panel_state)
     
     with col2:
         st.markdown("#### 📈 Tren Rata-rata Magnitude per Hari")
         st.caption("Memvisualisasikan perubahan kekuatan rata-rata gempa setiap hari untuk mengidentifikasi periode intensitas tinggi.")
-        daily_mag = filtered_df.groupby(filtered_df['tanggal'].dt.date)['magnitude'].mean().reset_index()
-        daily_mag.columns = ['Tanggal', 'Rata-rata Magnitude']
-        
-        fig_area_mag = px.area(
-            daily_mag,
-            x='Tanggal',
-            y='Rata-rata Magnitude',
-            title='Rata-rata Magnitude Harian',
-            labels={'Tanggal': 'Tanggal', 'Rata-rata Magnitude': 'Magnitude'}
-        )
-        fig_area_mag.update_traces(fillcolor='rgba(255, 107, 107, 0.3)', line_color='#FF6B6B')
-        st.plotly_chart(fig_area_mag, use_container_width=True)
+        render_panel("area_daily_magnitude", panel_state)
 
 elif visualization_type == "Bar Chart":
     col1, col2 = st.columns(2)
@@ -260,38 +843,12 @@ elif visualization_type == "Bar Chart":
     with col1:
         st.markdown("#### 📊 Top 10 Wilayah dengan Gempa Terbanyak")
         st.caption("Ranking wilayah berdasarkan jumlah kejadian gempa, membantu identifikasi zona rawan gempa.")
-        top_regions = filtered_df['remark'].value_counts().head(10).reset_index()
-        top_regions.columns = ['Wilayah', 'Jumlah Gempa']
-        
-        fig_bar = px.bar(
-            top_regions,
-            x='Jumlah Gempa',
-            y='Wilayah',
-            orientation='h',
-            title='10 Wilayah Terdampak Terbanyak',
-            color='Jumlah Gempa',
-            color_continuous_scale='Reds'
-        )
-        st.plotly_chart(fig_bar, use_container_width=True)
+        render_panel("bar_regions", panel_state)
     
     with col2:
         st.markdown("#### 📊 Distribusi Gempa Berdasarkan Rentang Kedalaman")
         st.caption("Mengelompokkan gempa berdasarkan kedalaman episentrum untuk analisis karakteristik gempa dangkal vs dalam.")
-        # Kategorikan kedalaman
-        bins = [0, 50, 100, 200, 300, 500]
-        labels = ['0-50 km', '50-100 km', '100-200 km', '200-300 km', '300+ km']
-        filtered_df['kategori_kedalaman'] = pd.cut(filtered_df['depth'], bins=bins, labels=labels, include_lowest=True)
-        depth_counts = filtered_df['kategori_kedalaman'].value_counts().sort_index()
-        
-        fig_bar_depth = px.bar(
-            x=depth_counts.index,
-            y=depth_counts.values,
-            title='Distribusi Kedalaman Gempa',
-            labels={'x': 'Kategori Kedalaman', 'y': 'Jumlah Gempa'},
-            color=depth_counts.values,
-            color_continuous_scale='Blues'
-        )
-        st.plotly_chart(fig_bar_depth, use_container_width=True)
+        render_panel("bar_depth", panel_state)
 
 elif visualization_type == "Line Chart":
     col1, col2 = st.columns(2)
@@ -300,103 +857,51 @@ elif visualization_type == "Line Chart":
         st.markdown("#### 📈 Tren Gempa per Bulan")
         st.caption("Menunjukkan pola bulanan kejadian gempa untuk mengidentifikasi tren jangka panjang dan fluktuasi musiman.")
         if not df_stats.empty:
-            fig_line = px.line(
-                df_stats,
-                x='bulan',
-                y='jumlah_gempa',
-                title='Jumlah Gempa per Bulan',
-                labels={'bulan': 'Bulan', 'jumlah_gempa': 'Jumlah Gempa'},
-                markers=True
-            )
-            fig_line.update_traces(line_color='#FF4B4B', marker=dict(size=10))
-            st.plotly_chart(fig_line, use_container_width=True)
+            render_panel("line_monthly_count", panel_state)
     
     with col2:
         st.markdown("#### 📈 Tren Magnitude Maksimum per Bulan")
         st.caption("Melacak kekuatan gempa tertinggi setiap bulan untuk memantau periode aktivitas seismik ekstrem.")
         if not df_stats.empty:
-            fig_line_mag = px.line(
-                df_stats,
-                x='bulan',
-                y='magnitude_maksimum',
-                title='Magnitude Maksimum per Bulan',
-                labels={'bulan': 'Bulan', 'magnitude_maksimum': 'Magnitude Maksimum'},
-                markers=True
-            )
-            fig_line_mag.update_traces(line_color='#E63946', marker=dict(size=10))
-            st.plotly_chart(fig_line_mag, use_container_width=True)
+            render_panel("line_monthly_max_magnitude", panel_state)
     
     st.markdown("#### 📈 Distribusi Gempa per Jam dalam Sehari")
     st.caption("Analisis pola temporal harian untuk melihat apakah ada jam-jam tertentu dengan aktivitas gempa lebih tinggi.")
-    filtered_df['jam'] = pd.to_datetime(filtered_df['waktu'], format='%H:%M:%S').dt.hour
-    hour_counts = filtered_df['jam'].value_counts().sort_index()
-    
-    fig_line_hour = px.line(
-        x=hour_counts.index,
-        y=hour_counts.values,
-        title='Aktivitas Gempa per Jam (24 jam)',
-        labels={'x': 'Jam', 'y': 'Jumlah Gempa'},
-        markers=True
-    )
-    fig_line_hour.update_traces(line_color='#11999E', marker=dict(size=8))
-    st.plotly_chart(fig_line_hour, use_container_width=True)
+    render_panel("line_hourly", panel_state)
 
 elif visualization_type == "Map":
     st.markdown("#### 🗺️ Peta Sebaran Gempa Interaktif")
     st.caption("Visualisasi geografis yang menampilkan lokasi episentrum gempa dengan ukuran dan warna berdasarkan magnitude.")
     
+    # Level of detail: zoom & pusat peta menentukan viewport dan ukuran sel agregasi
+    col_center, col_zoom = st.columns([2, 3])
+    with col_center:
+        map_center_name = st.selectbox("Pusat Peta", ["Seluruh Indonesia"] + list(KOTA_INDONESIA.keys()))
+    with col_zoom:
+        map_zoom = st.slider("Zoom", min_value=ZOOM_MIN, max_value=ZOOM_MAX, value=ZOOM_MIN)
+    
     # Peta scatter geografis
-    fig_map = px.scatter_geo(
-        filtered_df,
-        lat='latitude',
-        lon='longitude',
-        color='magnitude',
-        size='magnitude',
-        hover_name='remark',
-        hover_data={'tanggal': True, 'waktu': True, 'depth': True, 'magnitude': True, 'latitude': ':.4f', 'longitude': ':.4f'},
-        title='Sebaran Gempa Berdasarkan Lokasi Geografis',
-        color_continuous_scale='YlOrRd',
-        size_max=20
-    )
-    fig_map.update_geos(
-        projection_type="natural earth",
-        showcountries=True,
-        showcoastlines=True,
-        showland=True,
-        landcolor='lightgray',
-        coastlinecolor='gray',
-        showlakes=True,
-        lakecolor='lightblue'
-    )
-    fig_map.update_layout(height=600)
-    st.plotly_chart(fig_map, use_container_width=True)
+    fig_map, n_points, n_clusters = build_panel("map_lod", panel_state, zoom=map_zoom, center_name=map_center_name)
+    show_panel("map_lod", fig_map)
+    st.caption(f"Ditampilkan {n_points:,} titik gempa dan {n_clusters:,} kelompok sel padat.")
     
     col1, col2 = st.columns(2)
     
     with col1:
         st.markdown("#### 🗺️ Peta Kepadatan Gempa (Heatmap)")
         st.caption("Heatmap menunjukkan konsentrasi aktivitas gempa, area merah mengindikasikan zona dengan aktivitas tertinggi.")
-        fig_density = px.density_mapbox(
-            filtered_df,
-            lat='latitude',
-            lon='longitude',
-            z='magnitude',
-            radius=10,
-            center=dict(lat=filtered_df['latitude'].mean(), lon=filtered_df['longitude'].mean()),
-            zoom=3,
-            mapbox_style="open-street-map",
-            title='Heatmap Kepadatan Gempa',
-            color_continuous_scale='Hot'
-        )
-        fig_density.update_layout(height=400)
-        st.plotly_chart(fig_density, use_container_width=True)
+        # Heatmap tidak bergantung pada pusat peta, jadi tidak dibangun ulang saat pusat diganti
+        render_panel("map_density", panel_state, zoom=map_zoom)
     
     with col2:
         st.markdown("#### 📍 Gempa Terkuat di Peta")
         st.caption("Daftar 5 gempa dengan magnitude tertinggi beserta lokasi koordinat geografisnya.")
-        top_5_earthquakes = filtered_df.nlargest(5, 'magnitude')
+        top_5_earthquakes = store.top(
+            selection, 'magnitude', 5,
+            ['tanggal', 'waktu_kejadian', 'magnitude', 'depth', 'remark', 'latitude', 'longitude']
+        )
         st.dataframe(
-            top_5_earthquakes[['tanggal', 'waktu', 'magnitude', 'depth', 'remark', 'latitude', 'longitude']],
+            display_frame(top_5_earthquakes, ['tanggal', 'waktu', 'magnitude', 'depth', 'remark', 'latitude', 'longitude']),
             use_container_width=True,
             hide_index=True
         )
@@ -406,111 +911,104 @@ st.markdown("---")
 # ============================
 # TABS - Organisasi Konten
 # ============================
-tab1, tab2, tab3, tab4 = st.tabs(["📋 Data Gempa", "📊 Statistik", "🗺️ Peta & Wilayah", "📈 Analisis"])
+# st.tabs menjalankan isi semua tab setiap rerun; radio horizontal hanya
+# menjalankan bagian yang sedang dibuka
+TAB_NAMES = ["📋 Data Gempa", "📊 Statistik", "🗺️ Peta & Wilayah", "📈 Analisis"]
+active_tab = st.radio("Bagian", TAB_NAMES, horizontal=True, label_visibility="collapsed", key="active_tab")
+if profiler:
+    profiler.mark(f"bagian: {active_tab}")
+    profiler.page = f"{visualization_type} | {active_tab}"
 
 # TAB 1: Tabel Data Gempa
-with tab1:
+if active_tab == "📋 Data Gempa":
     st.subheader("📋 Tabel Data Gempa Bumi")
     
     # Pilih kolom yang ditampilkan
     showdata = st.multiselect(
         "Pilih Kolom yang Ditampilkan",
-        options=filtered_df.columns,
+        options=list(KOLOM_GEMPA),
         default=["tanggal", "waktu", "magnitude", "depth", "remark", "latitude", "longitude"]
     )
     
+    # Keyset pagination: simpan baris terakhir tiap halaman, reset saat filter berubah
+    PAGE_SIZE = 100
+    if st.session_state.get('page_filter_key') != filter_key:
+        st.session_state['page_filter_key'] = filter_key
+        st.session_state['page_cursors'] = [None]
+    page_cursors = st.session_state['page_cursors']
+    
+    page_columns, page_rows = view_earthquakes_page(
+        filters, showdata, page_size=PAGE_SIZE + 1, after=page_cursors[-1]
+    )
+    has_next = len(page_rows) > PAGE_SIZE
+    page_rows = page_rows[:PAGE_SIZE]
+    with query_stats.measure("to_dataframe (halaman)"):
+        page_df = to_dataframe(page_rows, page_columns)
+    
     # Tampilkan tabel
-    st.dataframe(filtered_df[showdata], use_container_width=True, height=400)
+    st.dataframe(page_df[showdata], use_container_width=True, height=400)
     
-    # Download CSV
-    @st.cache_data
-    def convert_df_to_csv(_df):
-        return _df.to_csv(index=False).encode('utf-8')
+    total_pages = max(1, -(-filtered_count // PAGE_SIZE))
+    col_prev, col_page, col_next = st.columns([1, 2, 1])
+    with col_prev:
+        if st.button("⬅️ Sebelumnya", disabled=len(page_cursors) == 1):
+            page_cursors.pop()
+            st.rerun()
+    with col_page:
+        st.caption(f"Halaman {len(page_cursors)} dari {total_pages}")
+    with col_next:
+        if st.button("Berikutnya ➡️", disabled=not has_next):
+            last = page_rows[-1]
+            page_cursors.append((last[0], last[1], last[2]))
+            st.rerun()
     
-    csv = convert_df_to_csv(filtered_df[showdata])
-    st.download_button(
-        label="⬇️ Download Data sebagai CSV",
-        data=csv,
-        file_name=f'katalog_gempa_{datetime.now().strftime("%Y%m%d")}.csv',
-        mime='text/csv'
-    )
+    # Download: file ditulis streaming ke disk dan dipakai ulang selama versi katalog,
+    # filter, kolom, dan format sama; dibuat hanya saat diminta, bukan setiap rerun
+    download_columns = showdata or list(KOLOM_GEMPA)
+    col_format, col_download = st.columns([1, 3])
+    with col_format:
+        export_format = st.selectbox("Format", available_formats(), format_func=str.upper)
+    export_args = (export_format, filters, download_columns, catalog_version)
+    export_file = find_export(*export_args, 'store' if store_has_columns(store, download_columns) else 'database')
+    with col_download:
+        if export_file is None and st.button(f"📦 Siapkan file {export_format.upper()} ({filtered_count:,} baris)"):
+            with st.spinner("Menulis file export..."):
+                export_file = export_selection(*export_args, store=store, idx=selection)
+        if export_file is not None:
+            extension, mime = EXPORT_FORMATS[export_format]
+            with open(export_file, 'rb') as f:
+                st.download_button(
+                    label=f"⬇️ Download Data sebagai {export_format.upper()}",
+                    data=f,
+                    file_name=f'katalog_gempa_{datetime.now().strftime("%Y%m%d")}.{extension}',
+                    mime=mime
+                )
 
 # TAB 2: Statistik
-with tab2:
+elif active_tab == "📊 Statistik":
     st.subheader("📊 Statistik Gempa Bumi")
     
     col1, col2 = st.columns(2)
     
     with col1:
         st.markdown("### 📈 Tren Gempa per Bulan")
-        fig_trend = px.line(
-            df_stats,
-            x='bulan',
-            y='jumlah_gempa',
-            title='Jumlah Gempa per Bulan',
-            labels={'bulan': 'Bulan', 'jumlah_gempa': 'Jumlah Gempa'}
-        )
-        fig_trend.update_traces(line_color='#FF4B4B')
-        st.plotly_chart(fig_trend, use_container_width=True)
+        render_panel("stats_monthly_trend", panel_state)
         
         st.markdown("### 🌊 Distribusi Kedalaman Gempa")
-        fig_depth = px.histogram(
-            filtered_df,
-            x='depth',
-            nbins=30,
-            title='Distribusi Kedalaman Gempa',
-            labels={'depth': 'Kedalaman (km)', 'count': 'Frekuensi'}
-        )
-        fig_depth.update_traces(marker_color='#1f77b4')
-        st.plotly_chart(fig_depth, use_container_width=True)
+        render_panel("stats_depth_histogram", panel_state)
     
     with col2:
         st.markdown("### 💪 Rata-rata Magnitude per Bulan")
-        fig_mag = px.bar(
-            df_stats,
-            x='bulan',
-            y='rata_rata_magnitude',
-            title='Rata-rata Magnitude per Bulan',
-            labels={'bulan': 'Bulan', 'rata_rata_magnitude': 'Rata-rata Magnitude'}
-        )
-        fig_mag.update_traces(marker_color='#FF6B6B')
-        st.plotly_chart(fig_mag, use_container_width=True)
+        render_panel("stats_monthly_magnitude", panel_state)
         
         st.markdown("### 📊 Distribusi Magnitude")
-        fig_mag_dist = px.histogram(
-            filtered_df,
-            x='magnitude',
-            nbins=20,
-            title='Distribusi Magnitude Gempa',
-            labels={'magnitude': 'Magnitude', 'count': 'Frekuensi'}
-        )
-        fig_mag_dist.update_traces(marker_color='#FF9F1C')
-        st.plotly_chart(fig_mag_dist, use_container_width=True)
+        render_panel("stats_magnitude_histogram", panel_state)
 
 # TAB 3: Peta & Wilayah
-with tab3:
+elif active_tab == "🗺️ Peta & Wilayah":
     st.subheader("🗺️ Peta Sebaran Gempa")
     
-    # Peta scatter
-    fig_map = px.scatter_geo(
-        filtered_df,
-        lat='latitude',
-        lon='longitude',
-        color='magnitude',
-        size='magnitude',
-        hover_name='remark',
-        hover_data={'tanggal': True, 'waktu': True, 'depth': True, 'magnitude': True},
-        title='Sebaran Gempa Berdasarkan Lokasi',
-        color_continuous_scale='YlOrRd'
-    )
-    fig_map.update_geos(
-        projection_type="natural earth",
-        showcountries=True,
-        showcoastlines=True,
-        showland=True,
-        landcolor='lightgray'
-    )
-    st.plotly_chart(fig_map, use_container_width=True)
+    render_panel("region_map", panel_state)
     
     st.markdown("---")
     
@@ -518,79 +1016,112 @@ with tab3:
     
     with col1:
         st.markdown("### 📍 Top 10 Wilayah dengan Gempa Terbanyak")
-        top_regions = filtered_df['remark'].value_counts().head(10).reset_index()
-        top_regions.columns = ['Wilayah', 'Jumlah Gempa']
-        
-        fig_regions = px.bar(
-            top_regions,
-            x='Jumlah Gempa',
-            y='Wilayah',
-            orientation='h',
-            title='10 Wilayah Terdampak Terbanyak'
-        )
-        fig_regions.update_traces(marker_color='#2EC4B6')
-        st.plotly_chart(fig_regions, use_container_width=True)
+        render_panel("region_top10", panel_state)
     
     with col2:
         st.markdown("### 🔥 Gempa dengan Magnitude Tertinggi")
-        top_earthquakes = filtered_df.nlargest(10, 'magnitude')[
+        top_earthquakes = display_frame(
+            store.top(selection, 'magnitude', 10, ['tanggal', 'waktu_kejadian', 'magnitude', 'depth', 'remark']),
             ['tanggal', 'waktu', 'magnitude', 'depth', 'remark']
-        ]
+        )
         st.dataframe(top_earthquakes, use_container_width=True, hide_index=True)
+    
+    st.markdown("---")
+    st.markdown("### 🔎 Gempa di Sekitar Kota")
+    st.caption("Pencarian memakai indeks sel grid di database, sehingga tidak perlu memindai seluruh katalog.")
+    
+    col1, col2, col3 = st.columns([2, 2, 1])
+    with col1:
+        kota = st.selectbox("Pilih Kota", list(KOTA_INDONESIA.keys()))
+    with col2:
+        radius_km = st.slider("Radius (km)", min_value=10, max_value=500, value=100, step=10)
+    with col3:
+        max_results = st.number_input("Maksimal", min_value=10, max_value=1000, value=100, step=10)
+    
+    kota_lat, kota_lon = KOTA_INDONESIA[kota]
+    kolom_sekitar = ["tanggal", "waktu", "magnitude", "depth", "remark", "latitude", "longitude"]
+    nearby_df = to_dataframe(
+        view_earthquakes_within_radius(kota_lat, kota_lon, radius_km, filters, kolom_sekitar, int(max_results)),
+        kolom_sekitar + ["jarak_km"]
+    )
+    if nearby_df.empty:
+        st.info(f"Tidak ada gempa dalam radius {radius_km} km dari {kota}.")
+    else:
+        nearby_df['jarak_km'] = pd.to_numeric(nearby_df['jarak_km']).round(1)
+        st.dataframe(nearby_df, use_container_width=True, hide_index=True)
 
 # TAB 4: Analisis
-with tab4:
+elif active_tab == "📈 Analisis":
     st.subheader("📈 Analisis Lanjutan")
     
     col1, col2 = st.columns(2)
     
     with col1:
         st.markdown("### 🎯 Korelasi Magnitude vs Kedalaman")
-        fig_scatter = px.scatter(
-            filtered_df,
-            x='depth',
-            y='magnitude',
-            color='magnitude',
-            size='magnitude',
-            hover_data=['tanggal', 'remark'],
-            title='Hubungan Magnitude dengan Kedalaman',
-            labels={'depth': 'Kedalaman (km)', 'magnitude': 'Magnitude'},
-            color_continuous_scale='Turbo'
-        )
-        st.plotly_chart(fig_scatter, use_container_width=True)
+        render_panel("analysis_scatter", panel_state)
         
         st.markdown("### 📅 Aktivitas Gempa per Hari dalam Seminggu")
-        filtered_df['hari'] = filtered_df['tanggal'].dt.day_name()
-        day_order = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
-        day_counts = filtered_df['hari'].value_counts().reindex(day_order).fillna(0)
-        
-        fig_days = px.bar(
-            x=day_counts.index,
-            y=day_counts.values,
-            title='Frekuensi Gempa per Hari',
-            labels={'x': 'Hari', 'y': 'Jumlah Gempa'}
-        )
-        fig_days.update_traces(marker_color='#11999E')
-        st.plotly_chart(fig_days, use_container_width=True)
+        render_panel("analysis_weekdays", panel_state)
     
     with col2:
         st.markdown("### 🕐 Sebaran Waktu Kejadian Gempa")
-        filtered_df['jam'] = pd.to_datetime(filtered_df['waktu'], format='%H:%M:%S').dt.hour
-        hour_counts = filtered_df['jam'].value_counts().sort_index()
-        
-        fig_hours = px.line(
-            x=hour_counts.index,
-            y=hour_counts.values,
-            title='Distribusi Gempa per Jam',
-            labels={'x': 'Jam (24h)', 'y': 'Jumlah Gempa'},
-            markers=True
-        )
-        fig_hours.update_traces(line_color='#E63946')
-        st.plotly_chart(fig_hours, use_container_width=True)
+        render_panel("analysis_hours", panel_state)
         
         st.markdown("### 📊 Statistik Deskriptif")
-        stats_df = filtered_df[['magnitude', 'depth']].describe()
-        st.dataframe(stats_df, use_container_width=True)
+        st.dataframe(build_panel("analysis_describe", panel_state), use_container_width=True)
+    
+    st.markdown("---")
+    st.markdown("### 📉 Gutenberg-Richter: b-value & Magnitude of Completeness")
+    st.caption(
+        "Mc dari metode maximum curvature (+0.2), b-value dengan maximum likelihood Aki-Utsu. "
+        f"b-value hanya dihitung jika ada minimal {B_VALUE_MIN_EVENTS} gempa di atas Mc."
+    )
+    gr_view = st.radio(
+        "Tampilan", ["Distribusi Frekuensi-Magnitude", "Per Wilayah", "Jendela Waktu", "Peta Grid"],
+        horizontal=True, key="gr_view"
+    )
+    
+    if gr_view == "Distribusi Frekuensi-Magnitude":
+        fig_fmd, gr_fit_all = build_panel("analysis_gr_fmd", panel_state)
+        show_panel("analysis_gr_fmd", fig_fmd)
+        col1, col2, col3, col4 = st.columns(4)
+        col1.metric("Mc", f"{gr_fit_all['mc']:.1f}")
+        col2.metric("b-value", "-" if np.isnan(gr_fit_all['b']) else f"{gr_fit_all['b']:.2f} ± {gr_fit_all['b_err']:.3f}")
+        col3.metric("a-value", "-" if np.isnan(gr_fit_all['a']) else f"{gr_fit_all['a']:.2f}")
+        col4.metric("Gempa ≥ Mc", f"{gr_fit_all['n']:,}")
+    
+    elif gr_view == "Per Wilayah":
+        gr_regions = build_panel("analysis_gr_regions", panel_state)
+        if gr_regions.empty:
+            st.info("Tidak ada wilayah dengan data cukup untuk menghitung b-value.")
+        else:
+            st.dataframe(gr_regions, use_container_width=True, hide_index=True)
+    
+    elif gr_view == "Jendela Waktu":
+        col1, col2, col3 = st.columns([1, 1, 2])
+        with col1:
+            window_months = st.slider("Jendela (bulan)", min_value=3, max_value=36, value=12, step=3)
+        with col2:
+            step_months = st.slider("Geser (bulan)", min_value=1, max_value=12, value=1)
+        with col3:
+            gr_region = st.selectbox("Wilayah", ["Semua Wilayah"] + list(region_counts(30).index), key="gr_region")
+        fig_timeline, n_windows = build_panel(
+            "analysis_gr_timeline", panel_state, window_months=window_months, step_months=step_months,
+            region=None if gr_region == "Semua Wilayah" else gr_region
+        )
+        if n_windows == 0:
+            st.info("Tidak ada jendela waktu dengan data cukup untuk menghitung b-value.")
+        else:
+            show_panel("analysis_gr_timeline", fig_timeline)
+    
+    elif gr_view == "Peta Grid":
+        cell_size = st.select_slider("Ukuran Sel (derajat)", options=[0.5, 1.0, 2.0, 3.0], value=2.0)
+        fig_grid, n_cells = build_panel("analysis_gr_grid", panel_state, cell_size=cell_size)
+        if n_cells == 0:
+            st.info("Tidak ada sel grid dengan data cukup untuk menghitung b-value.")
+        else:
+            show_panel("analysis_gr_grid", fig_grid)
+            st.caption(f"{n_cells:,} sel grid dengan minimal {B_VALUE_MIN_EVENTS} gempa di atas Mc.")
 
 # Footer
 st.markdown("---")
@@ -601,4 +1132,14 @@ st.markdown(
     </div>
     """,
     unsafe_allow_html=True
-)
\ No newline at end of file
+)
+# Trace profiling rerun ini (hanya jika profiling aktif)
+trace = finish_rerun()
+if trace:
+    with st.sidebar.expander("⏱️ Profil Rerun", expanded=True):
+        st.caption(f"Total: {trace['total_ms']:.0f} ms | Query: {len(trace['queries'])} | Panel: {len(trace['panels'])}")
+        st.dataframe(pd.DataFrame(trace['sections']), use_container_width=True, hide_index=True)
+        if trace['panels']:
+            st.dataframe(pd.DataFrame(trace['panels']), use_container_width=True, hide_index=True)
+        if trace['queries']:
+            st.dataframe(pd.DataFrame(trace['queries']), use_container_width=True, hide_index=True)
@@ -0,0 +1,88 @@
+import numpy as np
+import pandas as pd
+
+from spatial import filter_bbox
+
+# ============================
+# Level-of-detail untuk peta sebaran gempa
+# ============================
+
+# Batas jumlah marker yang dikirim ke browser (titik + sel agregat)
+MAX_MARKERS = 3000
+# Sel dengan jumlah gempa <= batas ini ditampilkan sebagai titik individual
+SPARSE_THRESHOLD = 3
+# Zoom 1 = seluruh Indonesia; setiap naik satu level, viewport dan sel grid mengecil setengah
+ZOOM_MIN, ZOOM_MAX = 1, 8
+INDONESIA_CENTER = (-2.5, 118.0)
+VIEWPORT_SPAN = (30.0, 60.0)  # (lintang, bujur) pada zoom 1
+CLUSTER_COLUMNS = ['latitude', 'longitude', 'jumlah', 'magnitude_maks', 'depth_rata']
+
+def cell_size_for_zoom(zoom):
+    """Ukuran sel grid (derajat) untuk level zoom"""
+    return 1.0 / 2 ** (zoom - 1)
+
+def viewport(center, zoom):
+    """Bounding box (min_lat, min_lon, max_lat, max_lon) yang terlihat pada zoom tertentu"""
+    lat, lon = center
+    half_lat = VIEWPORT_SPAN[0] / 2 ** zoom
+    half_lon = VIEWPORT_SPAN[1] / 2 ** zoom
+    return lat - half_lat, lon - half_lon, lat + half_lat, lon + half_lon
+
+def aggregate_cells(df, cell_size):
+    """Mengelompokkan gempa ke sel grid: jumlah, magnitude maksimum, rata-rata kedalaman
+
+    Posisi sel adalah rata-rata koordinat anggotanya, jadi marker tetap berada
+    di tengah kumpulan episentrum, bukan di pojok sel.
+    """
+    row = np.floor(df['latitude'].to_numpy(dtype=float) / cell_size).astype(np.int64)
+    col = np.floor(df['longitude'].to_numpy(dtype=float) / cell_size).astype(np.int64)
+    # Kunci sel tunggal (int64) supaya groupby cukup satu kolom
+    cell = row * 1_000_000 + col
+    grouped = df.assign(sel=cell).groupby('sel', sort=False)
+    cells = grouped.agg(
+        latitude=('latitude', 'mean'),
+        longitude=('longitude', 'mean'),
+        jumlah=('magnitude', 'size'),
+        magnitude_maks=('magnitude', 'max'),
+        depth_rata=('depth', 'mean'),
+    )
+    return cell, cells
+
+def level_of_detail(df, cell_size, sparse_threshold=SPARSE_THRESHOLD, max_markers=MAX_MARKERS):
+    """Membagi data menjadi titik individual (sel jarang) dan sel agregat (sel padat)
+
+    Jika total marker melebihi max_markers, ukuran sel digandakan sampai muat,
+    sehingga payload peta tetap terbatas berapa pun ukuran katalog.
+    Mengembalikan (points, clusters, cell_size yang dipakai).
+    """
+    if len(df) <= max_markers:
+        return df, pd.DataFrame(columns=CLUSTER_COLUMNS), cell_size
+
+    while True:
+        cell, cells = aggregate_cells(df, cell_size)
+        sparse = cells.index[cells['jumlah'] <= sparse_threshold]
+        point_mask = np.isin(cell, sparse.to_numpy())
+        clusters = cells[cells['jumlah'] > sparse_threshold]
+        if int(point_mask.sum()) + len(clusters) <= max_markers:
+            return df[point_mask], clusters.reset_index(drop=True), cell_size
+        cell_size *= 2
+
+def map_view(df, zoom=ZOOM_MIN, center=INDONESIA_CENTER, max_markers=MAX_MARKERS):
+    """Data peta untuk satu viewport: (points, clusters, bbox, cell_size)"""
+    zoom = min(max(int(zoom), ZOOM_MIN), ZOOM_MAX)
+    bbox = viewport(center, zoom)
+    visible = filter_bbox(df, *bbox) if zoom > ZOOM_MIN else df
+    points, clusters, cell_size = level_of_detail(
+        visible, cell_size_for_zoom(zoom), max_markers=max_markers
+    )
+    return points, clusters, bbox, cell_size
+
+def density_points(df, cell_size, max_markers=MAX_MARKERS):
+    """Titik berbobot untuk heatmap: satu titik per sel dengan bobot jumlah gempa"""
+    if len(df) <= max_markers:
+        return df.assign(bobot=1)
+    while True:
+        _, cells = aggregate_cells(df, cell_size)
+        if len(cells) <= max_markers:
+            return cells.reset_index(drop=True).rename(columns={'jumlah': 'bobot'})
+        cell_size *= 2
@@ -0,0 +1,63 @@
+import os
+import time
+
+import streamlit as st
+
+from query_cache import QueryCache, _freeze
+from profiler import record_render, timed_panel
+from query_stats import query_stats
+
+# ============================
+# Panel visualisasi: dibangun hanya saat tampil, di-cache per state filter
+# ============================
+
+# Jumlah figure yang disimpan per sesi dan umur maksimumnya (detik)
+PANEL_CACHE_SIZE = int(os.getenv('PANEL_CACHE_SIZE', '32'))
+PANEL_CACHE_TTL = int(os.getenv('PANEL_CACHE_TTL', '600'))
+
+# nama panel -> (bagian dashboard, fungsi pembuat figure)
+PANELS = {}
+
+def panel(section, name=None):
+    """Decorator: mendaftarkan fungsi pembuat figure sebagai panel di satu bagian dashboard"""
+    def register(func):
+        PANELS[name or func.__name__] = (section, func)
+        return func
+    return register
+
+def panels_in(section):
+    """Nama panel yang terdaftar untuk satu bagian, urut sesuai pendaftaran"""
+    return [name for name, (sec, _) in PANELS.items() if sec == section]
+
+def _session_cache():
+    # Figure bergantung pada filter milik sesi, jadi cache disimpan per sesi
+    if 'panel_cache' not in st.session_state:
+        st.session_state['panel_cache'] = QueryCache(maxsize=PANEL_CACHE_SIZE, ttl=PANEL_CACHE_TTL)
+    return st.session_state['panel_cache']
+
+def build(name, state_key, **params):
+    """Hasil panel untuk state filter + parameter widget; dibangun ulang hanya jika belum ada"""
+    cache = _session_cache()
+    key = (name, _freeze(state_key), _freeze(params))
+    found, result = cache.get(key)
+    with timed_panel(name, cached=found):
+        if not found:
+            with query_stats.measure(f"panel:{name}"):
+                result = PANELS[name][1](**params)
+            cache.set(key, result)
+    return result
+
+def render(name, state_key, **params):
+    """Membangun (atau mengambil dari cache) lalu menampilkan figure panel"""
+    return show(name, build(name, state_key, **params))
+
+def show(name, fig):
+    """st.plotly_chart dengan waktu serialisasi & ukuran payload tercatat di profiler"""
+    start = time.perf_counter()
+    st.plotly_chart(fig, use_container_width=True)
+    record_render(name, fig, (time.perf_counter() - start) * 1000)
+    return fig
+
+def cache_stats():
+    """Counter cache panel untuk sesi ini"""
+    return _session_cache().stats()
@@ -0,0 +1,214 @@
+import argparse
+import csv
+import io
+import os
+import time
+from multiprocessing import Pool
+
+import pandas as pd
+
+from import_data import (
+    BATCH_SIZE, REJECTED_FILE, RejectedRowWriter, connect_db, finalize_import, write_batch
+)
+
+# Ukuran potongan file yang diparse oleh satu worker
+CHUNK_BYTES = 8 * 1024 * 1024
+
+def split_file(csv_file, chunk_bytes=CHUNK_BYTES):
+    """Membagi file CSV menjadi rentang byte yang selalu berakhir di batas baris"""
+    file_size = os.path.getsize(csv_file)
+    with open(csv_file, 'rb') as f:
+        header = f.readline()
+        start = f.tell()
+        ranges = []
+        while start < file_size:
+            f.seek(min(start + chunk_bytes, file_size))
+            # Maju sampai akhir baris agar tidak memotong satu record
+            f.readline()
+            end = min(f.tell(), file_size)
+            ranges.append((start, end))
+            start = end
+    fieldnames = header.decode('utf-8-sig').strip().split(',')
+    return fieldnames, ranges
+
+def parse_frame(df):
+    """Parse vektor kolom CSV (tgl M/D/YYYY, ot HH.MM.SS) menjadi kolom katalog_gempa"""
+    tanggal = pd.to_datetime(df['tgl'], format='%m/%d/%Y', errors='coerce')
+    waktu = pd.to_datetime(df['ot'], format='%H.%M.%S', errors='coerce')
+    latitude = pd.to_numeric(df['lat'], errors='coerce')
+    longitude = pd.to_numeric(df['lon'], errors='coerce')
+    depth = pd.to_numeric(df['depth'], errors='coerce')
+    magnitude = pd.to_numeric(df['mag'], errors='coerce')
+
+    errors = pd.Series('', index=df.index)
+    errors[tanggal.isna()] += 'tgl tidak valid; '
+    errors[waktu.isna()] += 'ot tidak valid; '
+    errors[latitude.isna()] += 'lat tidak valid; '
+    errors[longitude.isna()] += 'lon tidak valid; '
+    errors[depth.isna() | (depth % 1 != 0)] += 'depth tidak valid; '
+    errors[magnitude.isna()] += 'mag tidak valid; '
+    valid = errors == ''
+
+    parsed = pd.DataFrame({
+        'tanggal': tanggal[valid].dt.strftime('%Y-%m-%d'),
+        'waktu': waktu[valid].dt.strftime('%H:%M:%S'),
+        'latitude': latitude[valid].astype(float),
+        'longitude': longitude[valid].astype(float),
+        'depth': depth[valid].astype(int),
+        'magnitude': magnitude[valid].astype(float),
+        'remark': df['remark'][valid],
+    })
+    return parsed, errors[~valid].str.rstrip('; ')
+
+def _read_records(data, fieldnames):
+    """Membaca potongan CSV: (DataFrame record, nomor baris fisik per record, baris ditolak)
+
+    Jalur cepat pd.read_csv dipakai jika setiap baris fisik adalah satu record
+    dengan jumlah kolom yang benar (tanpa tanda kutip dan baris kosong), sehingga
+    nomor baris = indeks record. Selain itu potongan dibaca per record dengan
+    csv.reader agar baris rusak ditolak satu per satu seperti di import_data.py.
+    """
+    lines = data.splitlines()
+    separators = len(fieldnames) - 1
+    if b'"' not in data and all(line.count(b',') == separators for line in lines):
+        df = pd.read_csv(
+            io.BytesIO(data), header=None, names=fieldnames,
+            dtype=str, keep_default_na=False, skip_blank_lines=False
+        )
+        return df, df.index.to_numpy(), []
+
+    records, lines, rejected = [], [], []
+    reader = csv.reader(io.StringIO(data.decode('utf-8')))
+    line = 0
+    for row in reader:
+        start, line = line, reader.line_num
+        if not row:
+            continue
+        if len(row) != len(fieldnames):
+            rejected.append((start, dict(zip(fieldnames, row)), f"jumlah kolom {len(row)}, seharusnya {len(fieldnames)}"))
+            continue
+        records.append(row)
+        lines.append(start)
+    return pd.DataFrame(records, columns=fieldnames), lines, rejected
+
+def parse_chunk(task):
+    """Worker: membaca satu rentang byte dan mengembalikan baris valid + baris ditolak
+
+    Baris ditolak berisi nomor baris fisik relatif terhadap awal potongan;
+    writer menambahkan nomor baris awal potongan.
+    """
+    csv_file, fieldnames, start, end = task
+    t0 = time.perf_counter()
+    with open(csv_file, 'rb') as f:
+        f.seek(start)
+        data = f.read(end - start)
+
+    df, lines, rejected = _read_records(data, fieldnames)
+    parsed, errors = parse_frame(df.reset_index(drop=True))
+    rows = list(parsed.itertuples(index=False, name=None))
+    rejected += [
+        (int(lines[i]), df.iloc[i].to_dict(), msg) for i, msg in errors.items()
+    ]
+    rejected.sort(key=lambda item: item[0])
+    n_lines = data.count(b'\n') + (0 if data.endswith(b'\n') or not data else 1)
+    return rows, rejected, len(df) + len(rejected), n_lines, time.perf_counter() - t0
+
+def import_csv_parallel(csv_file, workers=None, chunk_bytes=CHUNK_BYTES, method='copy',
+                        batch_size=BATCH_SIZE, rejected_file=REJECTED_FILE):
+    """Import CSV besar: parse paralel di process pool, satu writer berurutan ke database"""
+    conn = connect_db()
+    if not conn:
+        return
+
+    fieldnames, ranges = split_file(csv_file, chunk_bytes)
+    tasks = [(csv_file, fieldnames, start, end) for start, end in ranges]
+    workers = workers or os.cpu_count() or 1
+    print(f"✓ File dibagi menjadi {len(tasks)} potongan, {workers} worker")
+
+    rejected = RejectedRowWriter(rejected_file, fieldnames)
+    total_rows = 0
+    loaded = 0
+    dates = set()
+    line_base = 2
+    parse_seconds = 0.0
+    wait_seconds = 0.0
+    load_seconds = 0.0
+    wall_start = time.perf_counter()
+
+    try:
+        with Pool(workers) as pool:
+            results = pool.imap(parse_chunk, tasks)
+            while True:
+                t0 = time.perf_counter()
+                try:
+                    rows, rejects, n_records, n_lines, worker_seconds = next(results)
+                except StopIteration:
+                    break
+                wait_seconds += time.perf_counter() - t0
+                parse_seconds += worker_seconds
+                total_rows += n_records
+
+                for offset, row, msg in rejects:
+                    rejected.write(line_base + offset, row, msg)
+                # Nomor baris dari jumlah baris fisik potongan (termasuk baris kosong)
+                line_base += n_lines
+
+                # Writer tunggal: batch ditulis sesuai urutan file
+                t0 = time.perf_counter()
+                for k in range(0, len(rows), batch_size):
+                    method, inserted = write_batch(conn, rows[k:k + batch_size], method)
+                    # Kejadian yang sudah ada di katalog dilewati write_batch
+                    loaded += inserted
+                load_seconds += time.perf_counter() - t0
+                dates.update(row[0] for row in rows)
+                print(f"✓ {loaded} data berhasil diimport...")
+
+        if dates:
+            finalize_import(conn, dates)
+        wall = time.perf_counter() - wall_start
+        print(f"\n✓ Total {loaded} data berhasil diimport ke database! ({wall:.1f} detik, metode: {method})")
+        print_stage_report(total_rows, loaded, parse_seconds, wait_seconds, load_seconds, wall, workers)
+        if rejected.count:
+            print(f"⚠️ {rejected.count} baris ditolak, lihat {rejected_file}")
+
+    except Exception as e:
+        print(f"✗ Error saat import data: {e}")
+        conn.rollback()
+        if dates:
+            # Batch yang sudah ter-commit tetap masuk rekap dan versi katalog
+            finalize_import(conn, dates)
+    finally:
+        rejected.close()
+        conn.close()
+
+def _rate(rows, seconds):
+    return rows / seconds if seconds > 0 else float('inf')
+
+def print_stage_report(total_rows, loaded, parse_seconds, wait_seconds, load_seconds, wall, workers):
+    """Menampilkan throughput (baris/detik) per tahap pipeline"""
+    print("\n=== Throughput per Tahap ===")
+    print(f"Parse  : {_rate(total_rows, parse_seconds):,.0f} baris/detik per worker "
+          f"(~{_rate(total_rows, parse_seconds / workers):,.0f} baris/detik dengan {workers} worker)")
+    print(f"Load   : {_rate(loaded, load_seconds):,.0f} baris/detik")
+    print(f"Total  : {_rate(loaded, wall):,.0f} baris/detik")
+    # Writer menunggu hasil parse lebih lama dari waktu menulis -> parse yang jadi batas
+    bottleneck = "parse" if wait_seconds > load_seconds else "load"
+    print(f"Writer menunggu parse {wait_seconds:.1f} detik, menulis {load_seconds:.1f} detik "
+          f"-> bottleneck: {bottleneck}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Import paralel katalog gempa berukuran besar")
+    parser.add_argument("csv_file", nargs="?", default="katalog_gempa_new.csv")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="Jumlah proses parser (default: jumlah CPU)")
+    parser.add_argument("--chunk-mb", type=float, default=CHUNK_BYTES / (1024 * 1024),
+                        help="Ukuran potongan file per worker (MB)")
+    parser.add_argument("--method", choices=["copy", "values"], default="copy")
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+    args = parser.parse_args()
+
+    print("=== Program Import Paralel Data Gempa ===\n")
+    import_csv_parallel(
+        args.csv_file, workers=args.workers, chunk_bytes=int(args.chunk_mb * 1024 * 1024),
+        method=args.method, batch_size=args.batch_size
+    )
@@ -0,0 +1,211 @@
+import argparse
+import os
+from datetime import timedelta
+
+from psycopg2 import sql
+
+from rollups import _to_date
+
+# ============================
+# Partisi range katalog_gempa per tahun / bulan (kolom tanggal)
+# ============================
+
+PARENT_TABLE = "katalog_gempa"
+# 'year' -> katalog_gempa_2018, 'month' -> katalog_gempa_2018_01
+PARTITION_INTERVAL = os.getenv('PARTITION_INTERVAL', 'year')
+# Schema tujuan partisi yang dilepas dari tabel utama
+ARCHIVE_SCHEMA = os.getenv('ARCHIVE_SCHEMA', 'arsip')
+
+def partition_bounds(day, interval=PARTITION_INTERVAL):
+    """Rentang [awal, akhir) partisi yang memuat tanggal day"""
+    day = _to_date(day)
+    if interval == 'month':
+        start = day.replace(day=1)
+        end = (start + timedelta(days=32)).replace(day=1)
+    else:
+        start = day.replace(month=1, day=1)
+        end = start.replace(year=start.year + 1)
+    return start, end
+
+def partition_name(day, interval=PARTITION_INTERVAL):
+    """Nama tabel partisi untuk tanggal day"""
+    start, _ = partition_bounds(day, interval)
+    if interval == 'month':
+        return f"{PARENT_TABLE}_{start:%Y_%m}"
+    return f"{PARENT_TABLE}_{start:%Y}"
+
+def is_partitioned(cursor):
+    """True jika katalog_gempa adalah tabel partisi (database lama masih tabel biasa)"""
+    cursor.execute("SELECT relkind FROM pg_class WHERE oid = %s::regclass", (PARENT_TABLE,))
+    row = cursor.fetchone()
+    return row is not None and row[0] == 'p'
+
+def list_partitions(cursor):
+    """Partisi yang terpasang: [(nama, batas partisi, perkiraan jumlah baris)]"""
+    cursor.execute("""
+        SELECT c.relname, pg_get_expr(c.relpartbound, c.oid), c.reltuples::BIGINT
+        FROM pg_inherits i
+        JOIN pg_class c ON c.oid = i.inhrelid
+        WHERE i.inhparent = %s::regclass
+        ORDER BY c.relname
+    """, (PARENT_TABLE,))
+    return cursor.fetchall()
+
+def ensure_partitions(cursor, dates, interval=PARTITION_INTERVAL):
+    """Membuat partisi yang belum ada untuk tanggal-tanggal yang akan ditulis
+
+    Dipanggil importer sebelum menulis batch; mengembalikan nama partisi baru.
+    Tidak melakukan apa-apa jika katalog_gempa belum dimigrasi ke tabel partisi.
+    """
+    needed = {}
+    for day in dates:
+        start, end = partition_bounds(day, interval)
+        needed.setdefault(partition_name(start, interval), (start, end))
+    if not needed or not is_partitioned(cursor):
+        return []
+
+    existing = {name for name, _, _ in list_partitions(cursor)}
+    created = []
+    for name, (start, end) in sorted(needed.items()):
+        if name in existing:
+            continue
+        cursor.execute(
+            sql.SQL("CREATE TABLE IF NOT EXISTS {} PARTITION OF {} FOR VALUES FROM (%s) TO (%s)").format(
+                sql.Identifier(name), sql.Identifier(PARENT_TABLE)
+            ),
+            (start, end)
+        )
+        created.append(name)
+    if created:
+        print(f"✓ Partisi baru: {', '.join(created)}")
+    return created
+
+def is_partition(cursor, name, schema='public'):
+    """True jika schema.name adalah partisi yang terpasang di katalog_gempa"""
+    cursor.execute("""
+        SELECT 1
+        FROM pg_inherits i
+        JOIN pg_class c ON c.oid = i.inhrelid
+        JOIN pg_namespace n ON n.oid = c.relnamespace
+        WHERE i.inhparent = %s::regclass AND c.relname = %s AND n.nspname = %s
+    """, (PARENT_TABLE, name, schema))
+    return cursor.fetchone() is not None
+
+def is_archived_partition(cursor, name, schema=ARCHIVE_SCHEMA):
+    """True jika schema.name adalah partisi katalog_gempa yang sudah dilepas ke arsip
+
+    Tabel yang dilepas tidak lagi tercatat di pg_inherits, jadi dicek dari
+    nama (katalog_gempa_...) dan bahwa tabelnya tabel biasa tanpa induk.
+    """
+    if not name.startswith(f"{PARENT_TABLE}_"):
+        return False
+    cursor.execute("""
+        SELECT 1
+        FROM pg_class c
+        JOIN pg_namespace n ON n.oid = c.relnamespace
+        WHERE c.relname = %s AND n.nspname = %s AND c.relkind = 'r'
+          AND NOT EXISTS (SELECT 1 FROM pg_inherits i WHERE i.inhrelid = c.oid)
+    """, (name, schema))
+    return cursor.fetchone() is not None
+
+def _partition_range(cursor, name, schema='public'):
+    """Tanggal pertama dan terakhir data di sebuah partisi"""
+    cursor.execute(
+        sql.SQL("SELECT MIN(tanggal), MAX(tanggal) FROM {}").format(sql.Identifier(schema, name))
+    )
+    return cursor.fetchone()
+
+def detach_partition(conn, name, schema=ARCHIVE_SCHEMA):
+    """Melepas partisi lama dari katalog_gempa dan memindahkannya ke schema arsip
+
+    Data partisi tidak dihapus; partisi lain (data terbaru) tidak disentuh.
+    Rekap untuk tanggal di partisi tersebut dihitung ulang dan versi katalog naik.
+    """
+    from import_data import finalize_import
+
+    cursor = conn.cursor()
+    try:
+        if not is_partition(cursor, name):
+            print(f"✗ {name} bukan partisi {PARENT_TABLE}")
+            return False
+        first, last = _partition_range(cursor, name)
+        cursor.execute(sql.SQL("CREATE SCHEMA IF NOT EXISTS {}").format(sql.Identifier(schema)))
+        cursor.execute(sql.SQL("ALTER TABLE {} DETACH PARTITION {}").format(
+            sql.Identifier(PARENT_TABLE), sql.Identifier(name)
+        ))
+        cursor.execute(sql.SQL("ALTER TABLE {} SET SCHEMA {}").format(
+            sql.Identifier(name), sql.Identifier(schema)
+        ))
+        conn.commit()
+        print(f"✓ Partisi {name} dipindahkan ke {schema}.{name}")
+    except Exception as e:
+        conn.rollback()
+        print(f"✗ Gagal melepas partisi {name}: {e}")
+        return False
+    finally:
+        cursor.close()
+
+    if first is not None:
+        finalize_import(conn, [first + timedelta(days=i) for i in range((last - first).days + 1)])
+    return True
+
+def attach_partition(conn, name, schema=ARCHIVE_SCHEMA, interval=PARTITION_INTERVAL):
+    """Memasang kembali partisi dari schema arsip ke katalog_gempa"""
+    from import_data import finalize_import
+
+    cursor = conn.cursor()
+    try:
+        if not is_archived_partition(cursor, name, schema):
+            print(f"✗ {schema}.{name} bukan partisi {PARENT_TABLE} yang diarsipkan")
+            return False
+        first, last = _partition_range(cursor, name, schema)
+        if first is None:
+            print(f"⚠️ Partisi {schema}.{name} kosong, tidak dipasang")
+            return False
+        start, end = partition_bounds(first, interval)
+        cursor.execute(sql.SQL("ALTER TABLE {} SET SCHEMA public").format(sql.Identifier(schema, name)))
+        cursor.execute(
+            sql.SQL("ALTER TABLE {} ATTACH PARTITION {} FOR VALUES FROM (%s) TO (%s)").format(
+                sql.Identifier(PARENT_TABLE), sql.Identifier(name)
+            ),
+            (start, end)
+        )
+        conn.commit()
+        print(f"✓ Partisi {name} dipasang kembali ({start} s/d {end})")
+    except Exception as e:
+        conn.rollback()
+        print(f"✗ Gagal memasang partisi {name}: {e}")
+        return False
+    finally:
+        cursor.close()
+
+    finalize_import(conn, [first + timedelta(days=i) for i in range((last - first).days + 1)])
+    return True
+
+if __name__ == "__main__":
+    from import_data import connect_db
+
+    parser = argparse.ArgumentParser(description="Kelola partisi tabel katalog_gempa")
+    sub = parser.add_subparsers(dest="perintah", required=True)
+    sub.add_parser("list", help="Tampilkan partisi yang terpasang")
+    detach = sub.add_parser("detach", help="Lepas partisi lama ke schema arsip")
+    detach.add_argument("nama", help="Nama partisi, misal katalog_gempa_2018")
+    attach = sub.add_parser("attach", help="Pasang kembali partisi dari schema arsip")
+    attach.add_argument("nama", help="Nama partisi, misal katalog_gempa_2018")
+    args = parser.parse_args()
+
+    conn = connect_db()
+    if conn:
+        try:
+            if args.perintah == "list":
+                cursor = conn.cursor()
+                for name, bound, rows in list_partitions(cursor):
+                    jumlah = f"±{rows} baris" if rows >= 0 else "belum di-ANALYZE"
+                    print(f"{name}: {bound} ({jumlah})")
+                cursor.close()
+            elif args.perintah == "detach":
+                detach_partition(conn, args.nama)
+            else:
+                attach_partition(conn, args.nama)
+        finally:
+            conn.close()
@@ -0,0 +1,220 @@
+import json
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+
+import pandas as pd
+
+# ============================
+# Profiler render: waktu per bagian script, per panel, dan ukuran payload per rerun
+# ============================
+
+# Aktif untuk semua sesi lewat env, atau per sesi dengan ?profil=1
+DASHBOARD_PROFILE = os.getenv('DASHBOARD_PROFILE', '0') == '1'
+# Folder file trace (bukan folder kerja dashboard)
+PROFILE_TRACE_DIR = os.getenv('PROFILE_TRACE_DIR', 'profile_traces')
+# File JSONL di PROFILE_TRACE_DIR, satu baris per rerun (kosong = tidak ditulis)
+PROFILE_TRACE_FILE = os.getenv('PROFILE_TRACE_FILE', 'render_trace.jsonl')
+# Batas ukuran file trace; jika terlewati file dirotasi ke <file>.1 (trace lama di .1 dibuang)
+PROFILE_TRACE_MAX_BYTES = int(os.getenv('PROFILE_TRACE_MAX_BYTES', str(20 * 1024 * 1024)))
+
+# Script Streamlit satu sesi berjalan di satu thread, jadi profiler rerun
+# yang aktif disimpan per thread
+_local = threading.local()
+_file_lock = threading.Lock()
+
+def current():
+    """Profiler rerun yang sedang berjalan di thread ini (None jika profiling mati)"""
+    return getattr(_local, 'profiler', None)
+
+@contextmanager
+def activate(profiler):
+    """Memakai profiler rerun di thread lain (misal query paralel) selama blok berjalan"""
+    previous = current()
+    _local.profiler = profiler
+    try:
+        yield
+    finally:
+        _local.profiler = previous
+
+class RenderProfiler:
+    """Mencatat satu rerun main.py: bagian script, query, tahap Python, dan panel"""
+
+    def __init__(self, session_id='', page=''):
+        self.session_id = session_id
+        self.page = page
+        self.started_at = datetime.now()
+        self._start = time.perf_counter()
+        self._section = None
+        self._section_start = None
+        self.sections = []
+        self.queries = []
+        self.stages = []
+        self.panels = []
+
+    def _elapsed_ms(self, since):
+        return round((time.perf_counter() - since) * 1000, 3)
+
+    def mark(self, name):
+        """Menutup bagian sebelumnya dan memulai bagian baru (checkpoint di alur script)"""
+        now = time.perf_counter()
+        if self._section is not None:
+            self.sections.append({'section': self._section, 'ms': round((now - self._section_start) * 1000, 3)})
+        self._section, self._section_start = name, now
+
+    def record_query(self, name, execute_ms, fetch_ms, rows, size):
+        self.queries.append({
+            'query': name, 'execute_ms': round(execute_ms, 3), 'fetch_ms': round(fetch_ms, 3),
+            'rows': rows, 'bytes': size,
+        })
+
+    def record_stage(self, name, ms):
+        self.stages.append({'stage': name, 'ms': round(ms, 3)})
+
+    def record_panel(self, name, build_ms, cached, render_ms=None, payload_bytes=None):
+        self.panels.append({
+            'panel': name, 'cached': cached, 'build_ms': round(build_ms, 3),
+            'render_ms': None if render_ms is None else round(render_ms, 3),
+            'payload_bytes': payload_bytes,
+        })
+
+    def finish(self):
+        """Menutup rerun; mengembalikan trace sebagai dict"""
+        self.mark(None)
+        return {
+            'started_at': self.started_at.isoformat(timespec='milliseconds'),
+            'session_id': self.session_id,
+            'page': self.page,
+            'total_ms': self._elapsed_ms(self._start),
+            'sections': self.sections,
+            'queries': self.queries,
+            'stages': self.stages,
+            'panels': self.panels,
+        }
+
+def start_rerun(enabled, session_id='', page=''):
+    """Memulai profiler untuk rerun ini; None jika profiling tidak aktif"""
+    _local.profiler = RenderProfiler(session_id, page) if enabled else None
+    return _local.profiler
+
+def trace_path():
+    """Path file trace dari env, None jika penulisan trace dimatikan"""
+    if not PROFILE_TRACE_FILE:
+        return None
+    return os.path.join(PROFILE_TRACE_DIR, PROFILE_TRACE_FILE)
+
+def _append_trace(path, line, max_bytes=PROFILE_TRACE_MAX_BYTES):
+    """Menambahkan satu baris trace; file dirotasi ke .1 sebelum melewati max_bytes"""
+    with _file_lock:
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        try:
+            size = os.path.getsize(path)
+        except FileNotFoundError:
+            size = 0
+        if max_bytes and size and size + len(line) > max_bytes:
+            os.replace(path, path + '.1')
+        with open(path, 'a', encoding='utf-8') as f:
+            f.write(line)
+
+def finish_rerun(path=None):
+    """Menutup profiler rerun ini dan menambahkan trace-nya ke file JSONL"""
+    profiler = current()
+    _local.profiler = None
+    if profiler is None:
+        return None
+    trace = profiler.finish()
+    path = path if path is not None else trace_path()
+    if path:
+        _append_trace(path, json.dumps(trace, default=str) + '\n')
+    return trace
+
+@contextmanager
+def timed_panel(name, cached):
+    """Mengukur pembuatan figure panel (build) jika profiling aktif"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        profiler = current()
+        if profiler is not None:
+            profiler.record_panel(name, (time.perf_counter() - start) * 1000, cached)
+
+def figure_payload_bytes(fig):
+    """Ukuran JSON figure yang dikirim ke browser"""
+    return len(fig.to_json()) if hasattr(fig, 'to_json') else None
+
+def record_render(name, fig, render_ms):
+    """Melengkapi catatan panel terakhir dengan waktu st.plotly_chart dan ukuran payload"""
+    profiler = current()
+    if profiler is None:
+        return
+    size = figure_payload_bytes(fig)
+    for entry in reversed(profiler.panels):
+        if entry['panel'] == name and entry['render_ms'] is None:
+            entry['render_ms'] = round(render_ms, 3)
+            entry['payload_bytes'] = size
+            return
+    profiler.record_panel(name, 0.0, True, render_ms, size)
+
+# ============================
+# Agregasi trace
+# ============================
+
+def load_traces(path=None):
+    """Membaca file trace JSONL (beserta rotasi .1 jika ada) menjadi list dict"""
+    path = path or trace_path()
+    traces = []
+    for name in (path + '.1', path):
+        if name == path or os.path.exists(name):
+            with open(name, encoding='utf-8') as f:
+                traces.extend(json.loads(line) for line in f if line.strip())
+    return traces
+
+def summarize(traces):
+    """Ringkasan p50/p95 per bagian, query, dan panel dari banyak rerun"""
+    def _table(rows, key, value):
+        if not rows:
+            return pd.DataFrame()
+        df = pd.DataFrame(rows)
+        grouped = df.groupby(key)[value]
+        return pd.DataFrame({
+            'count': grouped.count(),
+            'p50_ms': grouped.quantile(0.5),
+            'p95_ms': grouped.quantile(0.95),
+            'max_ms': grouped.max(),
+        }).sort_values('p95_ms', ascending=False).round(3)
+
+    queries = [dict(q, ms=q['execute_ms'] + q['fetch_ms']) for t in traces for q in t['queries']]
+    panels = [dict(p, ms=p['build_ms'] + (p['render_ms'] or 0)) for t in traces for p in t['panels']]
+    panel_table = _table(panels, 'panel', 'ms')
+    if panels:
+        payload = pd.DataFrame(panels).groupby('panel')['payload_bytes'].max()
+        panel_table['payload_bytes'] = payload.reindex(panel_table.index)
+        panel_table['cache_hit_rate'] = pd.DataFrame(panels).groupby('panel')['cached'].mean().round(2)
+    return {
+        'reruns': _table([{'page': t['page'], 'ms': t['total_ms']} for t in traces], 'page', 'ms'),
+        'sections': _table([s for t in traces for s in t['sections']], 'section', 'ms'),
+        'queries': _table(queries, 'query', 'ms'),
+        'stages': _table([s for t in traces for s in t['stages']], 'stage', 'ms'),
+        'panels': panel_table,
+    }
+
+if __name__ == "__main__":
+    path = sys.argv[1] if len(sys.argv) > 1 else trace_path()
+    if not path:
+        print("✗ PROFILE_TRACE_FILE kosong, tidak ada file trace")
+        sys.exit(1)
+    try:
+        traces = load_traces(path)
+    except FileNotFoundError:
+        print(f"✗ File trace tidak ditemukan: {path}")
+        sys.exit(1)
+    print(f"✓ {len(traces)} rerun dibaca dari {path}")
+    with pd.option_context('display.width', 160, 'display.max_columns', 20):
+        for title, table in summarize(traces).items():
+            if not table.empty:
+                print(f"\n=== {title} ===")
+                print(table.to_string())
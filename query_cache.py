@@ -0,0 +1,129 @@
+import functools
+import threading
+import time
+from collections import OrderedDict
+from datetime import date, time as dtime
+
+def _freeze(value):
+    """Mengubah argumen query (dict/list) menjadi bentuk hashable untuk key cache"""
+    if isinstance(value, dict):
+        return tuple(sorted((k, _freeze(v)) for k, v in value.items()))
+    if isinstance(value, (list, tuple, set)):
+        return tuple(_freeze(v) for v in value)
+    if isinstance(value, (str, int, float, bool, date, dtime)) or value is None:
+        return value
+    return repr(value)
+
+class QueryCache:
+    """Cache hasil query dengan TTL, eviksi LRU, dan invalidasi berdasarkan versi katalog
+
+    version_loader: fungsi tanpa argumen yang mengembalikan versi katalog di database.
+    Versi dicek paling sering setiap version_check_interval detik; jika berubah
+    (misal setelah import_data.py selesai), seluruh cache dikosongkan.
+    """
+
+    def __init__(self, maxsize=128, ttl=300, version_loader=None, version_check_interval=10):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.version_loader = version_loader
+        self.version_check_interval = version_check_interval
+        self._data = OrderedDict()  # key -> (waktu kadaluarsa, hasil)
+        self._lock = threading.Lock()
+        self._version = None
+        self._version_checked_at = 0.0
+        # Naik setiap invalidasi; hasil yang dihitung sebelum invalidasi tidak disimpan
+        self._generation = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def _check_version(self):
+        if self.version_loader is None:
+            return
+        now = time.monotonic()
+        if now - self._version_checked_at < self.version_check_interval:
+            return
+        self._version_checked_at = now
+        version = self.version_loader()
+        if version is None:
+            return
+        if self._version is not None and version != self._version:
+            self.invalidate()
+        self._version = version
+
+    def get(self, key):
+        """Mengembalikan (ditemukan, hasil) dan memperbarui urutan LRU"""
+        self._check_version()
+        with self._lock:
+            item = self._data.get(key)
+            if item is not None:
+                expires_at, value = item
+                if expires_at > time.monotonic():
+                    self._data.move_to_end(key)
+                    self.hits += 1
+                    return True, value
+                del self._data[key]
+            self.misses += 1
+            return False, None
+
+    @property
+    def generation(self):
+        """Penanda invalidasi; diambil sebelum menghitung hasil yang akan di-set"""
+        return self._generation
+
+    def set(self, key, value, ttl=None, generation=None):
+        """Menyimpan hasil; dilewati jika cache sudah diinvalidasi sejak generation diambil"""
+        ttl = self.ttl if ttl is None else ttl
+        with self._lock:
+            if generation is not None and generation != self._generation:
+                return
+            self._data[key] = (time.monotonic() + ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self):
+        """Mengosongkan seluruh cache (dipanggil saat katalog berubah)"""
+        with self._lock:
+            self._data.clear()
+            self._generation += 1
+            self.invalidations += 1
+
+    def cached(self, func=None, ttl=None):
+        """Decorator: cache hasil fungsi berdasarkan nama fungsi + argumen"""
+        if func is None:
+            return lambda f: self.cached(f, ttl=ttl)
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            key = (func.__name__, _freeze(args), _freeze(kwargs))
+            found, value = self.get(key)
+            if found:
+                return value
+            # Query yang mulai sebelum versi naik / NOTIFY tidak boleh masuk cache sesudahnya
+            generation = self.generation
+            value = func(*args, **kwargs)
+            self.set(key, value, ttl, generation)
+            return value
+
+        wrapper.uncached = func
+        return wrapper
+
+    def stats(self):
+        """Counter cache untuk menentukan ukuran dan TTL yang tepat"""
+        with self._lock:
+            size = len(self._data)
+        total = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / total if total else 0.0,
+            'evictions': self.evictions,
+            'invalidations': self.invalidations,
+            'size': size,
+            'maxsize': self.maxsize,
+            'ttl': self.ttl,
+            'catalog_version': self._version,
+        }
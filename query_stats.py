@@ -0,0 +1,197 @@
+import atexit
+import json
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from datetime import datetime
+
+import numpy as np
+
+from profiler import current as current_profiler
+
+# ============================
+# Instrumentasi query: latensi, jumlah baris, perkiraan byte, EXPLAIN query lambat
+# ============================
+
+# Batas atas bucket histogram latensi (milidetik); bucket terakhir = di atas 10 detik
+LATENCY_BUCKETS_MS = (1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+# Query lebih lambat dari ini (ms) dicatat sebagai query lambat
+SLOW_QUERY_MS = float(os.getenv('SLOW_QUERY_MS', '500'))
+# EXPLAIN (ANALYZE, BUFFERS) menjalankan ulang query, jadi hanya aktif jika diminta
+EXPLAIN_SLOW_QUERIES = os.getenv('EXPLAIN_SLOW_QUERIES', '0') == '1'
+# Jumlah sampel latensi terakhir per query untuk persentil
+RECENT_SAMPLES = 512
+# Jumlah rencana EXPLAIN terakhir yang disimpan per query
+MAX_PLANS = 3
+# Baris yang diukur untuk memperkirakan ukuran hasil
+BYTES_SAMPLE_ROWS = 100
+# File dump JSON otomatis saat proses selesai (kosong = tidak ditulis)
+QUERY_STATS_FILE = os.getenv('QUERY_STATS_FILE', '')
+
+def estimate_bytes(result):
+    """Perkiraan ukuran hasil query (teks) dari sampel baris pertama"""
+    if result is None:
+        return 0
+    if isinstance(result, tuple):
+        return sum(len(str(v)) for v in result)
+    if not result:
+        return 0
+    sample = result[:BYTES_SAMPLE_ROWS]
+    sample_bytes = sum(len(str(v)) for row in sample for v in row)
+    return int(sample_bytes * len(result) / len(sample))
+
+class _Entry:
+    """Counter untuk satu nama query / tahap"""
+
+    def __init__(self):
+        self.calls = 0
+        self.errors = 0
+        self.total_ms = 0.0
+        self.execute_ms = 0.0
+        self.fetch_ms = 0.0
+        self.max_ms = 0.0
+        self.rows = 0
+        self.bytes = 0
+        self.slow = 0
+        self.histogram = [0] * (len(LATENCY_BUCKETS_MS) + 1)
+        self.recent = deque(maxlen=RECENT_SAMPLES)
+        self.plans = deque(maxlen=MAX_PLANS)
+        self.last_error = None
+
+    def add(self, total_ms):
+        self.calls += 1
+        self.total_ms += total_ms
+        self.max_ms = max(self.max_ms, total_ms)
+        self.recent.append(total_ms)
+        bucket = int(np.searchsorted(LATENCY_BUCKETS_MS, total_ms, side='left'))
+        self.histogram[bucket] += 1
+        if total_ms >= SLOW_QUERY_MS:
+            self.slow += 1
+
+    def to_dict(self):
+        recent = np.asarray(self.recent) if self.recent else None
+        return {
+            'calls': self.calls,
+            'errors': self.errors,
+            'slow': self.slow,
+            'total_ms': round(self.total_ms, 3),
+            'mean_ms': round(self.total_ms / self.calls, 3) if self.calls else None,
+            'p50_ms': round(float(np.percentile(recent, 50)), 3) if recent is not None else None,
+            'p95_ms': round(float(np.percentile(recent, 95)), 3) if recent is not None else None,
+            'max_ms': round(self.max_ms, 3),
+            'execute_ms': round(self.execute_ms, 3),
+            'fetch_ms': round(self.fetch_ms, 3),
+            'rows': self.rows,
+            'bytes': self.bytes,
+            'histogram': {
+                (f"<={edge}ms" if i < len(LATENCY_BUCKETS_MS) else f">{LATENCY_BUCKETS_MS[-1]}ms"): count
+                for i, (edge, count) in enumerate(zip(LATENCY_BUCKETS_MS + (None,), self.histogram))
+            },
+            'last_error': self.last_error,
+            'plans': list(self.plans),
+        }
+
+class QueryStats:
+    """Statistik query per nama fungsi, dibagi semua sesi dalam satu proses"""
+
+    def __init__(self):
+        self._queries = {}
+        self._stages = {}
+        self._lock = threading.Lock()
+        self.started_at = datetime.now()
+
+    def _entry(self, table, name):
+        entry = table.get(name)
+        if entry is None:
+            entry = table[name] = _Entry()
+        return entry
+
+    def record(self, name, execute_s, fetch_s, result, rows=None, size=None):
+        """Mencatat satu query yang berhasil; mengembalikan total latensi (ms)
+
+        rows/size bisa diisi langsung jika hasil bukan list baris (misal COPY binary).
+        """
+        total_ms = (execute_s + fetch_s) * 1000
+        if rows is None:
+            rows = 1 if isinstance(result, tuple) else len(result or ())
+        if size is None:
+            size = estimate_bytes(result)
+        with self._lock:
+            entry = self._entry(self._queries, name)
+            entry.add(total_ms)
+            entry.execute_ms += execute_s * 1000
+            entry.fetch_ms += fetch_s * 1000
+            entry.rows += rows
+            entry.bytes += size
+        profiler = current_profiler()
+        if profiler is not None:
+            profiler.record_query(name, execute_s * 1000, fetch_s * 1000, rows, size)
+        return total_ms
+
+    def record_error(self, name, error):
+        with self._lock:
+            entry = self._entry(self._queries, name)
+            entry.errors += 1
+            entry.last_error = f"{type(error).__name__}: {error}".strip()
+
+    def should_explain(self, total_ms):
+        return EXPLAIN_SLOW_QUERIES and total_ms >= SLOW_QUERY_MS
+
+    def add_plan(self, name, total_ms, plan):
+        with self._lock:
+            self._entry(self._queries, name).plans.append({
+                'at': datetime.now().isoformat(timespec='seconds'),
+                'latency_ms': round(total_ms, 3),
+                'plan': plan,
+            })
+
+    @contextmanager
+    def measure(self, name):
+        """Context manager untuk mengukur tahap di sisi Python (misal membuat DataFrame)"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed_ms = (time.perf_counter() - start) * 1000
+            with self._lock:
+                self._entry(self._stages, name).add(elapsed_ms)
+            profiler = current_profiler()
+            if profiler is not None:
+                profiler.record_stage(name, elapsed_ms)
+
+    def reset(self):
+        with self._lock:
+            self._queries.clear()
+            self._stages.clear()
+            self.started_at = datetime.now()
+
+    def snapshot(self):
+        """Seluruh statistik sebagai dict (siap di-dump ke JSON)"""
+        with self._lock:
+            queries = {name: entry.to_dict() for name, entry in self._queries.items()}
+            stages = {name: entry.to_dict() for name, entry in self._stages.items()}
+        return {
+            'started_at': self.started_at.isoformat(timespec='seconds'),
+            'generated_at': datetime.now().isoformat(timespec='seconds'),
+            'slow_query_ms': SLOW_QUERY_MS,
+            'explain_slow_queries': EXPLAIN_SLOW_QUERIES,
+            'queries': queries,
+            'stages': stages,
+        }
+
+    def dump(self, path=None):
+        """Menulis statistik ke file JSON; mengembalikan path atau None"""
+        path = path or QUERY_STATS_FILE
+        if not path:
+            return None
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.snapshot(), f, indent=2, default=str)
+        os.replace(tmp_path, path)
+        return path
+
+query_stats = QueryStats()
+if QUERY_STATS_FILE:
+    atexit.register(query_stats.dump)
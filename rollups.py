@@ -0,0 +1,117 @@
+from datetime import date, datetime
+
+# ============================
+# Tabel rekap (rollup) yang di-refresh incremental per tanggal
+# ============================
+
+# Kategori yang sama dengan pengelompokan di dashboard (main.py)
+SQL_KATEGORI_MAGNITUDE = """
+    CASE
+        WHEN magnitude < 3.0 THEN 'Kecil (< 3.0)'
+        WHEN magnitude < 4.0 THEN 'Sedang (3.0-4.0)'
+        WHEN magnitude < 5.0 THEN 'Besar (4.0-5.0)'
+        ELSE 'Sangat Besar (≥ 5.0)'
+    END
+"""
+
+SQL_KATEGORI_KEDALAMAN = """
+    CASE
+        WHEN depth <= 50 THEN '0-50 km'
+        WHEN depth <= 100 THEN '50-100 km'
+        WHEN depth <= 200 THEN '100-200 km'
+        WHEN depth <= 300 THEN '200-300 km'
+        ELSE '300+ km'
+    END
+"""
+
+# Tabel rekap per tanggal: (nama tabel, query agregasi dari katalog_gempa)
+REKAP_HARIAN = {
+    'rekap_harian': """
+        INSERT INTO rekap_harian
+            (tanggal, jumlah, total_magnitude, magnitude_maksimum, magnitude_minimum, total_depth)
+        SELECT tanggal, COUNT(*), SUM(magnitude), MAX(magnitude), MIN(magnitude), SUM(depth)
+        FROM katalog_gempa
+        {where}
+        GROUP BY tanggal
+    """,
+    'rekap_wilayah_harian': """
+        INSERT INTO rekap_wilayah_harian (tanggal, remark, jumlah)
+        SELECT tanggal, remark, COUNT(*)
+        FROM katalog_gempa
+        {where}
+        GROUP BY tanggal, remark
+    """,
+    'rekap_jam_harian': """
+        INSERT INTO rekap_jam_harian (tanggal, jam, jumlah)
+        SELECT tanggal, EXTRACT(HOUR FROM waktu)::SMALLINT, COUNT(*)
+        FROM katalog_gempa
+        {where}
+        GROUP BY tanggal, EXTRACT(HOUR FROM waktu)
+    """,
+    'rekap_kategori_harian': f"""
+        INSERT INTO rekap_kategori_harian
+            (tanggal, kategori_magnitude, kategori_kedalaman, jumlah)
+        SELECT tanggal, {SQL_KATEGORI_MAGNITUDE}, {SQL_KATEGORI_KEDALAMAN}, COUNT(*)
+        FROM katalog_gempa
+        {{where}}
+        GROUP BY 1, 2, 3
+    """,
+}
+
+# Rekap bulanan dihitung ulang dari rekap_harian, bukan dari katalog penuh
+REKAP_BULANAN = """
+    INSERT INTO rekap_bulanan
+        (bulan, jumlah, total_magnitude, magnitude_maksimum, magnitude_minimum)
+    SELECT DATE_TRUNC('month', tanggal)::DATE, SUM(jumlah), SUM(total_magnitude),
+           MAX(magnitude_maksimum), MIN(magnitude_minimum)
+    FROM rekap_harian
+    {where}
+    GROUP BY 1
+"""
+
+def _to_date(value):
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    return date.fromisoformat(str(value))
+
+def refresh_rollups(cursor, dates=None):
+    """Menghitung ulang rekap hanya untuk tanggal yang berubah
+
+    dates: kumpulan tanggal yang terkena import; None berarti rebuild penuh.
+    Biaya refresh sebanding dengan jumlah tanggal yang berubah, bukan total histori.
+    """
+    if dates is not None:
+        dates = sorted({_to_date(d) for d in dates})
+        if not dates:
+            return 0
+        months = sorted({d.replace(day=1) for d in dates})
+        # Rentang BETWEEN membuat partition pruning bekerja di katalog_gempa
+        where_daily = "WHERE tanggal BETWEEN %s AND %s AND tanggal = ANY(%s)"
+        params_daily = [dates[0], dates[-1], dates]
+        where_monthly, params_monthly = "WHERE bulan = ANY(%s)", [months]
+        where_source = "WHERE DATE_TRUNC('month', tanggal)::DATE = ANY(%s)"
+    else:
+        where_daily, params_daily = "", []
+        where_monthly, params_monthly = "", []
+        where_source = ""
+
+    for table, insert_sql in REKAP_HARIAN.items():
+        cursor.execute(f"DELETE FROM {table} {where_daily}", params_daily)
+        cursor.execute(insert_sql.format(where=where_daily), params_daily)
+
+    cursor.execute(f"DELETE FROM rekap_bulanan {where_monthly}", params_monthly)
+    cursor.execute(REKAP_BULANAN.format(where=where_source), params_monthly)
+    return len(dates) if dates is not None else None
+
+if __name__ == "__main__":
+    # Rebuild penuh, misal untuk database yang sudah terisi sebelum tabel rekap ada
+    from import_data import connect_db, finalize_import
+
+    conn = connect_db()
+    if conn:
+        try:
+            finalize_import(conn)
+        finally:
+            conn.close()
@@ -1,7 +1,8 @@
 
--- Membuat tabel katalog_gempa
+-- Membuat tabel katalog_gempa, dipartisi per rentang tanggal (per tahun).
+-- Partisi baru dibuat otomatis oleh importer (lihat partitions.py)
 CREATE TABLE katalog_gempa (
-    id SERIAL PRIMARY KEY,
+    id SERIAL,
     tanggal DATE NOT NULL,
     waktu TIME NOT NULL,
     latitude DECIMAL(10, 6) NOT NULL,
@@ -9,31 +10,120 @@ CREATE TABLE katalog_gempa (
     depth INTEGER NOT NULL,
     magnitude DECIMAL(3, 1) NOT NULL,
     remark VARCHAR(255) NOT NULL,
-    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-);
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    -- Sel grid 0.5 derajat untuk query spasial (rumus sama dengan spatial.cell_id)
+    sel_grid INTEGER GENERATED ALWAYS AS (
+        FLOOR((latitude + 90) / 0.5)::INTEGER * 720 + FLOOR((longitude + 180) / 0.5)::INTEGER
+    ) STORED,
+    -- Primary key tabel partisi harus memuat kolom partisi
+    PRIMARY KEY (id, tanggal)
+) PARTITION BY RANGE (tanggal);
 
--- Membuat index untuk mempercepat query
+-- Kunci alami kejadian gempa, dipakai import incremental (INSERT ... ON CONFLICT)
+ALTER TABLE katalog_gempa
+    ADD CONSTRAINT uq_katalog_event UNIQUE (tanggal, waktu, latitude, longitude, magnitude);
+
+-- Index dibuat di tabel induk dan otomatis ikut ke setiap partisi
 CREATE INDEX idx_tanggal ON katalog_gempa(tanggal);
 CREATE INDEX idx_magnitude ON katalog_gempa(magnitude);
 CREATE INDEX idx_location ON katalog_gempa(latitude, longitude);
+CREATE INDEX idx_sel_grid ON katalog_gempa(sel_grid, latitude, longitude);
 CREATE INDEX idx_remark ON katalog_gempa(remark);
 
--- Membuat view untuk statistik gempa per bulan
+-- ============================
+-- Tabel rekap (rollup), di-refresh incremental oleh import_data.py
+-- per tanggal yang terkena import (lihat rollups.py)
+-- ============================
+
+CREATE TABLE rekap_harian (
+    tanggal DATE PRIMARY KEY,
+    jumlah INTEGER NOT NULL,
+    total_magnitude DECIMAL(12, 1) NOT NULL,
+    magnitude_maksimum DECIMAL(3, 1) NOT NULL,
+    magnitude_minimum DECIMAL(3, 1) NOT NULL,
+    total_depth BIGINT NOT NULL
+);
+
+CREATE TABLE rekap_bulanan (
+    bulan DATE PRIMARY KEY,
+    jumlah INTEGER NOT NULL,
+    total_magnitude DECIMAL(12, 1) NOT NULL,
+    magnitude_maksimum DECIMAL(3, 1) NOT NULL,
+    magnitude_minimum DECIMAL(3, 1) NOT NULL
+);
+
+CREATE TABLE rekap_wilayah_harian (
+    tanggal DATE NOT NULL,
+    remark VARCHAR(255) NOT NULL,
+    jumlah INTEGER NOT NULL,
+    PRIMARY KEY (tanggal, remark)
+);
+
+CREATE TABLE rekap_jam_harian (
+    tanggal DATE NOT NULL,
+    jam SMALLINT NOT NULL,
+    jumlah INTEGER NOT NULL,
+    PRIMARY KEY (tanggal, jam)
+);
+
+CREATE TABLE rekap_kategori_harian (
+    tanggal DATE NOT NULL,
+    kategori_magnitude VARCHAR(32) NOT NULL,
+    kategori_kedalaman VARCHAR(32) NOT NULL,
+    jumlah INTEGER NOT NULL,
+    PRIMARY KEY (tanggal, kategori_magnitude, kategori_kedalaman)
+);
+
+-- Membuat view untuk statistik gempa per bulan (dibaca dari rekap_bulanan)
 CREATE VIEW statistik_gempa AS
 SELECT 
-    DATE_TRUNC('month', tanggal) as bulan,
-    COUNT(*) as jumlah_gempa,
-    AVG(magnitude) as rata_rata_magnitude,
-    MAX(magnitude) as magnitude_maksimum,
-    MIN(magnitude) as magnitude_minimum
-FROM katalog_gempa
-GROUP BY DATE_TRUNC('month', tanggal)
+    bulan,
+    jumlah as jumlah_gempa,
+    total_magnitude / jumlah as rata_rata_magnitude,
+    magnitude_maksimum,
+    magnitude_minimum
+FROM rekap_bulanan
 ORDER BY bulan;
 
+-- Versi katalog: dinaikkan setiap import selesai, dipakai dashboard
+-- untuk mengosongkan cache hasil query
+CREATE TABLE versi_katalog (
+    id BOOLEAN PRIMARY KEY DEFAULT TRUE CHECK (id),
+    versi BIGINT NOT NULL DEFAULT 0,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+INSERT INTO versi_katalog DEFAULT VALUES;
+
+-- Log perubahan per versi dari ingest real-time (ingest_daemon.py). Versi
+-- yang hanya menambah baris bisa diterapkan dashboard tanpa memuat ulang
+-- seluruh katalog; versi tanpa log (misal import_data.py) = muat ulang penuh.
+CREATE TABLE perubahan_katalog (
+    versi BIGINT PRIMARY KEY,
+    jenis VARCHAR(20) NOT NULL,
+    min_id INTEGER NOT NULL,
+    max_id INTEGER NOT NULL,
+    jumlah INTEGER NOT NULL,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+-- Hasil declustering Gardner-Knopoff (declustering.py): klaster_id = id gempa
+-- utama klaster. Gempa yang belum diproses (misal ingest baru) dianggap gempa utama.
+CREATE TABLE klaster_gempa (
+    id INTEGER PRIMARY KEY,
+    klaster_id INTEGER NOT NULL,
+    mainshock BOOLEAN NOT NULL,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+CREATE INDEX idx_klaster_susulan ON klaster_gempa(id) WHERE NOT mainshock;
+
 -- ============================
 -- DML - Insert Data Sample (20 data pertama)
 -- ============================
 
+-- Partisi untuk data sample; partisi tahun lain dibuat saat import
+CREATE TABLE katalog_gempa_2018 PARTITION OF katalog_gempa
+    FOR VALUES FROM ('2018-01-01') TO ('2019-01-01');
+
 INSERT INTO katalog_gempa (tanggal, waktu, latitude, longitude, depth, magnitude, remark) VALUES
 ('2018-01-01', '22:48:13', -0.01, 122.55, 158, 2.4, 'Minahassa Peninsula - Sulawesi'),
 ('2018-01-01', '22:28:09', -0.20, 125.41, 10, 3.3, 'Southern Molucca Sea'),
@@ -83,7 +173,11 @@ INSERT INTO katalog_gempa (tanggal, waktu, latitude, longitude, depth, magnitude
 ('2018-01-02', '02:27:03', 4.56, 124.45, 10, 3.5, 'Celebes Sea'),
 ('2018-01-02', '02:21:30', -8.29, 119.99, 172, 3.9, 'Flores Region - Indonesia'),
 ('2018-01-02', '01:47:45', -7.31, 128.29, 196, 4.1, 'Banda Sea'),
-('2018-01-02', '01:40:50', -9.62, 115.48, 17, 3.1, 'South of Bali - Indonesia');
+('2018-01-02', '01:40:50', -9.62, 115.48, 17, 3.1, 'South of Bali - Indonesia')
+ON CONFLICT ON CONSTRAINT uq_katalog_event DO NOTHING;
+
+-- Tabel rekap untuk data sample terisi saat import pertama (tanggal yang sama
+-- ikut di-refresh), atau bangun ulang semua rekap dengan: python rollups.py
 
 -- Menampilkan struktur tabel
 \d katalog_gempa
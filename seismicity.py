@@ -0,0 +1,257 @@
+import os
+import threading
+import weakref
+
+import numpy as np
+import pandas as pd
+
+from query_cache import QueryCache, _freeze
+
+# ============================
+# Analitik seismisitas: Gutenberg-Richter (b-value) dan magnitude of completeness (Mc)
+# ============================
+
+# Lebar bin magnitude katalog (BMKG: satu desimal)
+MAG_BIN = 0.1
+# Koreksi metode maximum curvature (Woessner & Wiemer 2005): Mc = MAXC + 0.2
+MC_CORRECTION = 0.2
+# Minimal gempa >= Mc agar b-value dihitung (di bawah ini hasilnya NaN)
+B_VALUE_MIN_EVENTS = int(os.getenv('B_VALUE_MIN_EVENTS', '50'))
+# Jumlah set histogram parsial yang disimpan per store (per kombinasi filter selain magnitude)
+SEISMICITY_CACHE_SIZE = int(os.getenv('SEISMICITY_CACHE_SIZE', '16'))
+
+LOG10_E = np.log10(np.e)
+
+# ============================
+# Perhitungan dari histogram (vektor: banyak histogram sekaligus)
+# ============================
+
+def magnitude_bins(magnitude):
+    """Nomor bin 0.1 untuk array magnitude (misal 3.4 -> 34)"""
+    return np.rint(np.asarray(magnitude, dtype=np.float64) / MAG_BIN).astype(np.int32)
+
+def bin_magnitudes(min_bin, n_bins):
+    """Magnitude di tengah setiap bin histogram"""
+    return (min_bin + np.arange(n_bins)) * MAG_BIN
+
+def cumulative(hist):
+    """Frekuensi kumulatif N(>= M) dari histogram non-kumulatif (sumbu terakhir = bin)"""
+    return np.cumsum(hist[..., ::-1], axis=-1)[..., ::-1]
+
+def gr_fit(hist, min_bin, min_events=B_VALUE_MIN_EVENTS):
+    """Mc, b-value, galat b, dan a-value untuk satu atau banyak histogram
+
+    hist: array (..., n_bins) jumlah gempa per bin 0.1 mulai dari min_bin.
+    Mc = bin terpadat + MC_CORRECTION; b dengan estimasi maximum likelihood
+    Aki-Utsu (koreksi setengah bin), galat b menurut Shi & Bolt (1982).
+    Semua dihitung dari histogram, jadi biayanya sebanding jumlah bin, bukan
+    jumlah gempa. Mengembalikan dict array; b NaN jika gempa >= Mc terlalu sedikit.
+    """
+    hist = np.asarray(hist, dtype=np.float64)
+    mags = bin_magnitudes(min_bin, hist.shape[-1])
+    total = hist.sum(axis=-1)
+    mc_bin = np.argmax(hist, axis=-1) + int(round(MC_CORRECTION / MAG_BIN))
+    complete = np.arange(hist.shape[-1]) >= mc_bin[..., None]
+    above = np.where(complete, hist, 0.0)
+    n = above.sum(axis=-1)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        mc = np.where(total > 0, (min_bin + mc_bin) * MAG_BIN, np.nan)
+        mean = (above * mags).sum(axis=-1) / n
+        b = LOG10_E / (mean - (mc - MAG_BIN / 2))
+        variance = (above * (mags - mean[..., None]) ** 2).sum(axis=-1) / (n * (n - 1))
+        b_err = 2.3 * b ** 2 * np.sqrt(variance)
+        a = np.log10(n) + b * mc
+    enough = n >= max(min_events, 2)
+    return {
+        'n': n.astype(np.int64),
+        'mc': mc,
+        'b': np.where(enough, b, np.nan),
+        'b_err': np.where(enough, b_err, np.nan),
+        'a': np.where(enough, a, np.nan),
+    }
+
+# ============================
+# Histogram parsial per store
+# ============================
+
+class Partials:
+    """Histogram parsial (grup x bulan x bin magnitude) untuk satu kombinasi filter"""
+
+    def __init__(self, counts, groups, months, min_bin):
+        self.counts = counts
+        self.groups = groups
+        self.months = months
+        self.min_bin = min_bin
+
+    def restricted(self, min_mag=None, max_mag=None):
+        """Counts dengan bin di luar rentang magnitude dinolkan (filter magnitude tanpa scan ulang)"""
+        n_bins = self.counts.shape[-1]
+        bins = self.min_bin + np.arange(n_bins)
+        keep = np.ones(n_bins, dtype=bool)
+        if min_mag is not None:
+            keep &= bins >= magnitude_bins(min_mag)
+        if max_mag is not None:
+            keep &= bins <= magnitude_bins(max_mag)
+        return self.counts * keep
+
+class SeismicityIndex:
+    """Kolom bin magnitude, bulan, dan grup katalog disiapkan sekali per store
+
+    Histogram parsial per (grup, bulan) di-cache per kombinasi filter tanpa
+    magnitude: filter magnitude cukup menolkan bin, sedangkan jendela waktu,
+    wilayah, dan peta grid dijumlahkan dari histogram parsial yang sama.
+    """
+
+    def __init__(self, store):
+        # Hanya indeks filter yang disimpan (bukan store) agar store tetap bisa dibebaskan
+        self.filter_index = store.index
+        df = store.df
+        self.bins = magnitude_bins(df['magnitude'].to_numpy())
+        self.min_bin = int(self.bins.min()) if len(self.bins) else 0
+        self.n_bins = int(self.bins.max()) - self.min_bin + 1 if len(self.bins) else 1
+        month = df['bulan'].to_numpy().astype('datetime64[M]').astype(np.int64)
+        self.min_month = int(month.min()) if len(month) else 0
+        self.month = (month - self.min_month).astype(np.int32)
+        self.n_months = int(self.month.max()) + 1 if len(month) else 1
+        self.remark = df['remark'].cat.codes.to_numpy()
+        self.remarks = list(df['remark'].cat.categories)
+        self.latitude = df['latitude'].to_numpy()
+        self.longitude = df['longitude'].to_numpy()
+        self._cache = QueryCache(maxsize=SEISMICITY_CACHE_SIZE, ttl=float('inf'))
+
+    def month_start(self, offsets):
+        """Tanggal awal bulan ke-offset pada sumbu waktu histogram parsial"""
+        return (np.datetime64(self.min_month, 'M') + np.asarray(offsets)).astype('datetime64[D]')
+
+    def _groups(self, idx, by, cell_size):
+        """Kode grup per baris terpilih dan label grupnya"""
+        if by is None:
+            return np.zeros(len(idx), dtype=np.int64), ['Semua']
+        if by == 'remark':
+            codes = self.remark[idx].astype(np.int64)
+            return codes, self.remarks
+        if by == 'cell':
+            row = np.floor(self.latitude[idx].astype(np.float64) / cell_size).astype(np.int64)
+            col = np.floor(self.longitude[idx].astype(np.float64) / cell_size).astype(np.int64)
+            cells, codes = np.unique(np.column_stack([row, col]), axis=0, return_inverse=True)
+            # Label sel = koordinat tengah sel (lintang, bujur)
+            centers = [tuple(center) for center in ((cells + 0.5) * cell_size).tolist()]
+            return codes.reshape(-1).astype(np.int64), centers
+        raise ValueError(f"Pengelompokan tidak dikenal: {by}")
+
+    def partials(self, filters, by=None, cell_size=1.0, by_month=True):
+        """Histogram parsial untuk filter selain magnitude (dari cache jika sudah ada)
+
+        by: None (seluruh seleksi), 'remark' (per wilayah), atau 'cell' (sel grid
+        cell_size derajat). by_month=False menggabungkan semua bulan (misal peta).
+        """
+        base = {k: v for k, v in (filters or {}).items() if k not in ('min_mag', 'max_mag')}
+        key = (_freeze(base), by, cell_size if by == 'cell' else None, by_month)
+        found, result = self._cache.get(key)
+        if found:
+            return result
+        idx = self.filter_index.select(base)
+        codes, groups = self._groups(idx, by, cell_size)
+        n_months = self.n_months if by_month else 1
+        month = self.month[idx] if by_month else 0
+        flat = (codes * n_months + month) * self.n_bins + (self.bins[idx] - self.min_bin)
+        counts = np.bincount(flat, minlength=len(groups) * n_months * self.n_bins)
+        counts = counts.reshape(len(groups), n_months, self.n_bins).astype(np.int32)
+        result = Partials(counts, groups, self.month_start(np.arange(n_months)) if by_month else None, self.min_bin)
+        self._cache.set(key, result)
+        return result
+
+_indexes = weakref.WeakKeyDictionary()
+_indexes_lock = threading.Lock()
+
+def index_for(store):
+    """SeismicityIndex milik store (dibuat sekali, ikut hilang bersama store)"""
+    with _indexes_lock:
+        index = _indexes.get(store)
+        if index is None:
+            index = _indexes[store] = SeismicityIndex(store)
+        return index
+
+# ============================
+# Hasil siap tampil
+# ============================
+
+def magnitude_distribution(store, filters):
+    """Distribusi frekuensi-magnitude seleksi: (DataFrame per bin, hasil gr_fit)"""
+    partials = index_for(store).partials(filters, by_month=False)
+    hist = partials.restricted(filters.get('min_mag'), filters.get('max_mag'))[0, 0]
+    nonzero = np.flatnonzero(hist)
+    fit = {k: v.item() for k, v in gr_fit(hist, partials.min_bin).items()}
+    if nonzero.size == 0:
+        return pd.DataFrame(columns=['magnitude', 'jumlah', 'kumulatif']), fit
+    span = slice(nonzero[0], nonzero[-1] + 1)
+    df = pd.DataFrame({
+        'magnitude': bin_magnitudes(partials.min_bin, len(hist))[span].round(1),
+        'jumlah': hist[span],
+        'kumulatif': cumulative(hist)[span],
+    })
+    return df, fit
+
+def b_value_by_region(store, filters, min_events=B_VALUE_MIN_EVENTS):
+    """b-value dan Mc per wilayah (remark), wilayah dengan data cukup saja"""
+    partials = index_for(store).partials(filters, by='remark', by_month=False)
+    hist = partials.restricted(filters.get('min_mag'), filters.get('max_mag'))[:, 0]
+    fit = gr_fit(hist, partials.min_bin, min_events)
+    df = pd.DataFrame({
+        'Wilayah': partials.groups,
+        'Jumlah': hist.sum(axis=1),
+        'N ≥ Mc': fit['n'],
+        'Mc': fit['mc'],
+        'b-value': fit['b'],
+        '± b': fit['b_err'],
+        'a-value': fit['a'],
+    })
+    df = df[df['b-value'].notna()].sort_values('Jumlah', ascending=False, ignore_index=True)
+    return df.round({'Mc': 1, 'b-value': 2, '± b': 2, 'a-value': 2})
+
+def b_value_timeline(store, filters, window_months=12, step_months=1, region=None, min_events=B_VALUE_MIN_EVENTS):
+    """b-value dan Mc pada jendela waktu bergeser (window_months, geser step_months)
+
+    Setiap jendela = selisih jumlah kumulatif histogram bulanan, jadi biaya per
+    jendela sebanding jumlah bin, bukan jumlah gempa di dalamnya.
+    """
+    index = index_for(store)
+    by = 'remark' if region is not None else None
+    partials = index.partials(filters, by=by)
+    counts = partials.restricted(filters.get('min_mag'), filters.get('max_mag'))
+    if region is not None:
+        if region not in partials.groups:
+            return pd.DataFrame(columns=['mulai', 'selesai', 'tengah', 'n', 'mc', 'b', 'b_err'])
+        counts = counts[partials.groups.index(region)]
+    else:
+        counts = counts[0]
+    prefix = np.concatenate([np.zeros((1, counts.shape[1]), dtype=np.int64), np.cumsum(counts, axis=0)])
+    starts = np.arange(0, max(len(counts) - window_months, 0) + 1, max(step_months, 1))
+    ends = np.minimum(starts + window_months, len(counts))
+    fit = gr_fit(prefix[ends] - prefix[starts], partials.min_bin, min_events)
+    df = pd.DataFrame({
+        'mulai': index.month_start(starts),
+        'selesai': index.month_start(ends),
+        'n': fit['n'],
+        'mc': fit['mc'],
+        'b': fit['b'],
+        'b_err': fit['b_err'],
+    })
+    df['tengah'] = df['mulai'] + (df['selesai'] - df['mulai']) / 2
+    return df[df['b'].notna()].reset_index(drop=True)
+
+def b_value_grid(store, filters, cell_size=1.0, min_events=B_VALUE_MIN_EVENTS):
+    """b-value dan Mc per sel grid (derajat) untuk peta"""
+    partials = index_for(store).partials(filters, by='cell', cell_size=cell_size, by_month=False)
+    hist = partials.restricted(filters.get('min_mag'), filters.get('max_mag'))[:, 0]
+    fit = gr_fit(hist, partials.min_bin, min_events)
+    centers = np.asarray(partials.groups, dtype=np.float64).reshape(-1, 2)
+    df = pd.DataFrame({
+        'latitude': centers[:, 0],
+        'longitude': centers[:, 1],
+        'n': fit['n'],
+        'mc': fit['mc'],
+        'b': fit['b'],
+        'b_err': fit['b_err'],
+    })
+    return df[df['b'].notna()].reset_index(drop=True)
@@ -0,0 +1,121 @@
+import io
+import os
+from datetime import datetime
+
+try:
+    import pyarrow as pa
+    import pyarrow.csv as pa_csv
+    import pyarrow.ipc as pa_ipc
+except ImportError:  # pyarrow opsional: tanpa pyarrow dashboard membaca dari database
+    pa = None
+
+# ============================
+# Snapshot kolumnar katalog (Arrow IPC, bisa di-memory-map)
+# ============================
+
+SNAPSHOT_PATH = os.getenv('SNAPSHOT_PATH', os.path.join('snapshot', 'katalog_gempa.arrow'))
+
+SNAPSHOT_QUERY = """
+    SELECT id, tanggal + waktu AS waktu_kejadian, tanggal, latitude, longitude,
+           depth, magnitude, remark
+    FROM katalog_gempa
+    ORDER BY tanggal DESC, waktu DESC, id DESC
+"""
+
+def is_available():
+    """True jika pyarrow terpasang"""
+    return pa is not None
+
+def _column_types():
+    # Tipe akhir kolom, sama dengan catalogue.CATALOG_DTYPES (tanpa konversi lagi saat dibaca)
+    return {
+        'id': pa.int32(),
+        'waktu_kejadian': pa.timestamp('s'),
+        'tanggal': pa.timestamp('s'),
+        'latitude': pa.float32(),
+        'longitude': pa.float32(),
+        'depth': pa.int16(),
+        'magnitude': pa.float32(),
+        'remark': pa.string(),
+    }
+
+def write_snapshot(conn, path=SNAPSHOT_PATH):
+    """Mengekspor katalog_gempa ke file Arrow IPC (COPY TO STDOUT, tanpa objek Python per baris)
+
+    Versi katalog dan isi tabel dibaca dalam satu transaksi REPEATABLE READ,
+    jadi versi yang dicatat selalu cocok dengan baris di snapshot walaupun
+    import/ingest berjalan bersamaan. conn tidak boleh sedang di tengah transaksi.
+    """
+    if pa is None:
+        print("⚠️ pyarrow tidak terpasang, snapshot dilewati")
+        return None
+
+    buffer = io.BytesIO()
+    cursor = conn.cursor()
+    try:
+        cursor.execute("SET TRANSACTION ISOLATION LEVEL REPEATABLE READ")
+        cursor.execute("SELECT versi FROM versi_katalog")
+        row = cursor.fetchone()
+        version = row[0] if row else None
+        cursor.copy_expert(f"COPY ({SNAPSHOT_QUERY}) TO STDOUT WITH (FORMAT csv, HEADER)", buffer)
+    finally:
+        cursor.close()
+        # Hanya membaca: akhiri transaksi snapshot
+        conn.rollback()
+    buffer.seek(0)
+
+    table = pa_csv.read_csv(
+        buffer,
+        convert_options=pa_csv.ConvertOptions(column_types=_column_types())
+    )
+    # remark berulang puluhan ribu kali: simpan sebagai dictionary (categorical di pandas)
+    remark_idx = table.schema.get_field_index('remark')
+    table = table.set_column(remark_idx, 'remark', table.column('remark').dictionary_encode())
+    table = table.replace_schema_metadata({
+        'versi_katalog': str(version) if version is not None else '',
+        'dibuat': datetime.now().isoformat(timespec='seconds'),
+    })
+
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    tmp_path = path + '.tmp'
+    # Tanpa kompresi supaya file bisa di-memory-map langsung
+    with pa.OSFile(tmp_path, 'wb') as sink:
+        with pa_ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+    os.replace(tmp_path, path)
+    print(f"✓ Snapshot {table.num_rows} baris ditulis ke {path}")
+    return path
+
+def snapshot_version(path=SNAPSHOT_PATH):
+    """Versi katalog yang tercatat di snapshot, atau None jika tidak ada"""
+    if pa is None or not os.path.exists(path):
+        return None
+    with pa.memory_map(path, 'r') as source:
+        metadata = pa_ipc.open_file(source).schema.metadata or {}
+    version = metadata.get(b'versi_katalog', b'').decode()
+    return int(version) if version else None
+
+def read_snapshot(path=SNAPSHOT_PATH):
+    """Membaca snapshot sebagai DataFrame (memory-mapped, tipe kolom sudah final)"""
+    # Memory map tidak ditutup di sini: buffer kolom masih merujuk ke file
+    source = pa.memory_map(path, 'r')
+    table = pa_ipc.open_file(source).read_all()
+    return table.to_pandas()
+
+def load_fresh_snapshot(current_version, path=SNAPSHOT_PATH):
+    """DataFrame dari snapshot jika versinya sama dengan versi katalog di database, selain itu None"""
+    if pa is None or current_version is None:
+        return None
+    if snapshot_version(path) != current_version:
+        return None
+    return read_snapshot(path)
+
+if __name__ == "__main__":
+    from import_data import connect_db
+
+    conn = connect_db()
+    if conn:
+        try:
+            write_snapshot(conn)
+        finally:
+            conn.close()
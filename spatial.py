@@ -0,0 +1,92 @@
+import math
+
+import numpy as np
+
+# ============================
+# Grid sel untuk indeks spasial episentrum
+# ============================
+
+# Ukuran sel grid (derajat); harus sama dengan kolom sel_grid di schema.sql
+GRID_SIZE = 0.5
+GRID_COLS = int(360 / GRID_SIZE)
+# Bounding box yang mencakup lebih banyak sel dari ini dicari tanpa daftar sel
+MAX_GRID_CELLS = 5000
+
+EARTH_RADIUS_KM = 6371.0
+
+def cell_id(lat, lon):
+    """Nomor sel grid untuk satu koordinat (rumus sama dengan kolom sel_grid)"""
+    row = math.floor((lat + 90) / GRID_SIZE)
+    col = math.floor((lon + 180) / GRID_SIZE)
+    return row * GRID_COLS + col
+
+def cell_ids(lat, lon):
+    """Versi vektor cell_id untuk array NumPy"""
+    row = np.floor((np.asarray(lat, dtype=float) + 90) / GRID_SIZE).astype(np.int64)
+    col = np.floor((np.asarray(lon, dtype=float) + 180) / GRID_SIZE).astype(np.int64)
+    return row * GRID_COLS + col
+
+def cells_for_bbox(min_lat, min_lon, max_lat, max_lon):
+    """Daftar sel grid yang menutupi bounding box, atau None jika terlalu banyak"""
+    row_min = math.floor((max(min_lat, -90) + 90) / GRID_SIZE)
+    row_max = math.floor((min(max_lat, 90) + 90) / GRID_SIZE)
+    col_min = math.floor((max(min_lon, -180) + 180) / GRID_SIZE)
+    col_max = math.floor((min(max_lon, 180) + 180) / GRID_SIZE)
+    n_cells = (row_max - row_min + 1) * (col_max - col_min + 1)
+    if n_cells > MAX_GRID_CELLS:
+        return None
+    return [
+        row * GRID_COLS + col
+        for row in range(row_min, row_max + 1)
+        for col in range(col_min, col_max + 1)
+    ]
+
+def bbox_around(lat, lon, radius_km):
+    """Bounding box (min_lat, min_lon, max_lat, max_lon) yang memuat lingkaran radius_km"""
+    dlat = math.degrees(radius_km / EARTH_RADIUS_KM)
+    cos_lat = math.cos(math.radians(lat))
+    # Dekat kutub satu derajat bujur sangat pendek: ambil seluruh rentang bujur
+    dlon = 180.0 if cos_lat < 1e-6 else min(180.0, dlat / cos_lat)
+    return lat - dlat, lon - dlon, lat + dlat, lon + dlon
+
+def haversine_km(lat1, lon1, lat2, lon2):
+    """Jarak great-circle (km), mendukung array NumPy"""
+    lat1, lon1, lat2, lon2 = (np.radians(np.asarray(v, dtype=float)) for v in (lat1, lon1, lat2, lon2))
+    a = (np.sin((lat2 - lat1) / 2) ** 2
+         + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2)
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(a))
+
+def sql_haversine_km(lat_param="%s", lon_param="%s"):
+    """Ekspresi SQL jarak (km) dari titik parameter ke episentrum"""
+    return f"""
+        {2 * EARTH_RADIUS_KM} * ASIN(SQRT(
+            POWER(SIN(RADIANS(latitude - {lat_param}) / 2), 2)
+            + COS(RADIANS({lat_param})) * COS(RADIANS(latitude))
+            * POWER(SIN(RADIANS(longitude - {lon_param}) / 2), 2)
+        ))
+    """
+
+# ============================
+# Fallback NumPy untuk DataFrame di memori
+# ============================
+
+def filter_bbox(df, min_lat, min_lon, max_lat, max_lon):
+    """Baris DataFrame yang episentrumnya di dalam bounding box"""
+    mask = (
+        (df['latitude'] >= min_lat) & (df['latitude'] <= max_lat)
+        & (df['longitude'] >= min_lon) & (df['longitude'] <= max_lon)
+    )
+    return df[mask]
+
+def filter_radius(df, lat, lon, radius_km):
+    """Baris DataFrame dalam radius_km dari titik, dengan kolom jarak_km, urut terdekat"""
+    candidates = filter_bbox(df, *bbox_around(lat, lon, radius_km))
+    jarak = haversine_km(lat, lon, candidates['latitude'], candidates['longitude'])
+    result = candidates.assign(jarak_km=jarak)
+    return result[result['jarak_km'] <= radius_km].sort_values('jarak_km')
+
+def nearest(df, lat, lon, n=10):
+    """n gempa terdekat dari titik, dengan kolom jarak_km"""
+    jarak = haversine_km(lat, lon, df['latitude'], df['longitude'])
+    idx = np.argsort(jarak)[:n]
+    return df.iloc[idx].assign(jarak_km=np.asarray(jarak)[idx])
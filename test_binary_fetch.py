@@ -0,0 +1,98 @@
+import random
+
+import numpy as np
+import pytest
+
+from binary_fetch import PGCOPY_SIGNATURE, BinaryCopyDecoder, dates_from_pg, times_from_pg
+
+# ============================
+# Payload COPY binary sintetis (format yang dikirim PostgreSQL)
+# ============================
+
+FIELDS = [('id', 'int4'), ('tanggal', 'date'), ('waktu', 'time'), ('magnitude', 'float8')]
+SIZES = {'int4': 4, 'date': 4, 'time': 8, 'float8': 8}
+
+def synthetic_columns(n, seed=1):
+    rng = np.random.default_rng(seed)
+    return {
+        'id': np.arange(1, n + 1, dtype=np.int32),
+        'tanggal': rng.integers(0, 9000, n).astype(np.int32),
+        'waktu': rng.integers(0, 86400 * 10**6, n).astype(np.int64),
+        'magnitude': np.round(rng.uniform(1.0, 8.0, n), 1),
+    }
+
+def encode(columns, extension=b'', null_row=None, trailer=True):
+    """Header + baris (jumlah field, lalu panjang + nilai per kolom) + trailer"""
+    n = len(columns['id'])
+    layout = [('_fields', '>i2')]
+    for i, (name, pg_type) in enumerate(FIELDS):
+        layout += [(f'_len{i}', '>i4'), (name, f'>{np.dtype(columns[name].dtype).str[1:]}')]
+    records = np.zeros(n, dtype=layout)
+    records['_fields'] = len(FIELDS)
+    for i, (name, pg_type) in enumerate(FIELDS):
+        records[f'_len{i}'] = SIZES[pg_type]
+        records[name] = columns[name]
+    if null_row is not None:
+        records['_len3'][null_row] = -1
+    header = PGCOPY_SIGNATURE + (0).to_bytes(4, 'big') + len(extension).to_bytes(4, 'big') + extension
+    return header + records.tobytes() + (b'\xff\xff' if trailer else b'')
+
+def feed(payload, decoder, rng, max_piece):
+    """Mengirim payload dalam potongan acak, seperti copy_expert yang menulis per blok"""
+    pos = 0
+    while pos < len(payload):
+        size = rng.randint(1, max_piece)
+        decoder.write(payload[pos:pos + size])
+        pos += size
+
+@pytest.mark.parametrize('n, chunk_rows, max_piece', [
+    (0, 5, 3),
+    (1, 1, 1),
+    (37, 5, 7),       # header dan baris terpotong di tengah
+    (100, 10, 260),   # potongan tepat sekitar batas chunk_rows
+    (1000, 64, 5000),
+    (1000, 50000, 100000),
+])
+def test_random_chunking_matches_columns(n, chunk_rows, max_piece):
+    columns = synthetic_columns(n)
+    payload = encode(columns, extension=b'\x00' * 6)
+    for seed in range(5):
+        decoder = BinaryCopyDecoder(FIELDS, chunk_rows=chunk_rows)
+        feed(payload, decoder, random.Random(seed), max_piece)
+        arrays = decoder.result()
+        assert decoder.rows == n and decoder.bytes_read == len(payload)
+        for name, values in columns.items():
+            assert arrays[name].dtype.isnative
+            assert np.array_equal(arrays[name], values)
+
+def test_date_and_time_conversion():
+    days = np.array([0, (np.datetime64('2023-01-26') - np.datetime64('2000-01-01')).astype(int)], dtype=np.int32)
+    micros = np.array([0, (23 * 3600 + 58 * 60 + 36) * 10**6], dtype=np.int64)
+    assert list(dates_from_pg(days).astype(str)) == ['2000-01-01T00:00:00', '2023-01-26T00:00:00']
+    assert list(times_from_pg(micros).astype('timedelta64[s]').astype(int)) == [0, 86316]
+
+def test_truncated_payload_is_rejected():
+    decoder = BinaryCopyDecoder(FIELDS, chunk_rows=4)
+    feed(encode(synthetic_columns(10), trailer=False), decoder, random.Random(0), 11)
+    with pytest.raises(ValueError, match='trailer'):
+        decoder.result()
+
+def test_partial_row_is_rejected():
+    decoder = BinaryCopyDecoder(FIELDS, chunk_rows=4)
+    payload = encode(synthetic_columns(10))
+    decoder.write(payload[:-10] + b'\xff\xff')
+    with pytest.raises(ValueError):
+        decoder.result()
+
+def test_null_value_is_rejected():
+    decoder = BinaryCopyDecoder(FIELDS, chunk_rows=4)
+    with pytest.raises(ValueError, match='NULL'):
+        feed(encode(synthetic_columns(10), null_row=7), decoder, random.Random(0), 13)
+        decoder.result()
+
+def test_missing_header_is_rejected():
+    decoder = BinaryCopyDecoder(FIELDS)
+    with pytest.raises(ValueError, match='bukan format'):
+        decoder.write(b'id,tanggal\n' + b'\x00' * 20)
+    with pytest.raises(ValueError, match='Header'):
+        BinaryCopyDecoder(FIELDS).result()
@@ -0,0 +1,81 @@
+import numpy as np
+import pytest
+
+from declustering import Events, decluster
+from spatial import haversine_km
+
+# ============================
+# Katalog sintetis: gempa latar + deret gempa susulan
+# ============================
+
+def synthetic_events(seed=11, background=1500, sequences=40):
+    rng = np.random.default_rng(seed)
+    times = [rng.uniform(0, 3 * 365, background)]
+    latitude = [rng.uniform(-10, 5, background)]
+    longitude = [rng.uniform(95, 140, background)]
+    magnitude = [np.round(rng.uniform(2.5, 5.0, background), 1)]
+    for _ in range(sequences):
+        # Gempa utama besar diikuti gempa susulan di sekitarnya (dan beberapa pendahuluan)
+        n = rng.integers(5, 40)
+        t0, lat0, lon0 = rng.uniform(0, 3 * 365), rng.uniform(-10, 5), rng.uniform(95, 140)
+        times.append(t0 + np.concatenate([[0.0], rng.exponential(20, n), -rng.uniform(0, 3, 2)]))
+        latitude.append(lat0 + np.concatenate([[0.0], rng.normal(0, 0.2, n + 2)]))
+        longitude.append(lon0 + np.concatenate([[0.0], rng.normal(0, 0.2, n + 2)]))
+        magnitude.append(np.round(np.concatenate([[rng.uniform(6.0, 7.5)], rng.uniform(2.5, 5.5, n + 2)]), 1))
+    return Events(np.concatenate(times), np.concatenate(latitude), np.concatenate(longitude), np.concatenate(magnitude))
+
+def sequential_gk(events):
+    """Referensi brute-force: GK berurutan dari gempa terkuat, O(n^2)
+
+    Gempa yang belum masuk klaster menjadi gempa utama dan mengambil semua gempa
+    lebih lemah di dalam jendela jarak-waktunya yang belum masuk klaster lain.
+    """
+    n = len(events)
+    cluster = np.arange(n)
+    mainshock = np.ones(n, dtype=bool)
+    assigned = np.zeros(n, dtype=bool)
+    for i in np.argsort(events.rank):
+        if assigned[i]:
+            continue
+        assigned[i] = True
+        distance = haversine_km(
+            np.full(n, events.latitude[i]), np.full(n, events.longitude[i]),
+            events.latitude, events.longitude
+        )
+        members = (
+            ~assigned
+            & (events.rank > events.rank[i])
+            & (np.abs(events.times - events.times[i]) <= events.window_days[i])
+            & (distance <= events.window_km[i])
+        )
+        cluster[members] = i
+        mainshock[members] = False
+        assigned[members] = True
+    return cluster, mainshock
+
+@pytest.fixture(scope='module')
+def events():
+    return synthetic_events()
+
+@pytest.fixture(scope='module')
+def reference(events):
+    return sequential_gk(events)
+
+@pytest.mark.parametrize('workers', [1, 2])
+def test_decluster_matches_sequential_reference(events, reference, workers):
+    cluster, mainshock = decluster(events, workers=workers)
+    expected_cluster, expected_mainshock = reference
+    assert np.array_equal(mainshock, expected_mainshock)
+    assert np.array_equal(cluster, expected_cluster)
+
+def test_reference_finds_aftershocks(reference):
+    # Katalog uji memang berisi klaster, jadi kesamaan di atas tidak trivial
+    cluster, mainshock = reference
+    assert (~mainshock).sum() > 500
+    assert np.all(mainshock[cluster])
+
+def test_cell_size_does_not_change_result(events, reference):
+    coarse = Events(events.times, events.latitude, events.longitude, events.magnitude, cell_deg=3.0)
+    cluster, mainshock = decluster(coarse, workers=1)
+    assert np.array_equal(mainshock, reference[1])
+    assert np.array_equal(cluster, reference[0])
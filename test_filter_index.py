@@ -0,0 +1,84 @@
+import random
+from datetime import date, timedelta
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from catalogue import filter_mask, from_frame
+from filter_index import FilterIndex
+
+# ============================
+# Katalog sintetis kecil dengan banyak nilai kembar (magnitude 0.1, depth bulat)
+# ============================
+
+START = date(2020, 1, 1)
+DAYS = 400
+
+def synthetic_frame(order, seed=5, n=3000):
+    rng = np.random.default_rng(seed)
+    detik = rng.integers(0, 86400, n)
+    df = pd.DataFrame({
+        'id': np.arange(1, n + 1),
+        'tanggal': pd.to_datetime(np.datetime64(START) + rng.integers(0, DAYS, n).astype('timedelta64[D]')),
+        'waktu': [f"{s // 3600:02d}:{s // 60 % 60:02d}:{s % 60:02d}" for s in detik],
+        'latitude': rng.uniform(-10, 5, n),
+        'longitude': rng.uniform(95, 140, n),
+        'depth': rng.integers(1, 60, n),
+        'magnitude': np.round(rng.uniform(2.0, 6.0, n), 1),
+        'remark': pd.Categorical(rng.choice(['Java - Indonesia', 'Banda Sea'], n)),
+    })
+    if order == 'desc':
+        # Urutan snapshot: tanggal turun
+        df = df.sort_values(['tanggal', 'waktu', 'id'], ascending=False, ignore_index=True)
+    elif order == 'asc':
+        df = df.sort_values(['tanggal', 'waktu', 'id'], ignore_index=True)
+    catalogue = from_frame(df)
+    catalogue['gempa_susulan'] = rng.random(n) < 0.3
+    return catalogue
+
+def random_filters(rng):
+    """Filter acak: batas sering tepat di nilai yang ada, kadang terbalik atau kosong"""
+    filters = {}
+    if rng.random() < 0.6:
+        filters['min_mag'] = round(rng.uniform(1.8, 6.2), 1)
+    if rng.random() < 0.6:
+        filters['max_mag'] = round(rng.uniform(1.8, 6.2), 1)
+    if rng.random() < 0.5:
+        filters['min_depth'] = rng.randint(0, 62)
+    if rng.random() < 0.5:
+        filters['max_depth'] = rng.choice([None, rng.randint(0, 62)])
+    if rng.random() < 0.5:
+        filters['start_date'] = START + timedelta(days=rng.randint(-5, DAYS + 5))
+    if rng.random() < 0.5:
+        filters['end_date'] = START + timedelta(days=rng.randint(-5, DAYS + 5))
+    if rng.random() < 0.3:
+        filters['mainshock_only'] = True
+    return filters
+
+def expected_rows(df, filters):
+    mask = filter_mask(df, filters)
+    if filters.get('mainshock_only'):
+        mask &= ~df['gempa_susulan'].to_numpy()
+    return np.flatnonzero(mask)
+
+@pytest.mark.parametrize('order', ['desc', 'asc', 'acak'])
+def test_select_matches_filter_mask(order):
+    df = synthetic_frame(order)
+    index = FilterIndex(df)
+    rng = random.Random(order)
+    for _ in range(1000):
+        filters = random_filters(rng)
+        assert np.array_equal(index.select(filters), expected_rows(df, filters)), filters
+
+def test_unfiltered_select_is_all_rows():
+    df = synthetic_frame('desc')
+    index = FilterIndex(df)
+    assert np.array_equal(index.select({}), np.arange(len(df)))
+    assert np.array_equal(index.select({'min_mag': None, 'end_date': None}), np.arange(len(df)))
+
+def test_mainshock_only_ignored_without_declustering():
+    df = synthetic_frame('acak').drop(columns='gempa_susulan')
+    index = FilterIndex(df)
+    filters = {'min_mag': 3.0, 'mainshock_only': True}
+    assert np.array_equal(index.select(filters), np.flatnonzero(filter_mask(df, filters)))
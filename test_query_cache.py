@@ -0,0 +1,111 @@
+import random
+from datetime import date
+
+import pytest
+
+import query_cache as qc
+from query_cache import QueryCache, _freeze
+
+# ============================
+# Waktu tiruan agar TTL dan interval cek versi bisa diuji tanpa sleep
+# ============================
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(qc.time, 'monotonic', lambda: now[0])
+    return now
+
+def test_freeze_is_order_independent():
+    a = {'min_mag': 3.0, 'start_date': date(2020, 1, 1), 'kolom': ['id', 'remark']}
+    b = {'kolom': ['id', 'remark'], 'start_date': date(2020, 1, 1), 'min_mag': 3.0}
+    assert _freeze(a) == _freeze(b)
+    assert hash(_freeze(a)) == hash(_freeze(b))
+    assert _freeze({'min_mag': 3.0}) != _freeze({'min_mag': 3.1})
+
+def test_hit_miss_and_ttl(clock):
+    cache = QueryCache(ttl=10)
+    calls = []
+
+    @cache.cached
+    def query(x):
+        calls.append(x)
+        return x * 2
+
+    assert query(2) == 4 and query(2) == 4
+    assert calls == [2]
+    clock[0] += 11
+    assert query(2) == 4
+    assert calls == [2, 2]
+    assert cache.stats()['hits'] == 1 and cache.stats()['misses'] == 2
+    assert query.uncached(3) == 6 and calls == [2, 2, 3]
+
+def test_lru_eviction():
+    cache = QueryCache(maxsize=3)
+    for key in 'abc':
+        cache.set(key, key)
+    cache.get('a')
+    cache.set('d', 'd')
+    assert cache.get('b') == (False, None)
+    assert all(cache.get(key)[0] for key in 'acd')
+    assert cache.stats()['evictions'] == 1
+
+def test_version_change_invalidates(clock):
+    version = [1]
+    cache = QueryCache(version_loader=lambda: version[0], version_check_interval=5)
+    cache.set('k', 'lama')
+    assert cache.get('k') == (True, 'lama')
+    version[0] = 2
+    # Versi baru belum terlihat sebelum interval cek lewat
+    assert cache.get('k') == (True, 'lama')
+    clock[0] += 6
+    assert cache.get('k') == (False, None)
+    assert cache.stats()['invalidations'] == 1
+    assert cache.stats()['catalog_version'] == 2
+
+def test_result_computed_across_invalidation_is_not_cached():
+    cache = QueryCache()
+    calls = []
+
+    @cache.cached
+    def query(x):
+        calls.append(x)
+        # Versi katalog naik / NOTIFY datang selama query berjalan
+        cache.invalidate()
+        return 'lama'
+
+    assert query(1) == 'lama'
+    assert cache.stats()['size'] == 0
+    query(1)
+    assert calls == [1, 1]
+
+def test_random_operations_match_reference(clock):
+    """Urutan acak get/set/invalidate/waktu berjalan dibandingkan dengan model dict sederhana"""
+    rng = random.Random(3)
+    cache = QueryCache(maxsize=8, ttl=30)
+    model = {}  # key -> (kadaluarsa, nilai, urutan pakai terakhir)
+    tick = 0
+    for _ in range(5000):
+        op = rng.random()
+        key = rng.randrange(12)
+        tick += 1
+        if op < 0.45:
+            found, value = cache.get(key)
+            item = model.get(key)
+            if item is not None and item[0] > clock[0]:
+                assert found and value == item[1]
+                model[key] = (item[0], item[1], tick)
+            else:
+                assert not found
+                model.pop(key, None)
+        elif op < 0.9:
+            value = rng.random()
+            cache.set(key, value)
+            model[key] = (clock[0] + 30, value, tick)
+            while len(model) > 8:
+                del model[min(model, key=lambda k: model[k][2])]
+        elif op < 0.93:
+            cache.invalidate()
+            model.clear()
+        else:
+            clock[0] += rng.uniform(0, 20)
@@ -0,0 +1,93 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from catalogue import from_frame
+from catalogue_store import CatalogueStore
+from seismicity import b_value_timeline, gr_fit, index_for, magnitude_bins
+
+# ============================
+# Katalog sintetis Gutenberg-Richter (b = 1)
+# ============================
+
+N_EVENTS = 20000
+REGIONS = ['Java - Indonesia', 'Banda Sea', 'Northern Sumatra - Indonesia']
+
+@pytest.fixture(scope='module')
+def store():
+    rng = np.random.default_rng(7)
+    # Magnitude eksponensial (b = 1) mulai 2.0, dengan deteksi tidak lengkap di bawah ~2.6
+    magnitude = 2.0 + rng.exponential(np.log10(np.e), N_EVENTS * 2)
+    detected = rng.random(len(magnitude)) < np.clip((magnitude - 2.0) / 0.6, 0.05, 1.0)
+    magnitude = np.round(magnitude[detected][:N_EVENTS], 1)
+    n = len(magnitude)
+    tanggal = np.datetime64('2019-01-01') + rng.integers(0, 3 * 365, n).astype('timedelta64[D]')
+    detik = rng.integers(0, 86400, n)
+    df = pd.DataFrame({
+        'id': np.arange(1, n + 1),
+        'tanggal': pd.to_datetime(tanggal),
+        'waktu': [f"{s // 3600:02d}:{s // 60 % 60:02d}:{s % 60:02d}" for s in detik],
+        'latitude': rng.uniform(-10, 5, n),
+        'longitude': rng.uniform(95, 140, n),
+        'depth': rng.integers(5, 300, n),
+        'magnitude': magnitude,
+        'remark': pd.Categorical(rng.choice(REGIONS, n)),
+    })
+    df = df.sort_values(['tanggal', 'waktu', 'id'], ascending=False, ignore_index=True)
+    return CatalogueStore(from_frame(df), version=1)
+
+def _direct_fit(store, mask, min_events):
+    """gr_fit dari histogram yang dihitung langsung dari baris terfilter (tanpa histogram parsial)"""
+    all_bins = magnitude_bins(store.df['magnitude'].to_numpy())
+    min_bin = int(all_bins.min())
+    hist = np.bincount(all_bins[mask] - min_bin, minlength=int(all_bins.max()) - min_bin + 1)
+    return gr_fit(hist, min_bin, min_events)
+
+def _mask(store, filters):
+    mask = np.zeros(len(store), dtype=bool)
+    mask[store.select(filters)] = True
+    return mask
+
+def test_gr_fit_recovers_b_value(store):
+    fit = _direct_fit(store, np.ones(len(store), dtype=bool), 50)
+    assert fit['b'] == pytest.approx(1.0, abs=0.05)
+    assert fit['mc'] == pytest.approx(2.7, abs=0.25)
+
+def test_timeline_single_window_matches_direct_fit(store):
+    filters = {'min_mag': 2.2, 'max_mag': 6.0, 'min_depth': 20, 'max_depth': 250}
+    # Satu jendela yang mencakup seluruh katalog
+    timeline = b_value_timeline(store, filters, window_months=36, step_months=36, min_events=10)
+    assert len(timeline) == 1
+    expected = _direct_fit(store, _mask(store, filters), 10)
+    row = timeline.iloc[0]
+    assert row['n'] == expected['n']
+    assert row['mc'] == pytest.approx(expected['mc'])
+    assert row['b'] == pytest.approx(expected['b'])
+    assert row['b_err'] == pytest.approx(expected['b_err'])
+
+def test_timeline_sliding_windows_match_direct_fit(store):
+    filters = {'min_mag': 2.5}
+    timeline = b_value_timeline(store, filters, window_months=6, step_months=3, region='Banda Sea', min_events=10)
+    assert len(timeline) > 1
+    mask = _mask(store, filters) & (store.df['remark'] == 'Banda Sea').to_numpy()
+    bulan = store.df['bulan'].to_numpy()
+    for row in timeline.itertuples():
+        window = mask & (bulan >= row.mulai) & (bulan < row.selesai)
+        expected = _direct_fit(store, window, 10)
+        assert row.n == expected['n']
+        assert row.mc == pytest.approx(expected['mc'])
+        assert row.b == pytest.approx(expected['b'])
+
+def test_restricted_matches_magnitude_filter(store):
+    filters = {'min_depth': 10, 'max_depth': 200}
+    partials = index_for(store).partials(filters, by_month=False)
+    bins = magnitude_bins(store.df['magnitude'].to_numpy())
+    min_bin = partials.min_bin
+    n_bins = partials.counts.shape[-1]
+    for min_mag, max_mag in [(None, None), (3.0, None), (None, 4.5), (3.0, 4.5)]:
+        restricted = partials.restricted(min_mag, max_mag)[0, 0]
+        magnitude_filters = dict(filters, min_mag=min_mag, max_mag=max_mag)
+        selected = bins[store.select(magnitude_filters)]
+        assert np.array_equal(restricted, np.bincount(selected - min_bin, minlength=n_bins))
+    # Tanpa batas magnitude, histogram parsial tidak berubah
+    assert np.array_equal(partials.restricted(), partials.counts)